@@ -1,5 +1,6 @@
 def main() -> None:
     import logging
+    import os
 
     from brother_ql_web import cli, utils, web
     from brother_ql_web.configuration import Configuration
@@ -9,12 +10,23 @@ def main() -> None:
     cli.update_configuration_from_parameters(
         configuration=configuration, parameters=cli_parameters
     )
+    # Keep the label templates next to the configuration file by default.
+    configuration_directory = os.path.dirname(
+        os.path.abspath(cli_parameters.configuration)
+    )
+    configuration.server.template_file = os.path.join(
+        configuration_directory, configuration.server.template_file or "templates.json"
+    )
+    if configuration.server.job_journal_file:
+        configuration.server.job_journal_file = os.path.join(
+            configuration_directory, configuration.server.job_journal_file
+        )
     logging.basicConfig(level=configuration.server.log_level)
     web.main(
         configuration=configuration,
-        fonts=utils.collect_fonts(configuration),
+        fonts=utils.get_font_registry(configuration).fonts,
         label_sizes=utils.get_label_sizes(),
-        backend_class=utils.get_backend_class(configuration),
+        backend_classes=utils.get_backend_classes(configuration),
     )
 
 
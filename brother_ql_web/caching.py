@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Generic, Hashable, TypeVar
+
+
+KeyType = TypeVar("KeyType", bound=Hashable)
+ValueType = TypeVar("ValueType")
+
+
+class LRUCache(Generic[KeyType, ValueType]):
+    """
+    Thread-safe least recently used cache.
+
+    The cache is bounded by the number of entries and optionally by the total size of
+    its values, as determined by the `sizeof` callable.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_size: int = 0,
+        sizeof: Callable[[ValueType], int] | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries: OrderedDict[KeyType, ValueType] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def _get_size(self, value: ValueType) -> int:
+        return self.sizeof(value) if self.sizeof else 0
+
+    def get(self, key: KeyType) -> ValueType | None:
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: KeyType, value: ValueType) -> None:
+        size = self._get_size(value)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._get_size(self._entries.pop(key))
+            if self.max_entries <= 0 or (self.max_size and size > self.max_size):
+                # Caching is disabled or the value would evict everything else.
+                return
+            self._entries[key] = value
+            self.size += size
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries or (
+            self.max_size and self.size > self.max_size
+        ):
+            _, value = self._entries.popitem(last=False)
+            self.size -= self._get_size(value)
+
+    def resize(self, max_entries: int, max_size: int | None = None) -> None:
+        with self._lock:
+            self.max_entries = max_entries
+            if max_size is not None:
+                self.max_size = max_size
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def statistics(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "size": self.size,
+            "max_size": self.max_size,
+        }
@@ -8,6 +8,7 @@ from typing import cast
 
 from brother_ql.devicedependent import models, label_sizes
 from brother_ql_web.configuration import Configuration, Font
+from brother_ql_web.server import SERVER_BACKENDS
 from brother_ql_web.utils import collect_fonts
 
 
@@ -26,6 +27,24 @@ def get_parameters() -> Namespace:
     )
     parser.add_argument("--port", default=False)
     parser.add_argument("--log-level", type=log_level_type, default=False)
+    parser.add_argument(
+        "--server-backend",
+        default=False,
+        choices=SERVER_BACKENDS,
+        help=(
+            'The WSGI server to use, defaults to "wsgiref" (single-threaded). '
+            'Use "threading" for a thread pool without additional dependencies.'
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=False,
+        help=(
+            "Number of threads (or processes for gunicorn) handling requests. "
+            "Not used by the wsgiref server."
+        ),
+    )
     parser.add_argument(
         "--font-folder", default=False, help="folder for additional .ttf/.otf fonts"
     )
@@ -72,6 +91,10 @@ class InvalidLabelSize(ValueError):
     pass
 
 
+class InvalidServerBackend(ValueError):
+    pass
+
+
 class NoFontFound(SystemError):
     pass
 
@@ -113,6 +136,10 @@ def update_configuration_from_parameters(
         )
     if parameters.font_folder:
         configuration.server.additional_font_folder = parameters.font_folder
+    if parameters.server_backend:
+        configuration.server.backend = parameters.server_backend
+    if parameters.workers:
+        configuration.server.workers = parameters.workers
 
     # Printer configuration.
     if parameters.printer:
@@ -127,6 +154,11 @@ def update_configuration_from_parameters(
         configuration.label.default_orientation = parameters.default_orientation
 
     # Configuration issues.
+    if configuration.server.backend not in SERVER_BACKENDS:
+        raise InvalidServerBackend(
+            "Invalid server backend. Please choose one of the following:\n"
+            + " ".join(SERVER_BACKENDS)
+        )
     if configuration.label.default_size not in label_sizes:
         raise InvalidLabelSize(
             "Invalid default label size. Please choose one of the following:\n"
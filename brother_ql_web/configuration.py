@@ -1,7 +1,12 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass, field as dataclass_field, fields as dataclass_fields
+from dataclasses import (
+    dataclass,
+    field as dataclass_field,
+    fields as dataclass_fields,
+    replace,
+)
 from typing import Any, cast
 
 
@@ -11,6 +16,8 @@ class Configuration:
     printer: PrinterConfiguration
     label: LabelConfiguration
     website: WebsiteConfiguration
+    # Additional printers besides the default one.
+    printers: list[PrinterConfiguration] = dataclass_field(default_factory=list)
 
     @classmethod
     def from_json(cls, json_file: str) -> Configuration:
@@ -20,6 +27,12 @@ class Configuration:
         global_variables = globals()
         for field in dataclass_fields(cls):
             name: str = field.name
+            if name == "printers":
+                kwargs[name] = [
+                    PrinterConfiguration(**printer)
+                    for printer in parsed.pop(name, None) or []
+                ]
+                continue
             field_type: str = cast(str, field.type)
             field_class = global_variables[field_type]
             kwargs_inner = parsed.pop(name, None)
@@ -32,7 +45,25 @@ class Configuration:
             kwargs[name] = instance
         if parsed:
             raise ValueError(f"Unknown configuration values: {parsed}")
-        return cls(**kwargs)
+        configuration = cls(**kwargs)
+        names = [printer.name for printer in configuration.all_printers]
+        for name in names:
+            if names.count(name) > 1:
+                raise ValueError(f"Duplicate printer name: {name}")
+        return configuration
+
+    @property
+    def all_printers(self) -> list[PrinterConfiguration]:
+        """
+        The default printer followed by the additional ones.
+        """
+        return [self.printer, *self.printers]
+
+    def for_printer(self, printer: PrinterConfiguration) -> Configuration:
+        """
+        Copy of the configuration using the given printer as the default one.
+        """
+        return replace(self, printer=printer)
 
     def to_json(self) -> str:
         return json.dumps(self, indent=2, default=lambda o: o.__dict__)
@@ -44,6 +75,20 @@ class ServerConfiguration:
     host: str = ""
     log_level: str = "WARNING"
     additional_font_folder: str = ""
+    font_cache_size: int = 32
+    preview_cache_size: int = 16 * 1024 * 1024
+    raster_cache_size: int = 32 * 1024 * 1024
+    image_cache_size: int = 16 * 1024 * 1024
+    backend: str = "wsgiref"
+    workers: int = 1
+    render_processes: int = 0
+    template_file: str = ""
+    # Seconds between requesting the status of idle printers, disabled for 0.
+    printer_status_interval: float = 10
+    # SQLite database persisting the print queue, disabled if empty.
+    job_journal_file: str = ""
+    # The maximum size of the JSON body of `/api/print/batch` in bytes.
+    batch_max_size: int = 4 * 1024 * 1024
 
     @property
     def is_in_debug_mode(self) -> bool:
@@ -54,6 +99,15 @@ class ServerConfiguration:
 class PrinterConfiguration:
     model: str
     printer: str
+    connection_idle_timeout: float = 30
+    name: str = "default"
+    # The backend of `brother_ql`, guessed from the printer identifier if empty.
+    backend: str = ""
+    # The label sizes loaded into the printer, with any label size being accepted if
+    # empty.
+    label_sizes: list[str] = dataclass_field(default_factory=list)
+    # The maximum number of bytes sent to the printer at once.
+    write_chunk_size: int = 16384
 
 
 @dataclass(frozen=True)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import cast, Tuple
+
+from brother_ql.devicedependent import (
+    DIE_CUT_LABEL,
+    ENDLESS_LABEL,
+    ROUND_DIE_CUT_LABEL,
+    label_type_specs,
+)
+from brother_ql.labels import FormFactor
+from brother_ql_web.caching import LRUCache
+
+
+_GeometryKey = Tuple[str, str, int, int, int, int, int]
+
+_geometry_cache: LRUCache[_GeometryKey, LabelGeometry] = LRUCache(max_entries=1024)
+
+
+def get_cache_statistics() -> dict[str, int]:
+    return _geometry_cache.statistics
+
+
+@dataclass(frozen=True)
+class LabelGeometry:
+    """
+    Resolved dimensions of a label in dots for a label size and orientation. The
+    margins are given relative to the font size, thus they are resolved for it, too.
+
+    The width and height are the printable area, with the length of endless labels
+    being determined by the content later on.
+    """
+
+    __slots__ = (
+        "kind",
+        "orientation",
+        "width",
+        "height",
+        "margin_top",
+        "margin_bottom",
+        "margin_left",
+        "margin_right",
+        "rotate",
+    )
+
+    kind: FormFactor
+    orientation: str
+    width: int
+    height: int
+    margin_top: int
+    margin_bottom: int
+    margin_left: int
+    margin_right: int
+    # The rotation passed to `brother_ql` when converting the label image.
+    rotate: int | str
+
+    @classmethod
+    def create(
+        cls,
+        label_size: str,
+        orientation: str,
+        font_size: int,
+        margins: tuple[int, int, int, int],
+    ) -> LabelGeometry:
+        """
+        Might raise LookupError()
+        """
+        try:
+            specs = label_type_specs[label_size]
+        except KeyError:
+            raise LookupError("Unknown label_size")
+        kind = cast(FormFactor, specs["kind"])
+        width, height = cast(tuple[int, int], specs["dots_printable"])
+        if height > width:
+            width, height = height, width
+        if orientation == "rotated":
+            height, width = width, height
+
+        rotate: int | str = 0
+        if kind == ENDLESS_LABEL:
+            rotate = 0 if orientation == "standard" else 90
+        elif kind in (ROUND_DIE_CUT_LABEL, DIE_CUT_LABEL):
+            rotate = "auto"
+
+        top, bottom, left, right = (
+            int(font_size * margin / 100.0) for margin in margins
+        )
+        return cls(
+            kind=kind,
+            orientation=orientation,
+            width=width,
+            height=height,
+            margin_top=top,
+            margin_bottom=bottom,
+            margin_left=left,
+            margin_right=right,
+            rotate=rotate,
+        )
+
+    @property
+    def is_endless(self) -> bool:
+        return self.kind == ENDLESS_LABEL
+
+    @property
+    def is_die_cut(self) -> bool:
+        return self.kind in (DIE_CUT_LABEL, ROUND_DIE_CUT_LABEL)
+
+
+def get_label_geometry(
+    label_size: str,
+    orientation: str,
+    font_size: int,
+    margins: tuple[int, int, int, int],
+) -> LabelGeometry:
+    """
+    Retrieve the geometry for the given values, which is resolved once and shared by
+    all labels using them.
+
+    Might raise LookupError()
+    """
+    key = (label_size, orientation, font_size, *margins)
+    geometry = _geometry_cache.get(key)
+    if geometry is None:
+        geometry = LabelGeometry.create(
+            label_size=label_size,
+            orientation=orientation,
+            font_size=font_size,
+            margins=margins,
+        )
+        _geometry_cache.put(key, geometry)
+    return geometry
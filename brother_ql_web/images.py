@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import hashlib
+from io import BytesIO
+
+from brother_ql_web.caching import LRUCache
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+IMAGE_FORMATS = ("PNG", "JPEG")
+
+
+def _get_image_size(image: Image.Image) -> int:
+    return image.size[0] * image.size[1] * len(image.getbands())
+
+
+_image_cache: LRUCache[tuple[str, int, int, str], Image.Image] = LRUCache(
+    max_entries=256, max_size=16 * 1024 * 1024, sizeof=_get_image_size
+)
+
+
+def configure_cache(max_size: int) -> None:
+    _image_cache.resize(max_entries=256 if max_size > 0 else 0, max_size=max_size)
+
+
+def get_cache_statistics() -> dict[str, int]:
+    return _image_cache.statistics
+
+
+def get_image_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _render_svg(data: bytes, width: int) -> Image.Image:
+    try:
+        import cairosvg
+    except ImportError:
+        raise ValueError("SVG images require CairoSVG to be installed")
+    # Render the vector graphics at the target width instead of scaling pixels.
+    png = cairosvg.svg2png(bytestring=data, output_width=width or None)
+    return Image.open(BytesIO(png))
+
+
+def decode_image(data: bytes, width: int = 0) -> Image.Image:
+    """
+    Decode the given PNG, JPEG or SVG image. SVG images are rendered with the given
+    width, if any.
+
+    Might raise ValueError()
+    """
+    try:
+        image = Image.open(BytesIO(data))
+        if image.format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format: {image.format}")
+        image.load()
+    except UnidentifiedImageError:
+        if b"<svg" not in data[:4096]:
+            raise ValueError("Unsupported image format")
+        image = _render_svg(data, width)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Invalid image: {e}")
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+        # Place transparent images in front of a white background.
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, "white")
+        image = Image.alpha_composite(background, image)
+    return image
+
+
+def fit_image(image: Image.Image, width: int, height: int) -> Image.Image:
+    """
+    Scale the image to fit into the given size, keeping its aspect ratio. A width or
+    height of 0 denotes the unlimited length of endless labels, for which the image
+    fills the other dimension. Otherwise, the image is centered on a white canvas of
+    exactly the given size.
+    """
+    scale = min(
+        width / image.size[0] if width else float("inf"),
+        height / image.size[1] if height else float("inf"),
+    )
+    size = (
+        width if not height else max(1, round(image.size[0] * scale)),
+        height if not width else max(1, round(image.size[1] * scale)),
+    )
+    if size != image.size:
+        image = image.resize(size, Image.LANCZOS)
+    if not width or not height or size == (width, height):
+        return image
+    canvas = Image.new(image.mode, (width, height), "white")
+    canvas.paste(image, ((width - size[0]) // 2, (height - size[1]) // 2))
+    return canvas
+
+
+def get_fitted_image(
+    data: bytes, width: int, height: int, mode: str, data_hash: str | None = None
+) -> Image.Image:
+    """
+    Decode the image and fit it to the given size and mode, caching the result by the
+    content hash of the image data. The returned image must not be modified.
+
+    Might raise ValueError()
+    """
+    key = (data_hash or get_image_hash(data), width, height, mode)
+    image = _image_cache.get(key)
+    if image is None:
+        image = fit_image(decode_image(data, width=width), width, height)
+        image = image.convert(mode)
+        _image_cache.put(key, image)
+    return image
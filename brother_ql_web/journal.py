@@ -0,0 +1,370 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+from concurrent.futures import Future
+from contextlib import closing
+from queue import Empty, Queue
+from threading import Lock, Thread
+from typing import Any, Iterator, NamedTuple, Union
+
+from brother_ql_web.raster import RasterLabel
+
+
+logger = logging.getLogger(__name__)
+del logging
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    printer TEXT NOT NULL,
+    label_count INTEGER NOT NULL,
+    labels_printed INTEGER NOT NULL DEFAULT 0,
+    bytes_written INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL,
+    error TEXT NOT NULL DEFAULT '',
+    rendered INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    rendering_started_at REAL,
+    printing_started_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS labels (
+    job_id TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    first_page INTEGER NOT NULL,
+    copies INTEGER NOT NULL,
+    cut_every INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (job_id, number)
+);
+"""
+
+# The state of the jobs which have not been finished before the journal was opened.
+_INTERRUPTED = "interrupted"
+
+_ENTRY_COLUMNS = (
+    "id, printer, label_count, labels_printed, bytes_written, created_at, rendered, "
+    "state, error, cancel_requested, rendering_started_at, printing_started_at, "
+    "finished_at"
+)
+
+# A statement with its parameters, a commit to wait for or None to stop the writer.
+_Write = Union["tuple[str, tuple[Any, ...]]", "Future[None]", None]
+
+
+class JournalEntry(NamedTuple):
+    """
+    A print job read from the journal. Only interrupted jobs whose labels have all
+    been `rendered` can be resumed.
+    """
+
+    id: str
+    printer: str
+    label_count: int
+    labels_printed: int
+    bytes_written: int
+    created_at: float
+    rendered: bool = False
+    state: str = "queued"
+    error: str = ""
+    cancel_requested: bool = False
+    rendering_started_at: float | None = None
+    printing_started_at: float | None = None
+    finished_at: float | None = None
+
+    @classmethod
+    def from_row(cls, row: tuple[Any, ...]) -> JournalEntry:
+        entry = cls(*row)
+        return entry._replace(
+            rendered=bool(entry.rendered),
+            cancel_requested=bool(entry.cancel_requested),
+        )
+
+
+class JobJournal:
+    """
+    Durable log of the print jobs inside an SQLite database, holding each distinct
+    label of a job together with its copies until the job has been finished, and the
+    progress of the jobs. Thus interrupted jobs can be resumed after a restart and it
+    is known which labels have been printed.
+
+    All writes are executed by a background thread, which commits all pending writes
+    at once. A burst of jobs or labels thereby costs a single sync of the database
+    file instead of one per label, and none of the writes waits for its commit.
+    """
+
+    def __init__(
+        self, path: str, max_batch: int = 256, max_finished_jobs: int = 1000
+    ) -> None:
+        self.path = path
+        self.max_batch = max_batch
+        self.max_finished_jobs = max_finished_jobs
+        self._writes: Queue[_Write] = Queue(maxsize=max_batch)
+        self._connection: sqlite3.Connection | None = None
+        self._thread: Thread | None = None
+        self._lock = Lock()
+        self._pid = os.getpid()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # Sync the write-ahead log on each commit.
+        connection.execute("PRAGMA synchronous=FULL")
+        return connection
+
+    def open(self) -> None:
+        """
+        Create the database if required, forget the labels which do not belong to a
+        job and the oldest finished jobs, and mark the unfinished jobs as interrupted.
+        The writer thread is started by the first write, thus the journal may be
+        opened before forking the worker processes.
+
+        Might raise sqlite3.Error()
+        """
+        with closing(self._connect()) as connection:
+            connection.executescript(_SCHEMA)
+            with connection:
+                connection.execute(
+                    "DELETE FROM labels WHERE job_id NOT IN (SELECT id FROM jobs)"
+                )
+                connection.execute(
+                    "DELETE FROM jobs WHERE finished_at IS NOT NULL AND id NOT IN "
+                    "(SELECT id FROM jobs WHERE finished_at IS NOT NULL "
+                    "ORDER BY finished_at DESC LIMIT ?)",
+                    (self.max_finished_jobs,),
+                )
+                connection.execute(
+                    "UPDATE jobs SET state = ? WHERE finished_at IS NULL",
+                    (_INTERRUPTED,),
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None and self._pid == os.getpid():
+                self._writes.put(None)
+                thread.join()
+            connection, self._connection = self._connection, None
+            if connection is not None:
+                connection.close()
+
+    def _put(self, write: _Write) -> None:
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                # Forked worker processes do not inherit the writer thread, and the
+                # connection of the parent process must not be used either.
+                self._pid = os.getpid()
+                self._connection = self._connect()
+                self._writes = Queue(maxsize=self.max_batch)
+                self._thread = Thread(
+                    target=self._run,
+                    args=(self._connection, self._writes),
+                    name="job-journal",
+                    daemon=True,
+                )
+                self._thread.start()
+            writes = self._writes
+        writes.put(write)
+
+    def flush(self) -> None:
+        """
+        Wait until all previous writes have been committed.
+
+        Might raise sqlite3.Error()
+        """
+        commit: Future[None] = Future()
+        self._put(commit)
+        commit.result()
+
+    def add_job(
+        self, job_id: str, printer: str, label_count: int, created_at: float
+    ) -> None:
+        """
+        Record a queued job, whose labels are added while rendering them.
+        """
+        self._put(
+            (
+                "INSERT OR REPLACE INTO jobs (id, printer, label_count, state, "
+                "created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, printer, label_count, created_at),
+            )
+        )
+
+    def add_label(
+        self, job_id: str, number: int, first_page: int, label: RasterLabel
+    ) -> None:
+        """
+        Store the raster data of the label with the given number, printed on the pages
+        starting with `first_page`.
+        """
+        self._put(
+            (
+                "INSERT OR REPLACE INTO labels (job_id, number, first_page, copies, "
+                "cut_every, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, number, first_page, label.copies, label.cut_every, label.data),
+            )
+        )
+
+    def set_rendered(self, job_id: str) -> None:
+        """
+        Mark all labels of the job as stored, which allows resuming it.
+        """
+        self._put(("UPDATE jobs SET rendered = 1 WHERE id = ?", (job_id,)))
+
+    def update(
+        self,
+        job_id: str,
+        state: str,
+        labels_printed: int,
+        bytes_written: int,
+        error: str = "",
+        rendering_started_at: float | None = None,
+        printing_started_at: float | None = None,
+        finished_at: float | None = None,
+    ) -> None:
+        """
+        Record the progress of a job. The labels of finished jobs are deleted.
+        """
+        self._put(
+            (
+                "UPDATE jobs SET state = ?, labels_printed = ?, bytes_written = ?, "
+                "error = ?, rendering_started_at = ?, printing_started_at = ?, "
+                "finished_at = ? WHERE id = ?",
+                (
+                    state,
+                    labels_printed,
+                    bytes_written,
+                    error,
+                    rendering_started_at,
+                    printing_started_at,
+                    finished_at,
+                    job_id,
+                ),
+            )
+        )
+        if finished_at is not None:
+            self._put(("DELETE FROM labels WHERE job_id = ?", (job_id,)))
+
+    def take_interrupted_jobs(self) -> list[JournalEntry]:
+        """
+        Return the jobs which have been interrupted by the last restart and mark them
+        as queued again, thus only a single worker process resumes each job.
+
+        Might raise sqlite3.Error()
+        """
+        with closing(self._connect()) as connection:
+            connection.isolation_level = None
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = connection.execute(
+                    f"SELECT {_ENTRY_COLUMNS} FROM jobs WHERE state = ? "
+                    "ORDER BY created_at",
+                    (_INTERRUPTED,),
+                ).fetchall()
+                connection.execute(
+                    "UPDATE jobs SET state = 'queued' WHERE state = ?", (_INTERRUPTED,)
+                )
+            except sqlite3.Error:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        return [JournalEntry.from_row(row)._replace(state="queued") for row in rows]
+
+    def get_job(self, job_id: str) -> JournalEntry | None:
+        """
+        Read the last committed state of a job, which might be processed by another
+        worker process.
+
+        Might raise sqlite3.Error()
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                f"SELECT {_ENTRY_COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return None if row is None else JournalEntry.from_row(row)
+
+    def count_unfinished_jobs(self) -> dict[str, int]:
+        """
+        Count the jobs of each printer which have not been finished yet, including
+        those of other worker processes.
+
+        Might raise sqlite3.Error()
+        """
+        with closing(self._connect()) as connection:
+            return dict(
+                connection.execute(
+                    "SELECT printer, COUNT(*) FROM jobs WHERE finished_at IS NULL "
+                    "GROUP BY printer"
+                ).fetchall()
+            )
+
+    def request_cancel(self, job_id: str) -> bool:
+        """
+        Ask the worker process printing the job to cancel it, which is committed
+        right away. Returns False if the job has already been finished.
+
+        Might raise sqlite3.Error()
+        """
+        with closing(self._connect()) as connection:
+            with connection:
+                cursor = connection.execute(
+                    "UPDATE jobs SET cancel_requested = 1 "
+                    "WHERE id = ? AND finished_at IS NULL",
+                    (job_id,),
+                )
+        return cursor.rowcount > 0
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        """
+        Might raise sqlite3.Error()
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return row is not None and bool(row[0])
+
+    def iter_labels(self, job_id: str, start: int = 0) -> Iterator[RasterLabel]:
+        """
+        Read the labels of a job lazily, starting at the page with the given number.
+        The copies of the first label which have already been printed are skipped.
+        """
+        with closing(self._connect()) as connection:
+            for first_page, copies, cut_every, data in connection.execute(
+                "SELECT first_page, copies, cut_every, data FROM labels "
+                "WHERE job_id = ? AND first_page + copies > ? ORDER BY number",
+                (job_id, start),
+            ):
+                yield RasterLabel(
+                    bytes(data),
+                    copies=first_page + copies - max(first_page, start),
+                    cut_every=cut_every,
+                )
+
+    def _run(self, connection: sqlite3.Connection, writes: Queue[_Write]) -> None:
+        while True:
+            batch = [writes.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(writes.get_nowait())
+                except Empty:
+                    break
+            commits = [write for write in batch if isinstance(write, Future)]
+            try:
+                with connection:
+                    for write in batch:
+                        if isinstance(write, tuple):
+                            connection.execute(*write)
+            except sqlite3.Error as e:
+                logger.error("Writing the job journal failed: %s", e)
+                for commit in commits:
+                    commit.set_exception(e)
+            else:
+                for commit in commits:
+                    commit.set_result(None)
+            if any(write is None for write in batch):
+                break
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Callable, Iterator, Mapping
+
+from brother_ql_web.labels import LabelParameters
+from brother_ql_web.printing import InterProcessLock
+
+
+logger = logging.getLogger(__name__)
+del logging
+
+# The values which may differ between the labels printed from the same template.
+TEMPLATE_VARIABLES = ("text", "barcode", "label_count")
+
+
+@dataclass(frozen=True)
+class LabelTemplate:
+    id: str
+    name: str
+    values: dict[str, Any]
+    parameters: LabelParameters
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"id": self.id, "name": self.name, "parameters": self.values}
+
+    def create_parameters(self, **variables: Any) -> LabelParameters:
+        """
+        Derive the parameters of a label from the precompiled ones, only replacing the
+        given variable values.
+        """
+        unknown = set(variables) - set(TEMPLATE_VARIABLES)
+        if unknown:
+            raise ValueError(f"Unknown template variables: {sorted(unknown)}")
+        return self.parameters.replace(**variables)
+
+
+class TemplateStore:
+    """
+    Label templates persisted in a JSON file, or only kept in memory if no path is
+    given.
+
+    The `compile` callable converts the stored values to the label parameters, doing
+    all lookups and validations once when saving or loading a template.
+
+    The file is read again when it has been replaced by another process, only
+    compiling the changed templates. Changes are applied to the current content of the
+    file while holding the `lock_file`, thus multiple worker processes may share it.
+    """
+
+    def __init__(
+        self,
+        path: str | None,
+        compile: Callable[[Mapping[str, Any]], LabelParameters],
+        lock_file: str | None = None,
+    ) -> None:
+        self.path = path
+        self.compile = compile
+        self._templates: dict[str, LabelTemplate] = {}
+        self._lock = Lock()
+        self._process_lock = InterProcessLock(lock_file) if lock_file else None
+        # Identifies the version of the file the templates have been read from.
+        self._file_state: tuple[int, int, int] | None = None
+
+    def _create(
+        self, template_id: str, name: str, values: Mapping[str, Any]
+    ) -> LabelTemplate:
+        return LabelTemplate(
+            id=template_id,
+            name=name,
+            values=dict(values),
+            parameters=self.compile(values),
+        )
+
+    def _get_file_state(self) -> tuple[int, int, int] | None:
+        assert self.path
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # The file is replaced when writing it, changing its inode.
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    @contextmanager
+    def _locked_file(self) -> Iterator[None]:
+        if self._process_lock is None:
+            yield
+            return
+        self._process_lock.acquire()
+        try:
+            yield
+        finally:
+            self._process_lock.release()
+
+    def load(self) -> None:
+        with self._lock:
+            self._load()
+
+    def _load(self) -> None:
+        if not self.path:
+            return
+        state = self._get_file_state()
+        if state is None:
+            return
+        with open(self.path, mode="r") as fd:
+            parsed: dict[str, Any] = json.load(fd)
+        templates = {}
+        for item in parsed.get("templates", []):
+            current = self._templates.get(item.get("id"))
+            if current is not None and current.to_dict() == item:
+                # Unchanged, thus compiling it again is not required.
+                templates[current.id] = current
+                continue
+            try:
+                template = self._create(item["id"], item["name"], item["parameters"])
+            except (KeyError, LookupError, ValueError) as e:
+                logger.warning("Skipping invalid template %s: %s", item.get("id"), e)
+                continue
+            templates[template.id] = template
+        self._templates = templates
+        self._file_state = state
+
+    def _refresh(self) -> None:
+        if self.path and self._get_file_state() != self._file_state:
+            self._load()
+
+    def _write(self) -> None:
+        if not self.path:
+            return
+        data = {
+            "templates": [
+                template.to_dict() for template in self._sorted(self._templates)
+            ]
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        # Replace the file atomically to never leave a partially written one.
+        fd, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, mode="w") as temporary_file:
+                json.dump(data, temporary_file, indent=2)
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+        self._file_state = self._get_file_state()
+
+    @staticmethod
+    def _sorted(templates: dict[str, LabelTemplate]) -> list[LabelTemplate]:
+        return sorted(templates.values(), key=lambda template: template.name)
+
+    def list(self) -> list[LabelTemplate]:
+        with self._lock:
+            self._refresh()
+            return self._sorted(self._templates)
+
+    def get(self, template_id: str) -> LabelTemplate | None:
+        with self._lock:
+            self._refresh()
+            return self._templates.get(template_id)
+
+    def save(
+        self,
+        name: str,
+        values: Mapping[str, Any],
+        template_id: str | None = None,
+    ) -> LabelTemplate:
+        """
+        Create a new template or replace an existing one.
+
+        Might raise LookupError() or ValueError()
+        """
+        if not name:
+            raise ValueError("Please provide the name of the template")
+        with self._lock, self._locked_file():
+            # Apply the change to the templates saved by other processes meanwhile.
+            self._refresh()
+            if template_id is not None and template_id not in self._templates:
+                raise LookupError("Unknown template")
+            template = self._create(template_id or uuid.uuid4().hex, name, values)
+            self._templates[template.id] = template
+            self._write()
+        return template
+
+    def delete(self, template_id: str) -> bool:
+        with self._lock, self._locked_file():
+            self._refresh()
+            if self._templates.pop(template_id, None) is None:
+                return False
+            self._write()
+        return True
@@ -1,37 +1,179 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
-from dataclasses import dataclass
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
-from typing import cast, Literal
-
-from brother_ql import BrotherQLRaster, create_label
+from threading import Lock
+from typing import Any, cast, Iterable, Iterator, Mapping, NamedTuple
+
+from brother_ql import (
+    BrotherQLRaster,
+    BrotherQLRasterError,
+    BrotherQLUnsupportedCmd,
+    create_label,
+)
 from brother_ql.devicedependent import (
     ENDLESS_LABEL,
     DIE_CUT_LABEL,
     ROUND_DIE_CUT_LABEL,
     label_type_specs,
+    right_margin_addition,
 )
 from brother_ql.labels import FormFactor
+from brother_ql_web.caching import LRUCache
 from brother_ql_web.configuration import Configuration
+from brother_ql_web import images
+from brother_ql_web.geometry import (
+    get_cache_statistics as get_geometry_cache_statistics,
+    get_label_geometry,
+    LabelGeometry,
+)
+from brother_ql_web.layout import (
+    get_cache_statistics as get_layout_cache_statistics,
+    TextLayout,
+)
+from brother_ql_web.printing import BackendManager
+from brother_ql_web.raster import iter_raster_pages, RasterLabel
+from brother_ql_web.symbols import (
+    get_cache_statistics as get_symbol_cache_statistics,
+    get_symbol_matrix,
+    render_symbol,
+    SYMBOL_TYPES,
+)
 from brother_ql_web import utils
 from PIL import Image, ImageDraw, ImageFont
 
+try:
+    import numpy
+except ImportError:
+    numpy = None  # type: ignore[assignment]
+
 
 logger = logging.getLogger(__name__)
 del logging
 
+CONVERSION_MODES = ("threshold", "otsu", "bayer")
+
+_image_font_cache: LRUCache[tuple[str, int], ImageFont.FreeTypeFont] = LRUCache(
+    max_entries=32
+)
+_raster_cache: LRUCache[str, bytes] = LRUCache(
+    max_entries=4096, max_size=32 * 1024 * 1024, sizeof=len
+)
+
+
+def configure_caches(configuration: Configuration) -> None:
+    _image_font_cache.resize(max_entries=configuration.server.font_cache_size)
+    images.configure_cache(configuration.server.image_cache_size)
+    raster_cache_size = configuration.server.raster_cache_size
+    _raster_cache.resize(
+        max_entries=4096 if raster_cache_size > 0 else 0, max_size=raster_cache_size
+    )
 
-@dataclass
-class LabelParameters:
-    configuration: Configuration
 
+def get_cache_statistics() -> dict[str, dict[str, int]]:
+    return {
+        "fonts": _image_font_cache.statistics,
+        "geometries": get_geometry_cache_statistics(),
+        "images": images.get_cache_statistics(),
+        "line_metrics": get_layout_cache_statistics(),
+        "rasters": _raster_cache.statistics,
+        "symbols": get_symbol_cache_statistics(),
+    }
+
+
+def get_image_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    key = (path, size)
+    image_font = _image_font_cache.get(key)
+    if image_font is None:
+        image_font = ImageFont.truetype(path, size)
+        _image_font_cache.put(key, image_font)
+    return image_font
+
+
+# The API values of text labels and their JSON types.
+PARAMETER_TYPES: dict[str, type] = {
+    "text": str,
+    "font_family": str,
+    "font_size": int,
+    "label_size": str,
+    "threshold": int,
+    "align": str,
+    "orientation": str,
+    "margin_top": int,
+    "margin_bottom": int,
+    "margin_left": int,
+    "margin_right": int,
+    "label_count": int,
+    "cut_every": int,
+    "high_quality": bool,
+    "conversion_mode": str,
+    "barcode": str,
+    "barcode_type": str,
+    "barcode_module_size": int,
+    "barcode_height": int,
+}
+PARAMETER_NAMES = tuple(PARAMETER_TYPES)
+ALIGNMENTS = ("left", "center", "right")
+ORIENTATIONS = ("standard", "rotated")
+
+_FALSE_VALUES = ("", "0", "false", "no", "off")
+
+
+def _parse_int(values: Mapping[str, Any], name: str, default: int) -> int:
+    value = values.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid value for {name}: {value!r}")
+
+
+def _parse_bool(values: Mapping[str, Any], name: str, default: bool) -> bool:
+    value = values.get(name)
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() not in _FALSE_VALUES
+    return bool(value)
+
+
+def _resolve_font(
+    font: str | None, configuration: Configuration
+) -> tuple[str, str, str]:
+    """
+    Resolve the family, style and path of a font given as `Family (Style)`, falling
+    back to the configured default font.
+
+    Might raise LookupError()
+    """
+    if font:
+        family, _, style = font.rpartition("(")
+        font_family, font_style = family.strip(), style.rstrip(")").strip()
+    elif configuration.label.default_font is not None:
+        font_family = configuration.label.default_font.family
+        font_style = configuration.label.default_font.style
+    else:
+        raise LookupError("Couln't find the font & style")
+    try:
+        registry = utils.get_font_registry(configuration)
+        return font_family, font_style, registry.get_path(font_family, font_style)
+    except KeyError:
+        raise LookupError("Couln't find the font & style")
+
+
+class _LabelParameterValues(NamedTuple):
     font_family: str
     font_style: str
+    font_path: str
     text: str = ""
     font_size: int = 100
     label_size: str = "62"
-    margin: int = 10
     threshold: int = 70
     align: str = "center"
     orientation: str = "standard"
@@ -40,96 +182,273 @@ class LabelParameters:
     margin_left: int = 35
     margin_right: int = 35
     label_count: int = 1
+    # Cut after every n labels, or only after the last one for 0.
+    cut_every: int = 1
     high_quality: bool = True
+    conversion_mode: str = "threshold"
+    image_data: bytes | None = None
+    image_hash: str | None = None
+    barcode: str = ""
+    barcode_type: str = "code128"
+    barcode_module_size: int = 3
+    barcode_height: int = 80
+
+
+class LabelParameters(_LabelParameterValues):
+    """
+    Immutable, validated parameters of a single label.
+
+    Use `parse()` to create them from untrusted input, which normalizes and validates
+    all values and resolves the font before any image is drawn.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def parse(
+        cls,
+        values: Mapping[str, Any],
+        configuration: Configuration,
+        image_data: bytes | None = None,
+    ) -> LabelParameters:
+        """
+        Create the parameters from the API values, using the keys of
+        `PARAMETER_NAMES`. The font is given as `font_family` in the form
+        `Family (Style)` and defaults to the configured one.
+
+        Might raise LookupError() or ValueError()
+        """
+        if image_data is None:
+            font_family, font_style, font_path = _resolve_font(
+                values.get("font_family"), configuration=configuration
+            )
+        else:
+            # Image labels do not contain any text.
+            font_family = font_style = font_path = ""
+
+        parameters = cls(
+            font_family=font_family,
+            font_style=font_style,
+            font_path=font_path,
+            text=str(values.get("text") or ""),
+            font_size=_parse_int(values, "font_size", 100),
+            label_size=str(values.get("label_size") or "62"),
+            threshold=_parse_int(values, "threshold", 70),
+            align=str(values.get("align") or "center"),
+            orientation=str(values.get("orientation") or "standard"),
+            margin_top=_parse_int(values, "margin_top", 24),
+            margin_bottom=_parse_int(values, "margin_bottom", 45),
+            margin_left=_parse_int(values, "margin_left", 35),
+            margin_right=_parse_int(values, "margin_right", 35),
+            label_count=_parse_int(values, "label_count", 1),
+            cut_every=_parse_int(values, "cut_every", 1),
+            high_quality=_parse_bool(values, "high_quality", True),
+            conversion_mode=str(values.get("conversion_mode") or "threshold"),
+            image_data=image_data,
+            image_hash=images.get_image_hash(image_data) if image_data else None,
+            barcode=str(values.get("barcode") or ""),
+            barcode_type=str(values.get("barcode_type") or "code128"),
+            barcode_module_size=_parse_int(values, "barcode_module_size", 3),
+            barcode_height=_parse_int(values, "barcode_height", 80),
+        )
+        return parameters.validate()
+
+    def validate(self) -> LabelParameters:
+        """
+        Check the values for consistency, returning the parameters themselves.
+
+        Might raise LookupError() or ValueError()
+        """
+        if self.label_size not in label_type_specs:
+            raise LookupError("Unknown label_size")
+        if self.orientation not in ORIENTATIONS:
+            raise ValueError(f"Unknown orientation: {self.orientation}")
+        if self.align not in ALIGNMENTS:
+            raise ValueError(f"Unknown alignment: {self.align}")
+        if self.conversion_mode not in CONVERSION_MODES:
+            raise ValueError(f"Unknown conversion mode: {self.conversion_mode}")
+        if self.barcode_type not in SYMBOL_TYPES:
+            raise ValueError(f"Unknown barcode type: {self.barcode_type}")
+        if self.font_size < 1:
+            raise ValueError("The font size has to be positive")
+        if not 0 <= self.threshold <= 100:
+            raise ValueError("The threshold has to be between 0 and 100")
+        if (
+            min(self.margin_top, self.margin_bottom) < 0
+            or min(self.margin_left, self.margin_right) < 0
+        ):
+            raise ValueError("The margins must not be negative")
+        if self.label_count < 1:
+            raise ValueError("The label count has to be at least 1")
+        if not 0 <= self.cut_every <= 255:
+            raise ValueError("The cut interval has to be between 0 and 255")
+        if self.barcode_module_size < 1:
+            raise ValueError("The module size has to be at least one dot")
+        if self.barcode_height < 1:
+            raise ValueError("The barcode height has to be at least one dot")
+        if self.conversion_mode != "threshold" and (numpy is None or self.is_red):
+            raise ValueError(
+                f"The {self.conversion_mode} conversion mode requires NumPy and "
+                "is not available for red labels"
+            )
+        if self.barcode:
+            # Encode the data, which is cached for rendering the label.
+            get_symbol_matrix(self.barcode_type, self.barcode)
+        return self
+
+    def replace(self, **changes: Any) -> LabelParameters:
+        """
+        Derive new parameters with the given values changed.
+
+        Might raise LookupError() or ValueError()
+        """
+        if "image_data" in changes:
+            image_data = changes["image_data"]
+            changes["image_hash"] = (
+                images.get_image_hash(image_data) if image_data else None
+            )
+        return self._replace(**changes).validate()
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Canonical representation using the keys of `PARAMETER_NAMES`, which can be
+        passed to `parse()` again. Images are not included.
+        """
+        values = self._asdict()
+        values["font_family"] = f"{self.font_family} ({self.font_style})"
+        return {name: values[name] for name in PARAMETER_NAMES}
 
     @property
-    def kind(self) -> FormFactor:
-        return cast(FormFactor, label_type_specs[self.label_size]["kind"])
+    def canonical(self) -> str:
+        """
+        Stable JSON form of `to_dict()`, suitable as a cache key or for transferring
+        the parameters.
+        """
+        return json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":"))
+
+    @property
+    def geometry(self) -> LabelGeometry:
+        return get_label_geometry(
+            label_size=self.label_size,
+            orientation=self.orientation,
+            font_size=self.font_size,
+            margins=(
+                self.margin_top,
+                self.margin_bottom,
+                self.margin_left,
+                self.margin_right,
+            ),
+        )
 
-    def _scale_margin(self, margin: int) -> int:
-        return int(self.font_size * margin / 100.0)
+    @property
+    def kind(self) -> FormFactor:
+        return self.geometry.kind
 
     @property
     def margin_top_scaled(self) -> int:
-        return self._scale_margin(self.margin_top)
+        return self.geometry.margin_top
 
     @property
     def margin_bottom_scaled(self) -> int:
-        return self._scale_margin(self.margin_bottom)
+        return self.geometry.margin_bottom
 
     @property
     def margin_left_scaled(self) -> int:
-        return self._scale_margin(self.margin_left)
+        return self.geometry.margin_left
 
     @property
     def margin_right_scaled(self) -> int:
-        return self._scale_margin(self.margin_right)
+        return self.geometry.margin_right
+
+    @property
+    def is_red(self) -> bool:
+        """
+        Whether the label is printed in black and red.
+        """
+        return self.geometry.is_die_cut and "red" in self.label_size
 
     @property
     def fill_color(self) -> tuple[int, int, int]:
         return (255, 0, 0) if "red" in self.label_size else (0, 0, 0)
 
     @property
-    def font_path(self) -> str:
-        try:
-            if self.font_family is None or self.font_style is None:
-                self.font_family = self.configuration.label.default_font.family
-                self.font_style = self.configuration.label.default_font.style
-            fonts = utils.collect_fonts(self.configuration)
-            path = fonts[self.font_family][self.font_style]
-        except KeyError:
-            raise LookupError("Couln't find the font & style")
-        return path
+    def symbol_spacing(self) -> int:
+        """
+        Space between the text and the barcode in dots.
+        """
+        return 2 * self.barcode_module_size
 
     @property
-    def width_height(self) -> tuple[int, int]:
-        try:
-            width, height = cast(
-                tuple[int, int], label_type_specs[self.label_size]["dots_printable"]
-            )
-        except KeyError:
-            raise LookupError("Unknown label_size")
+    def image_mode(self) -> str:
+        """
+        Black labels are drawn in grayscale, which `brother_ql` converts to anyway.
+        """
+        return "L" if self.fill_color == (0, 0, 0) else "RGB"
+
+    @property
+    def image_key(self) -> str:
+        """
+        Content hash of all values influencing the label image, including the identity
+        of the font file or the content of the image.
+        """
+        if self.image_data is not None:
+            values: list[object] = [self.image_hash, self.label_size, self.orientation]
+            return hashlib.sha256(json.dumps(values).encode("utf-8")).hexdigest()
+        font_stat = os.stat(self.font_path)
+        values = [
+            self.text,
+            self.font_path,
+            font_stat.st_size,
+            font_stat.st_mtime_ns,
+            self.font_size,
+            self.label_size,
+            self.align,
+            self.orientation,
+            self.margin_top,
+            self.margin_bottom,
+            self.margin_left,
+            self.margin_right,
+            self.barcode,
+            self.barcode_type,
+            self.barcode_module_size,
+            self.barcode_height,
+        ]
+        return hashlib.sha256(json.dumps(values).encode("utf-8")).hexdigest()
 
-        if height > width:
-            width, height = height, width
-        if self.orientation == "rotated":
-            height, width = width, height
-        return width, height
+    @property
+    def width_height(self) -> tuple[int, int]:
+        geometry = self.geometry
+        return geometry.width, geometry.height
 
     @property
     def width(self) -> int:
-        return self.width_height[0]
+        return self.geometry.width
 
     @property
     def height(self) -> int:
-        return self.width_height[1]
+        return self.geometry.height
 
 
 def _determine_image_dimensions(
-    text: str, image_font: ImageFont.FreeTypeFont, parameters: LabelParameters
+    layout: TextLayout,
+    geometry: LabelGeometry,
+    symbol: Image.Image | None = None,
+    symbol_spacing: int = 0,
 ) -> tuple[int, int, int, int]:
-    image = Image.new("L", (20, 20), "white")
-    draw = ImageDraw.Draw(image)
-
-    left, top, right, bottom = draw.multiline_textbbox(
-        xy=(0, 0), text=text, font=image_font
-    )
-    text_width, text_height = (right - left, bottom - top)
-    width, height = parameters.width_height
-    if parameters.orientation == "standard":
-        if parameters.kind in (ENDLESS_LABEL,):
-            height = (
-                text_height
-                + parameters.margin_top_scaled
-                + parameters.margin_bottom_scaled
-            )
-    elif parameters.orientation == "rotated":
-        if parameters.kind in (ENDLESS_LABEL,):
-            width = (
-                text_width
-                + parameters.margin_left_scaled
-                + parameters.margin_right_scaled
-            )
+    """
+    Determine the size of the label and of its content, being the text and the
+    optional barcode below it.
+    """
+    text_width, text_height = layout.width, layout.height
+    if symbol is not None:
+        text_width = max(text_width, symbol.size[0])
+        text_height += symbol_spacing + symbol.size[1]
+    width, height = geometry.width, geometry.height
+    if geometry.is_endless:
+        if geometry.orientation == "standard":
+            height = text_height + geometry.margin_top + geometry.margin_bottom
+        elif geometry.orientation == "rotated":
+            width = text_width + geometry.margin_left + geometry.margin_right
     return width, height, text_width, text_height
 
 
@@ -138,31 +457,49 @@ def _determine_text_offsets(
     width: int,
     text_height: int,
     text_width: int,
-    parameters: LabelParameters,
+    geometry: LabelGeometry,
 ) -> tuple[int, int]:
-    if parameters.orientation == "standard":
-        if parameters.kind in (DIE_CUT_LABEL, ROUND_DIE_CUT_LABEL):
+    if geometry.orientation == "standard":
+        if geometry.is_die_cut:
             vertical_offset = (height - text_height) // 2
-            vertical_offset += (
-                parameters.margin_top_scaled - parameters.margin_bottom_scaled
-            ) // 2
+            vertical_offset += (geometry.margin_top - geometry.margin_bottom) // 2
         else:
-            vertical_offset = parameters.margin_top_scaled
+            vertical_offset = geometry.margin_top
         horizontal_offset = max((width - text_width) // 2, 0)
-    elif parameters.orientation == "rotated":
+    elif geometry.orientation == "rotated":
         vertical_offset = (height - text_height) // 2
-        vertical_offset += (
-            parameters.margin_top_scaled - parameters.margin_bottom_scaled
-        ) // 2
-        if parameters.kind in (DIE_CUT_LABEL, ROUND_DIE_CUT_LABEL):
+        vertical_offset += (geometry.margin_top - geometry.margin_bottom) // 2
+        if geometry.is_die_cut:
             horizontal_offset = max((width - text_width) // 2, 0)
         else:
-            horizontal_offset = parameters.margin_left_scaled
+            horizontal_offset = geometry.margin_left
     return horizontal_offset, vertical_offset
 
 
+def _create_image_label_image(parameters: LabelParameters) -> Image.Image:
+    assert parameters.image_data is not None
+    geometry = parameters.geometry
+    width, height = geometry.width, geometry.height
+    if geometry.is_endless:
+        # The length of endless labels follows the aspect ratio of the image.
+        if geometry.orientation == "standard":
+            height = 0
+        else:
+            width = 0
+    return images.get_fitted_image(
+        parameters.image_data,
+        width=width,
+        height=height,
+        mode=parameters.image_mode,
+        data_hash=parameters.image_hash,
+    )
+
+
 def create_label_image(parameters: LabelParameters) -> Image.Image:
-    image_font = ImageFont.truetype(parameters.font_path, parameters.font_size)
+    if parameters.image_data is not None:
+        return _create_image_label_image(parameters)
+
+    image_font = get_image_font(parameters.font_path, parameters.font_size)
 
     # Workaround for a bug in multiline_textsize()
     # when there are empty lines in the text:
@@ -171,25 +508,50 @@ def create_label_image(parameters: LabelParameters) -> Image.Image:
         if line == "":
             line = " "
         lines.append(line)
-    text = "\n".join(lines)
-
-    width, height, text_width, text_height = _determine_image_dimensions(
-        text=text, image_font=image_font, parameters=parameters
+    layout = TextLayout.create(text="\n".join(lines), font=image_font)
+    symbol = None
+    if parameters.barcode:
+        symbol = render_symbol(
+            parameters.barcode_type,
+            parameters.barcode,
+            module_size=parameters.barcode_module_size,
+            height=parameters.barcode_height,
+        )
+
+    geometry = parameters.geometry
+    width, height, content_width, content_height = _determine_image_dimensions(
+        layout=layout,
+        geometry=geometry,
+        symbol=symbol,
+        symbol_spacing=parameters.symbol_spacing,
     )
-    offset = _determine_text_offsets(
+    horizontal_offset, vertical_offset = _determine_text_offsets(
         width=width,
         height=height,
-        text_width=text_width,
-        text_height=text_height,
-        parameters=parameters,
+        text_width=content_width,
+        text_height=content_height,
+        geometry=geometry,
     )
 
-    image = Image.new("RGB", (width, height), "white")
-    draw = ImageDraw.Draw(image)
-    align = cast(Literal["left", "center", "right"], parameters.align)
-    draw.multiline_text(
-        offset, text, parameters.fill_color, font=image_font, align=align
+    mode = parameters.image_mode
+    image = Image.new(mode, (width, height), "white")
+    fill = parameters.fill_color if mode == "RGB" else 0
+    offset = (
+        horizontal_offset + (content_width - layout.width) // 2,
+        vertical_offset,
     )
+    layout.draw(ImageDraw.Draw(image), offset, fill, align=parameters.align)
+    if symbol is not None:
+        if symbol.size[0] > width:
+            raise ValueError("The barcode does not fit on the label")
+        # Paste at dot resolution below the text, keeping the bars crisp.
+        image.paste(
+            symbol,
+            (
+                horizontal_offset + (content_width - symbol.size[0]) // 2,
+                vertical_offset + int(layout.bbox[3]) + parameters.symbol_spacing,
+            ),
+        )
     return image
 
 
@@ -200,47 +562,343 @@ def image_to_png_bytes(image: Image.Image) -> bytes:
     return image_buffer.read()
 
 
+def _get_raster_key(
+    parameters: LabelParameters, configuration: Configuration, **kwargs: object
+) -> str:
+    values = [
+        parameters.image_key,
+        configuration.printer.model,
+        parameters.threshold,
+        parameters.high_quality,
+        parameters.conversion_mode,
+        sorted(kwargs.items()),
+    ]
+    return hashlib.sha256(json.dumps(values).encode("utf-8")).hexdigest()
+
+
+def _prepare_raster_image(
+    image: Image.Image,
+    label_size: str,
+    device_pixel_width: int,
+    right_margin_dots: int,
+    rotate: int | str,
+    dpi_600: bool,
+) -> Image.Image:
+    """
+    Rotate, scale and pad the image to the printer width like `brother_ql` does.
+    """
+    label_specs = label_type_specs[label_size]
+    dots_printable = cast(tuple[int, int], label_specs["dots_printable"])
+    if label_specs["kind"] == ENDLESS_LABEL:
+        if rotate not in ("auto", 0):
+            image = image.rotate(int(rotate), expand=True)
+        if dpi_600:
+            image = image.resize((image.size[0] // 2, image.size[1]))
+        if image.size[0] != dots_printable[0]:
+            height = int((dots_printable[0] / image.size[0]) * image.size[1])
+            image = image.resize((dots_printable[0], height), Image.LANCZOS)
+        if image.size[0] >= device_pixel_width:
+            return image
+        height = image.size[1]
+    else:
+        dots_expected = dots_printable
+        if dpi_600:
+            dots_expected = (dots_printable[0] * 2, dots_printable[1] * 2)
+        if rotate == "auto":
+            if image.size == (dots_expected[1], dots_expected[0]):
+                image = image.rotate(90, expand=True)
+        elif rotate != 0:
+            image = image.rotate(int(rotate), expand=True)
+        if image.size != dots_expected:
+            raise ValueError(
+                f"Bad image dimensions: {image.size}. Expecting: {dots_expected}."
+            )
+        if dpi_600:
+            image = image.resize((image.size[0] // 2, image.size[1]))
+        height = dots_expected[1]
+    padded = Image.new(image.mode, (device_pixel_width, height), "white")
+    padded.paste(image, (device_pixel_width - image.size[0] - right_margin_dots, 0))
+    return padded
+
+
+def _get_otsu_threshold(pixels: numpy.ndarray) -> int:
+    """
+    Determine the gray level separating the dark from the light pixels with the least
+    variance inside both classes.
+    """
+    histogram = numpy.bincount(pixels.ravel(), minlength=256).astype(numpy.float64)
+    levels = numpy.arange(256, dtype=numpy.float64)
+    weight_dark = numpy.cumsum(histogram)
+    weight_light = weight_dark[-1] - weight_dark
+    sum_dark = numpy.cumsum(histogram * levels)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        mean_dark = sum_dark / weight_dark
+        mean_light = (sum_dark[-1] - sum_dark) / weight_light
+        variance = weight_dark * weight_light * (mean_dark - mean_light) ** 2
+    return int(numpy.argmax(numpy.nan_to_num(variance)))
+
+
+def _get_bayer_matrix(size: int = 8) -> numpy.ndarray:
+    matrix = numpy.array([[0, 2], [3, 1]])
+    while matrix.shape[0] < size:
+        matrix = numpy.block(
+            [[4 * matrix, 4 * matrix + 2], [4 * matrix + 3, 4 * matrix + 1]]
+        )
+    return matrix
+
+
+def convert_to_dots(
+    pixels: numpy.ndarray, mode: str = "threshold", threshold: int = 70
+) -> numpy.ndarray:
+    """
+    Determine the pixels of the grayscale image to print, as boolean array.
+
+    * `threshold` prints all pixels being darker than the given threshold in percent,
+      like `brother_ql` does.
+    * `otsu` determines the threshold from the histogram of the image.
+    * `bayer` approximates gray tones using ordered dithering.
+
+    Might raise ValueError()
+    """
+    if mode == "threshold":
+        threshold_value = min(255, max(0, int((100.0 - threshold) / 100.0 * 255)))
+        return cast(numpy.ndarray, pixels <= 255 - threshold_value)
+    if mode == "otsu":
+        return cast(numpy.ndarray, pixels <= _get_otsu_threshold(pixels))
+    if mode == "bayer":
+        matrix = _get_bayer_matrix()
+        height, width = pixels.shape
+        size = matrix.shape[0]
+        tiled = numpy.tile(matrix, (height // size + 1, width // size + 1))
+        limits = (tiled[:height, :width] + 0.5) * (256 / matrix.size)
+        return cast(numpy.ndarray, pixels < limits)
+    raise ValueError(f"Unknown conversion mode: {mode}")
+
+
+def _create_label_fast(
+    qlr: BrotherQLRaster,
+    image: Image.Image,
+    label_size: str,
+    threshold: int = 70,
+    cut: bool = True,
+    rotate: int | str = "auto",
+    dpi_600: bool = False,
+    conversion_mode: str = "threshold",
+) -> None:
+    """
+    Equivalent of `brother_ql.create_label()` for black labels without compression,
+    producing the same raster data for the `threshold` conversion mode. Converting,
+    mirroring and packing the rows is done by NumPy instead of line by line.
+    """
+    label_specs = label_type_specs[label_size]
+    image = _prepare_raster_image(
+        image,
+        label_size=label_size,
+        device_pixel_width=qlr.get_pixel_width(),
+        right_margin_dots=(
+            cast(int, label_specs["right_margin_dots"])
+            + right_margin_addition.get(qlr.model, 0)
+        ),
+        rotate=rotate,
+        dpi_600=dpi_600,
+    )
+    if image.size[0] != qlr.get_pixel_width():
+        raise BrotherQLRasterError(
+            f"Wrong pixel width: {image.size[0]}, expected {qlr.get_pixel_width()}"
+        )
+
+    pixels = numpy.asarray(image.convert("L"))
+    dots = convert_to_dots(pixels, mode=conversion_mode, threshold=threshold)
+    dots = numpy.packbits(dots[:, ::-1], axis=1)
+    rows = numpy.empty((dots.shape[0], dots.shape[1] + 3), dtype=numpy.uint8)
+    rows[:, 0] = 0x67
+    rows[:, 1] = 0x00
+    rows[:, 2] = dots.shape[1]
+    rows[:, 3:] = dots
+
+    try:
+        qlr.add_switch_mode()
+    except BrotherQLUnsupportedCmd:
+        pass
+    qlr.add_invalidate()
+    qlr.add_initialize()
+    try:
+        qlr.add_switch_mode()
+    except BrotherQLUnsupportedCmd:
+        pass
+    qlr.add_status_information()
+    tape_size = cast(tuple[int, int], label_specs["tape_size"])
+    if label_specs["kind"] in (DIE_CUT_LABEL, ROUND_DIE_CUT_LABEL):
+        qlr.mtype = 0x0B
+        qlr.mwidth = tape_size[0]
+        qlr.mlength = tape_size[1]
+    else:
+        qlr.mtype = 0x0A
+        qlr.mwidth = tape_size[0]
+        qlr.mlength = 0
+    qlr.pquality = True
+    qlr.add_media_and_quality(image.size[1])
+    try:
+        if cut:
+            qlr.add_autocut(True)
+            qlr.add_cut_every(1)
+    except BrotherQLUnsupportedCmd:
+        pass
+    try:
+        qlr.dpi_600 = dpi_600
+        qlr.cut_at_end = cut
+        qlr.two_color_printing = False
+        qlr.add_expanded_mode()
+    except BrotherQLUnsupportedCmd:
+        pass
+    qlr.add_margins(cast(int, label_specs["feed_margin"]))
+    qlr.data += rows.tobytes()
+    qlr.add_print()
+
+
 def generate_label(
     parameters: LabelParameters,
     configuration: Configuration,
     save_image_to: str | None = None,
 ) -> BrotherQLRaster:
+    geometry = parameters.geometry
+    rotate = geometry.rotate
+    red = parameters.is_red
+
+    qlr = BrotherQLRaster(configuration.printer.model)
+    key = _get_raster_key(
+        parameters=parameters, configuration=configuration, red=red, rotate=rotate
+    )
+    data = None if save_image_to else _raster_cache.get(key)
+    if data is not None:
+        # Repeated label, thus skip the image generation and conversion.
+        qlr.data = data
+        return qlr
+
     image = create_label_image(parameters)
     if save_image_to:
         image.save(save_image_to)
 
-    red: bool = False
-    rotate: int | str = 0
-    if parameters.kind == ENDLESS_LABEL:
-        rotate = 0 if parameters.orientation == "standard" else 90
-    elif parameters.kind in (ROUND_DIE_CUT_LABEL, DIE_CUT_LABEL):
-        rotate = "auto"
-        red = "red" in parameters.label_size
-
-    qlr = BrotherQLRaster(configuration.printer.model)
-    create_label(
-        qlr,
-        image,
-        parameters.label_size,
-        red=red,
-        threshold=parameters.threshold,
-        cut=True,
-        rotate=rotate,
-        dpi_600=parameters.high_quality,
-    )
+    if numpy is not None and not red:
+        _create_label_fast(
+            qlr,
+            image,
+            parameters.label_size,
+            threshold=parameters.threshold,
+            cut=True,
+            rotate=rotate,
+            dpi_600=parameters.high_quality,
+            conversion_mode=parameters.conversion_mode,
+        )
+    elif parameters.conversion_mode != "threshold":
+        raise ValueError(
+            f"The {parameters.conversion_mode} conversion mode requires NumPy and "
+            "is not available for red labels"
+        )
+    else:
+        create_label(
+            qlr,
+            image,
+            parameters.label_size,
+            red=red,
+            threshold=parameters.threshold,
+            cut=True,
+            rotate=rotate,
+            dpi_600=parameters.high_quality,
+        )
+    _raster_cache.put(key, qlr.data)
 
     return qlr
 
 
+def _generate_label_data(
+    parameters: LabelParameters, configuration: Configuration
+) -> bytes:
+    return generate_label(parameters=parameters, configuration=configuration).data
+
+
+def _initialize_render_process(
+    configuration: Configuration, fonts: dict[str, dict[str, str]]
+) -> None:
+    # Reuse the fonts of the parent process instead of scanning for them again.
+    utils.set_font_registry(utils.FontRegistry(configuration, fonts=fonts))
+    configure_caches(configuration)
+
+
+class LabelRenderPool:
+    """
+    Pool of worker processes to render multiple labels in parallel.
+
+    The worker processes are started on first use and only once per server process.
+    A maximum of 0 processes uses one process per CPU.
+    """
+
+    def __init__(self, configuration: Configuration, max_processes: int = 0) -> None:
+        self.configuration = configuration
+        self.max_processes = max_processes
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = Lock()
+        self._pid = os.getpid()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker process, which does not inherit the worker processes.
+                self._pid = os.getpid()
+                self._executor = None
+            if self._executor is None:
+                fonts = utils.get_font_registry(self.configuration).fonts
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_processes or os.cpu_count() or 1,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_initialize_render_process,
+                    initargs=(self.configuration, fonts),
+                )
+            return self._executor
+
+    def render(
+        self,
+        parameters: Iterable[LabelParameters],
+        configuration: Configuration | None = None,
+    ) -> Iterator[bytes | Exception]:
+        """
+        Render the given labels in parallel for the printer of the given
+        configuration, yielding the raster data or the error of each label in the
+        original order.
+        """
+        executor = self._get_executor()
+        configuration = configuration or self.configuration
+        futures = [
+            executor.submit(_generate_label_data, item, configuration)
+            for item in parameters
+        ]
+        for future in futures:
+            try:
+                yield future.result()
+            except Exception as e:
+                yield e
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=True)
+
+
 def print_label(
     parameters: LabelParameters,
     qlr: BrotherQLRaster,
-    configuration: Configuration,
-    backend_class: type,
+    backend_manager: BackendManager,
 ) -> None:
-    backend = backend_class(configuration.printer.printer)
-    for i in range(parameters.label_count):
-        logger.info("Printing label %d of %d ...", i, parameters.label_count)
-        backend.write(qlr.data)
-    backend.dispose()
-    del backend
+    """
+    Print the copies of the label as a single raster stream.
+
+    Might raise ValueError()
+    """
+    pages = iter_raster_pages(
+        [RasterLabel(qlr.data, parameters.label_count, parameters.cut_every)]
+    )
+    with backend_manager.session():
+        for i, data in enumerate(pages):
+            logger.info("Printing label %d of %d ...", i, parameters.label_count)
+            backend_manager.write(data)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Tuple
+
+from brother_ql_web.caching import LRUCache
+from PIL import ImageDraw, ImageFont
+
+
+# The spacing between lines used by Pillow for multiline text.
+LINE_SPACING = 4
+
+# The font mode used by Pillow for measuring and drawing text on L and RGB images.
+_FONT_MODE = "L"
+
+_LineMetrics = Tuple[float, Tuple[float, float, float, float]]
+
+_line_metrics_cache: LRUCache[tuple[str, float, str], _LineMetrics] = LRUCache(
+    max_entries=4096
+)
+
+
+def get_cache_statistics() -> dict[str, int]:
+    return _line_metrics_cache.statistics
+
+
+def _get_line_metrics(font: ImageFont.FreeTypeFont, line: str) -> _LineMetrics:
+    """
+    Retrieve the advance width and the bounding box of the given line, measured once
+    per font, size and line.
+    """
+    key = (str(font.path), font.size, line)
+    metrics = _line_metrics_cache.get(key)
+    if metrics is None:
+        metrics = (
+            font.getlength(line, _FONT_MODE),
+            font.getbbox(line, _FONT_MODE),
+        )
+        _line_metrics_cache.put(key, metrics)
+    return metrics
+
+
+@dataclass(frozen=True)
+class TextLayout:
+    """
+    Measured lines of a multiline text, ready to be drawn.
+
+    The positions of the lines match the ones `ImageDraw.multiline_text()` uses, thus
+    drawing the layout results in the same image, but each line is measured only once
+    and without any scratch image.
+    """
+
+    font: ImageFont.FreeTypeFont
+    lines: tuple[str, ...]
+    widths: tuple[float, ...]
+    line_spacing: float
+    bbox: tuple[float, float, float, float]
+
+    @classmethod
+    def create(cls, text: str, font: ImageFont.FreeTypeFont) -> TextLayout:
+        lines = tuple(text.split("\n"))
+        metrics = [_get_line_metrics(font, line) for line in lines]
+        line_spacing = _get_line_metrics(font, "A")[1][3] + LINE_SPACING
+
+        # The bounding box of the lines aligned to the left.
+        bbox = metrics[0][1]
+        top: float = 0
+        for _, (left, line_top, right, bottom) in metrics[1:]:
+            top += line_spacing
+            bbox = (
+                min(bbox[0], left),
+                min(bbox[1], line_top + top),
+                max(bbox[2], right),
+                max(bbox[3], bottom + top),
+            )
+        return cls(
+            font=font,
+            lines=lines,
+            widths=tuple(width for width, _ in metrics),
+            line_spacing=line_spacing,
+            bbox=bbox,
+        )
+
+    @property
+    def width(self) -> int:
+        return int(self.bbox[2] - self.bbox[0])
+
+    @property
+    def height(self) -> int:
+        return int(self.bbox[3] - self.bbox[1])
+
+    def draw(
+        self,
+        draw: ImageDraw.ImageDraw,
+        xy: tuple[int, int],
+        fill: int | tuple[int, int, int],
+        align: str = "left",
+    ) -> None:
+        max_width = max(self.widths)
+        top: float = xy[1]
+        for line, width in zip(self.lines, self.widths):
+            left: float = xy[0]
+            if align == "center":
+                left += (max_width - width) / 2.0
+            elif align == "right":
+                left += max_width - width
+            elif align != "left":
+                raise ValueError('align must be "left", "center" or "right"')
+            draw.text((left, top), line, fill, font=self.font)
+            top += self.line_spacing
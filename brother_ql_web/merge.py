@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import string
+from typing import Any, BinaryIO, Iterator, Mapping, Sequence
+
+from brother_ql_web.configuration import Configuration
+from brother_ql_web.labels import generate_label, LabelParameters
+from brother_ql_web.raster import RasterLabel
+
+MERGE_FORMATS = ("csv", "jsonl")
+
+
+class _TemplateFormatter(string.Formatter):
+    def get_field(
+        self, field_name: str, args: Sequence[Any], kwargs: Mapping[str, Any]
+    ) -> tuple[Any, str]:
+        # Only allow plain column names, not attribute or index lookups.
+        try:
+            return kwargs[field_name], field_name
+        except KeyError:
+            raise LookupError(f"Unknown column: {field_name}")
+
+
+_formatter = _TemplateFormatter()
+
+
+def guess_format(filename: str) -> str:
+    return "jsonl" if filename.lower().endswith((".jsonl", ".json")) else "csv"
+
+
+def iter_rows(file: BinaryIO, format: str) -> Iterator[dict[str, Any]]:
+    """
+    Read the rows of the given CSV (with a header line) or JSON lines file one after
+    another.
+
+    Might raise ValueError()
+    """
+    if format not in MERGE_FORMATS:
+        raise ValueError(f"Unknown merge format: {format}")
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        if format == "csv":
+            yield from csv.DictReader(text)
+            return
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Invalid JSON in line {line_number}: {e}")
+            if not isinstance(row, dict):
+                raise ValueError(f"Line {line_number} is not a JSON object")
+            yield row
+    finally:
+        # Do not close the underlying file.
+        text.detach()
+
+
+def fill_template(template: str, row: Mapping[str, Any]) -> str:
+    """
+    Replace the `{column}` placeholders of the template with the values of the row.
+
+    Might raise LookupError() or ValueError()
+    """
+    return _formatter.vformat(template, (), row)
+
+
+def iter_merged_parameters(
+    rows: Iterator[dict[str, Any]], parameters: LabelParameters
+) -> Iterator[LabelParameters]:
+    """
+    Derive the parameters of one label per row, using the text of the given
+    parameters as template.
+    """
+    for row_number, row in enumerate(rows, start=1):
+        try:
+            text = fill_template(parameters.text, row)
+        except (LookupError, ValueError) as e:
+            raise type(e)(f"Row {row_number}: {e}")
+        yield parameters.replace(text=text)
+
+
+def count_merged_labels(
+    file: BinaryIO, format: str, parameters: LabelParameters
+) -> int:
+    """
+    Check all rows against the template without rendering them, returning the total
+    number of labels to print.
+
+    Might raise LookupError() or ValueError()
+    """
+    rows = sum(1 for _ in iter_merged_parameters(iter_rows(file, format), parameters))
+    return rows * parameters.label_count
+
+
+def iter_merged_labels(
+    file: BinaryIO,
+    format: str,
+    parameters: LabelParameters,
+    configuration: Configuration,
+) -> Iterator[RasterLabel]:
+    """
+    Render the labels of the rows lazily, yielding each label as soon as it is
+    available, to be combined into a single raster stream by
+    `raster.iter_raster_pages()`.
+
+    Might raise LookupError() or ValueError()
+    """
+    return (
+        RasterLabel(
+            generate_label(parameters=row_parameters, configuration=configuration).data,
+            copies=row_parameters.label_count,
+            cut_every=row_parameters.cut_every,
+        )
+        for row_parameters in iter_merged_parameters(
+            iter_rows(file, format), parameters
+        )
+    )
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import base64
+from contextlib import contextmanager
+from dataclasses import dataclass
+from threading import Lock
+from typing import Iterator
+
+from brother_ql_web.caching import LRUCache
+
+
+class _PreviewClient:
+    def __init__(self) -> None:
+        self.latest_sequence = 0
+        self.lock = Lock()
+        self.render_lock = Lock()
+
+
+class PreviewSequencer:
+    """
+    Track the preview requests of each client to skip rendering outdated previews.
+
+    Clients number their preview requests. Renderings of the same client are
+    serialized, and a request waiting for its turn is dropped as soon as a request
+    with a higher sequence number has been received from the same client.
+    """
+
+    def __init__(self, max_clients: int = 1024) -> None:
+        self._clients: LRUCache[str, _PreviewClient] = LRUCache(max_entries=max_clients)
+        self._lock = Lock()
+
+    def _get_client(self, client_id: str) -> _PreviewClient:
+        with self._lock:
+            client = self._clients.get(client_id)
+            if client is None:
+                client = _PreviewClient()
+                self._clients.put(client_id, client)
+            return client
+
+    def announce(self, client_id: str, sequence: int) -> _PreviewClient:
+        client = self._get_client(client_id)
+        with client.lock:
+            client.latest_sequence = max(client.latest_sequence, sequence)
+        return client
+
+    @contextmanager
+    def render(self, client_id: str | None, sequence: int) -> Iterator[bool]:
+        """
+        Wait for the rendering slot of the given client and yield whether the request
+        is still the most recent one and thus should be rendered at all.
+        """
+        if not client_id:
+            yield True
+            return
+        client = self.announce(client_id, sequence)
+        with client.render_lock:
+            yield sequence >= client.latest_sequence
+
+
+@dataclass(frozen=True)
+class CachedPreview:
+    png: bytes
+    base64: bytes
+
+    @classmethod
+    def from_png(cls, png: bytes) -> CachedPreview:
+        return cls(png=png, base64=base64.b64encode(png))
+
+    @property
+    def size(self) -> int:
+        return len(self.png) + len(self.base64)
+
+
+def create_preview_cache(max_size: int) -> LRUCache[str, CachedPreview]:
+    """
+    Create a cache for encoded previews keyed by `LabelParameters.image_key`, bounded
+    by the total size of the encoded images in bytes. A size of 0 disables it.
+    """
+    return LRUCache(
+        max_entries=4096 if max_size > 0 else 0,
+        max_size=max_size,
+        sizeof=lambda preview: preview.size,
+    )
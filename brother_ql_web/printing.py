@@ -0,0 +1,1036 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field as dataclass_field
+from functools import partial
+from itertools import chain
+from queue import Empty, Queue
+from threading import Event, Lock, RLock, Thread, Timer
+from typing import Any, Callable, cast, Collection, Iterable, Iterator
+
+from brother_ql.backends import BrotherQLBackendGeneric
+from brother_ql.devicedependent import label_type_specs
+from brother_ql.reader import interpret_response
+from brother_ql_web.journal import JobJournal, JournalEntry
+from brother_ql_web.raster import (
+    iter_raster_pages,
+    RasterLabel,
+    RESET,
+    STATUS_REQUEST,
+)
+from brother_ql_web.utils import BACKEND_TYPE
+
+
+logger = logging.getLogger(__name__)
+del logging
+
+if sys.platform != "win32":
+    import fcntl
+
+
+class InterProcessLock:
+    """
+    Exclusive lock based upon a lock file, used to allow only a single process to
+    access the printer at a time.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._fd: int | None = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Returns False if the lock is held by another process and `blocking` is
+        False.
+        """
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+class BackendManager:
+    """
+    Keep the connection to the printer open across print jobs.
+
+    Only one writer may use the connection at a time. The connection is closed after
+    being idle for `idle_timeout` seconds and reopened on demand. If writing to a
+    reused connection fails, the connection is reopened once before giving up.
+
+    If a `lock_file` is given, the printer is shared with other processes: each
+    session holds the corresponding lock and closes the connection when done.
+
+    The data is sent in chunks of at most `chunk_size` bytes.
+    """
+
+    def __init__(
+        self,
+        backend_class: BACKEND_TYPE,
+        printer: str,
+        idle_timeout: float = 30,
+        lock_file: str | None = None,
+        chunk_size: int = 16384,
+    ) -> None:
+        self.backend_class = backend_class
+        self.printer = printer
+        self.idle_timeout = idle_timeout
+        self.chunk_size = max(1, chunk_size)
+        self._process_lock = InterProcessLock(lock_file) if lock_file else None
+        self._backend: BrotherQLBackendGeneric | None = None
+        self._idle_timer: Timer | None = None
+        self._sessions = 0
+        # Whether data has been sent during the current session.
+        self._session_written = False
+        self._lock = RLock()
+        self._pid = os.getpid()
+
+    @property
+    def is_connected(self) -> bool:
+        return self._backend is not None
+
+    @property
+    def is_busy(self) -> bool:
+        return self._sessions > 0
+
+    def _connect(self) -> BrotherQLBackendGeneric:
+        if self._pid != os.getpid():
+            # Forked worker process: the connection belongs to the parent process.
+            self._pid = os.getpid()
+            self._backend = None
+            self._idle_timer = None
+        if self._backend is None:
+            logger.debug("Connecting to printer %s ...", self.printer)
+            self._backend = self.backend_class(self.printer)
+        return self._backend
+
+    def _disconnect(self) -> None:
+        backend, self._backend = self._backend, None
+        if backend is not None:
+            logger.debug("Disconnecting from printer %s ...", self.printer)
+            backend.dispose()
+
+    def _schedule_idle_close(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        if self._backend is None:
+            return
+        if self.idle_timeout <= 0:
+            self._disconnect()
+            return
+        timer = Timer(self.idle_timeout, lambda: self._close_idle(timer))
+        timer.daemon = True
+        timer.start()
+        self._idle_timer = timer
+
+    def _close_idle(self, timer: Timer) -> None:
+        with self._lock:
+            if self._idle_timer is not timer:
+                # The connection has been used again while waiting for the lock.
+                return
+            self._idle_timer = None
+            self._disconnect()
+
+    @contextmanager
+    def session(self) -> Iterator[BackendManager]:
+        """
+        Reserve the printer for multiple consecutive writes.
+        """
+        with self._lock:
+            if not self._sessions:
+                if self._process_lock:
+                    self._process_lock.acquire()
+                self._session_written = False
+            self._sessions += 1
+            try:
+                yield self
+            finally:
+                self._sessions -= 1
+                if not self._sessions:
+                    if self._process_lock:
+                        self._disconnect()
+                        self._process_lock.release()
+                    else:
+                        self._schedule_idle_close()
+
+    def _write_chunk(self, chunk: bytes, retry: bool) -> None:
+        reused = self._backend is not None
+        try:
+            self._connect().write(chunk)
+        except OSError as e:
+            self._disconnect()
+            if not reused or not retry:
+                raise
+            # The printer might have closed the connection in the meantime.
+            logger.info("Reconnecting to printer %s after error: %s", self.printer, e)
+            try:
+                self._connect().write(chunk)
+            except Exception:
+                self._disconnect()
+                raise
+        except Exception:
+            self._disconnect()
+            raise
+
+    def write(self, data: bytes, progress: Callable[[int], None] | None = None) -> None:
+        """
+        Send the data in chunks, calling `progress` with the number of bytes of each
+        chunk written. Reconnecting is only attempted before the first chunk of a
+        session, as the printer would receive an incomplete command or raster stream
+        otherwise.
+        """
+        with self.session():
+            for start in range(0, max(1, len(data)), self.chunk_size):
+                end = start + self.chunk_size
+                chunk = data[start:end]
+                self._write_chunk(chunk, retry=not self._session_written)
+                self._session_written = True
+                if progress is not None:
+                    progress(len(chunk))
+
+    def read_status(self) -> dict[str, Any] | None:
+        """
+        Read the status reported by the printer since the last call, as interpreted
+        by `brother_ql`. Returns None if there is no open connection, the backend
+        does not support reading or the printer did not report anything.
+        """
+        with self._lock:
+            if self._backend is None:
+                return None
+            try:
+                data = bytes(self._backend.read(32))
+            except Exception as e:
+                logger.debug("Cannot read the status of %s: %s", self.printer, e)
+                return None
+        if len(data) < 32:
+            return None
+        try:
+            return interpret_response(data)
+        except NameError as e:
+            # `brother_ql` reports unexpected responses this way.
+            logger.debug("Invalid status of %s: %s", self.printer, e)
+            return None
+
+    def request_status(self, timeout: float = 1) -> dict[str, Any] | None:
+        """
+        Ask the printer for its status, waiting up to `timeout` seconds for the
+        reply. Statuses reported earlier without being asked are skipped. Returns
+        None if the printer did not reply, for example as the backend does not
+        support reading.
+
+        Might raise Exception() of the backend, like OSError()
+        """
+        with self.session():
+            self.write(STATUS_REQUEST)
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                status = self.read_status()
+                if status is None:
+                    time.sleep(0.05)
+                elif status["status_type"] == STATUS_REPLY:
+                    return status
+        return None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            self._disconnect()
+
+
+JOB_QUEUED = "queued"
+JOB_RENDERING = "rendering"
+JOB_PRINTING = "printing"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+STATUS_REPLY = "Reply to status request"
+
+
+class PrinterError(Exception):
+    """
+    The printer reported an error, like running out of labels.
+    """
+
+
+class PrinterUnavailableError(LookupError):
+    """
+    None of the printers which would accept a job is ready to print, like being
+    offline.
+    """
+
+
+@dataclass
+class PrintJob:
+    """
+    A print job, rendering the raster data lazily inside the print queue worker.
+
+    `render` returns the labels to print, which are combined into a single raster
+    stream. Each page is sent to the printer as soon as it is available.
+    """
+
+    render: Callable[[], Iterable[RasterLabel]]
+    label_count: int = 1
+    labels_printed: int = 0
+    bytes_written: int = 0
+    # The last status reported by the printer while printing the job.
+    printer_status: dict[str, Any] | None = None
+    cancel_requested: bool = False
+    # The name of the printer the job has been routed to.
+    printer: str = ""
+    # Called once the job has been finished, like deleting its temporary files.
+    cleanup: Callable[[], None] | None = None
+    # Whether `render` returns labels which have already been rendered, thus they are
+    # stored in the journal when submitting the job.
+    rendered: bool = False
+    id: str = dataclass_field(default_factory=lambda: uuid.uuid4().hex)
+    state: str = JOB_QUEUED
+    error: str = ""
+    created_at: float = dataclass_field(default_factory=time.time)
+    rendering_started_at: float | None = None
+    printing_started_at: float | None = None
+    finished_at: float | None = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state in (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+    def cancel(self) -> bool:
+        """
+        Request to cancel the job, which takes effect before the next label is sent
+        to the printer. Returns False if the job has already been finished.
+        """
+        if self.is_finished:
+            return False
+        self.cancel_requested = True
+        return True
+
+    def to_dict(self) -> dict[str, Any]:
+        def duration(start: float | None, end: float | None) -> float | None:
+            if start is None:
+                return None
+            return (end or time.time()) - start
+
+        return {
+            "job_id": self.id,
+            "printer": self.printer,
+            "state": self.state,
+            "error": self.error,
+            "label_count": self.label_count,
+            "labels_printed": self.labels_printed,
+            "bytes_written": self.bytes_written,
+            "printer_status": self.printer_status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "timings": {
+                "queued": duration(
+                    self.created_at,
+                    self.rendering_started_at or self.finished_at,
+                ),
+                "rendering": duration(
+                    self.rendering_started_at,
+                    self.printing_started_at or self.finished_at,
+                ),
+                "printing": duration(self.printing_started_at, self.finished_at),
+            },
+        }
+
+
+class PrintQueue:
+    """
+    Render and print jobs one after another in a background worker, which is the only
+    user of the printer backend.
+
+    If a `journal` is given, the jobs are recorded there when submitting them, which
+    waits for the commit. Each label is stored together with its copies, right away
+    if the job has already been `rendered` or else by the worker once it has been
+    rendered, and the worker records the progress of the job.
+    """
+
+    def __init__(
+        self,
+        backend_manager: BackendManager,
+        max_finished_jobs: int = 1000,
+        journal: JobJournal | None = None,
+    ) -> None:
+        self.backend_manager = backend_manager
+        self.max_finished_jobs = max_finished_jobs
+        self.journal = journal
+        self._queue: Queue[PrintJob | None] = Queue()
+        self._jobs: OrderedDict[str, PrintJob] = OrderedDict()
+        self._lock = Lock()
+        self._thread: Thread | None = None
+        self._active = 0
+        self._pid = os.getpid()
+
+    def start(self) -> None:
+        if self._pid != os.getpid():
+            # Forked worker process, which does not inherit the worker thread.
+            self._pid = os.getpid()
+            self._queue = Queue()
+            self._thread = None
+        if self._thread is None:
+            self._thread = Thread(target=self._run, name="print-queue", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+            if thread.is_alive():
+                return
+        # Cancel the jobs which have been submitted after stopping the worker. They
+        # are left unfinished inside the journal, which reports them as interrupted.
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except Empty:
+                break
+            if job is None:
+                continue
+            job.error = "The print queue has been stopped"
+            job.finished_at = time.time()
+            job.state = JOB_CANCELLED
+            with self._lock:
+                self._active -= 1
+            self._finish(job)
+
+    def register(self, job: PrintJob) -> None:
+        """
+        Account for the job before it is queued.
+        """
+        with self._lock:
+            if job.id not in self._jobs:
+                self._jobs[job.id] = job
+                self._active += 1
+
+    def submit(self, job: PrintJob) -> PrintJob:
+        if self._thread is not None and self._pid != os.getpid():
+            self.start()
+        self.register(job)
+        if self.journal is not None:
+            self._store(job, self.journal)
+        self._queue.put(job)
+        return job
+
+    def _store(self, job: PrintJob, journal: JobJournal) -> None:
+        journal.add_job(
+            job_id=job.id,
+            printer=job.printer,
+            label_count=job.label_count,
+            created_at=job.created_at,
+        )
+        if job.rendered:
+            for _ in self._store_labels(journal, job.id, job.render):
+                pass
+        else:
+            job.render = partial(self._store_labels, journal, job.id, job.render)
+        try:
+            journal.flush()
+        except sqlite3.Error as e:
+            # The job is printed nevertheless, but is not resumed after a restart.
+            logger.warning("Journaling print job %s failed: %s", job.id, e)
+
+    def resume(self, entry: JournalEntry) -> PrintJob:
+        """
+        Queue an interrupted job from the journal again, continuing with its first
+        label which has not been printed.
+        """
+        if self.journal is None:
+            raise ValueError("The print queue does not have a journal")
+        job = PrintJob(
+            render=partial(self.journal.iter_labels, entry.id, entry.labels_printed),
+            label_count=entry.label_count,
+            labels_printed=entry.labels_printed,
+            bytes_written=entry.bytes_written,
+            printer=entry.printer,
+            id=entry.id,
+            created_at=entry.created_at,
+        )
+        self.register(job)
+        self._queue.put(job)
+        return job
+
+    @staticmethod
+    def _store_labels(
+        journal: JobJournal, job_id: str, render: Callable[[], Iterable[RasterLabel]]
+    ) -> Iterator[RasterLabel]:
+        first_page = 0
+        for number, label in enumerate(render()):
+            journal.add_label(job_id, number, first_page, label)
+            first_page += label.copies
+            yield label
+        journal.set_rendered(job_id)
+
+    def _finish(self, job: PrintJob) -> None:
+        cleanup, job.cleanup = job.cleanup, None
+        if cleanup is None:
+            return
+        try:
+            cleanup()
+        except Exception as e:
+            logger.warning("Cleaning up print job %s failed: %s", job.id, e)
+
+    def _record(self, job: PrintJob) -> None:
+        if self.journal is not None:
+            self.journal.update(
+                job_id=job.id,
+                state=job.state,
+                labels_printed=job.labels_printed,
+                bytes_written=job.bytes_written,
+                error=job.error,
+                rendering_started_at=job.rendering_started_at,
+                printing_started_at=job.printing_started_at,
+                finished_at=job.finished_at,
+            )
+
+    def _is_cancel_requested(self, job: PrintJob) -> bool:
+        """
+        Whether the job should be cancelled, which might have been requested by
+        another worker process sharing the journal.
+        """
+        if not job.cancel_requested and self.journal is not None:
+            try:
+                job.cancel_requested = self.journal.is_cancel_requested(job.id)
+            except sqlite3.Error as e:
+                logger.warning("Reading the job journal failed: %s", e)
+        return job.cancel_requested
+
+    def get_job(self, job_id: str) -> PrintJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    @property
+    def pending_jobs(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def load(self) -> int:
+        """
+        Number of jobs waiting for or being processed.
+        """
+        return self._active
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            try:
+                self._process(job)
+            finally:
+                with self._lock:
+                    self._active -= 1
+            self._forget_finished_jobs()
+
+    def _check_status(self, job: PrintJob) -> None:
+        """
+        Might raise PrinterError()
+        """
+        status = self.backend_manager.read_status()
+        if status is None:
+            return
+        job.printer_status = status
+        if status["errors"]:
+            raise PrinterError(f"Printer error: {', '.join(status['errors'])}")
+
+    def _print(self, job: PrintJob, pages: Iterator[bytes]) -> bool:
+        """
+        Send the pages to the printer, checking for cancellation and the printer
+        status between them. Returns whether all pages have been printed.
+        """
+
+        def add_bytes_written(count: int) -> None:
+            job.bytes_written += count
+
+        with self.backend_manager.session():
+            for data in pages:
+                if self._is_cancel_requested(job):
+                    if job.labels_printed:
+                        # The printer is still waiting for the next page.
+                        self.backend_manager.write(RESET)
+                    return False
+                logger.info(
+                    "Printing label %d of %d ...",
+                    job.labels_printed + 1,
+                    job.label_count,
+                )
+                self.backend_manager.write(data, progress=add_bytes_written)
+                job.labels_printed += 1
+                self._record(job)
+                self._check_status(job)
+        return True
+
+    def _process(self, job: PrintJob) -> None:
+        completed = False
+        try:
+            if not self._is_cancel_requested(job):
+                job.rendering_started_at = time.time()
+                job.state = JOB_RENDERING
+                self._record(job)
+                pages = iter_raster_pages(job.render())
+                # Do not reserve the printer before the first page is available.
+                first = next(pages, None)
+                if first is None:
+                    completed = True
+                elif not self._is_cancel_requested(job):
+                    job.printing_started_at = time.time()
+                    job.state = JOB_PRINTING
+                    self._record(job)
+                    completed = self._print(job, chain([first], pages))
+        except Exception as e:
+            logger.warning("Print job %s failed: %s", job.id, e)
+            job.error = str(e)
+            job.finished_at = time.time()
+            job.state = JOB_FAILED
+        else:
+            job.finished_at = time.time()
+            job.state = JOB_DONE if completed else JOB_CANCELLED
+        self._record(job)
+        self._finish(job)
+
+    def _forget_finished_jobs(self) -> None:
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+            for job_id in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+                del self._jobs[job_id]
+
+
+@dataclass(frozen=True)
+class PrinterStatus:
+    """
+    Status of a printer. The media is empty if the printer did not report it, which
+    does not prevent printing.
+    """
+
+    online: bool
+    # The error connecting to the printer.
+    error: str = ""
+    # The errors reported by the printer.
+    errors: tuple[str, ...] = ()
+    media_type: str = ""
+    # The size of the loaded labels in millimeters, with a length of 0 for endless
+    # labels.
+    media_width: int = 0
+    media_length: int = 0
+    checked_at: float = dataclass_field(default_factory=time.time)
+
+    @classmethod
+    def from_response(cls, response: dict[str, Any]) -> PrinterStatus:
+        return cls(
+            online=True,
+            errors=tuple(response["errors"]),
+            media_type=str(response["media_type"]),
+            media_width=int(response["media_width"]),
+            media_length=int(response["media_length"]),
+        )
+
+    @property
+    def media(self) -> str:
+        if not self.media_width:
+            return ""
+        if self.media_length:
+            return f"{self.media_width}x{self.media_length} mm"
+        return f"{self.media_width} mm endless"
+
+    @property
+    def problem(self) -> str:
+        """
+        The reason preventing the printer from printing any label, if there is one.
+        """
+        if not self.online:
+            return f"offline ({self.error})" if self.error else "offline"
+        if self.errors:
+            return ", ".join(self.errors)
+        if self.media_type and not self.media_width:
+            return "no labels loaded"
+        return ""
+
+    def check(self, label_size: str) -> str:
+        """
+        The reason preventing the printer from printing labels of the given size, if
+        there is one.
+        """
+        if self.problem or not self.media_width or label_size not in label_type_specs:
+            return self.problem
+        tape_size = cast(tuple[int, int], label_type_specs[label_size]["tape_size"])
+        if tape_size != (self.media_width, self.media_length):
+            return f"{self.media} labels loaded instead of {label_size}"
+        return ""
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "online": self.online,
+            "ready": not self.problem,
+            "problem": self.problem,
+            "error": self.error,
+            "errors": list(self.errors),
+            "media_type": self.media_type,
+            "media_width": self.media_width,
+            "media_length": self.media_length,
+            "media": self.media,
+            "checked_at": self.checked_at,
+        }
+
+
+@dataclass
+class Printer:
+    """
+    A printer with its own print queue and the label sizes loaded into it, with any
+    label size being accepted if there are none.
+    """
+
+    name: str
+    queue: PrintQueue
+    label_sizes: tuple[str, ...] = ()
+
+    def accepts(self, label_size: str) -> bool:
+        return not self.label_sizes or label_size in self.label_sizes
+
+
+class PrintScheduler:
+    """
+    Route print jobs to the least busy of multiple printers having matching labels
+    loaded. Each printer processes its jobs independently, thus the throughput grows
+    with the number of printers.
+
+    If a `status_poller` is given, the cached status of the printers is considered
+    as well. It has to be started separately.
+    """
+
+    def __init__(
+        self, printers: list[Printer], status_poller: StatusPoller | None = None
+    ) -> None:
+        if not printers:
+            raise ValueError("At least one printer is required")
+        self.printers = printers
+        self.status_poller = status_poller
+        self._lock = Lock()
+
+    def start(self) -> None:
+        for printer in self.printers:
+            printer.queue.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        for printer in self.printers:
+            printer.queue.stop(timeout)
+
+    def get_status(self, name: str) -> PrinterStatus | None:
+        if self.status_poller is None:
+            return None
+        return self.status_poller.get(name)
+
+    def _check_status(self, printer: Printer, label_sizes: Collection[str]) -> str:
+        status = self.get_status(printer.name)
+        if status is None:
+            return ""
+        for label_size in sorted(label_sizes):
+            reason = status.check(label_size)
+            if reason:
+                return f"Printer {printer.name} is not ready: {reason}"
+        return ""
+
+    def get_printer(self, name: str) -> Printer | None:
+        for printer in self.printers:
+            if printer.name == name:
+                return printer
+        return None
+
+    def select(
+        self, label_sizes: Collection[str], printer_name: str | None = None
+    ) -> Printer:
+        """
+        Choose the printer for a job with the given label sizes, preferring idle
+        printers in the configured order. Printers whose cached status does not
+        allow printing are skipped, thus jobs are rejected before rendering them.
+
+        Might raise LookupError() or PrinterUnavailableError()
+        """
+        if printer_name:
+            printer = self.get_printer(printer_name)
+            if printer is None:
+                raise LookupError(f"Unknown printer: {printer_name}")
+            candidates = [printer]
+        else:
+            candidates = self.printers
+        candidates = [
+            printer
+            for printer in candidates
+            if all(printer.accepts(label_size) for label_size in label_sizes)
+        ]
+        if not candidates:
+            raise LookupError(
+                f"No printer has {', '.join(sorted(label_sizes))} labels loaded"
+            )
+        reasons = [self._check_status(printer, label_sizes) for printer in candidates]
+        ready = [printer for printer, reason in zip(candidates, reasons) if not reason]
+        if not ready:
+            raise PrinterUnavailableError("; ".join(reasons))
+        loads = self._get_loads()
+        return min(ready, key=lambda printer: loads[printer.name])
+
+    @property
+    def journal(self) -> JobJournal | None:
+        """
+        The journal shared by the print queues, if there is one.
+        """
+        return self.printers[0].queue.journal
+
+    def _get_loads(self) -> dict[str, int]:
+        """
+        Number of jobs waiting for or being processed by each printer. The jobs of
+        other worker processes are only known from the journal.
+        """
+        loads = {printer.name: printer.queue.load for printer in self.printers}
+        if self.journal is not None:
+            try:
+                shared = self.journal.count_unfinished_jobs()
+            except sqlite3.Error as e:
+                logger.warning("Reading the job journal failed: %s", e)
+                return loads
+            for name, load in loads.items():
+                # The local jobs might not have been committed yet.
+                loads[name] = max(load, shared.get(name, 0))
+        return loads
+
+    def submit(
+        self,
+        create_job: Callable[[Printer], PrintJob],
+        label_sizes: Collection[str],
+        printer_name: str | None = None,
+    ) -> PrintJob:
+        """
+        Submit the job created for the selected printer, as the raster data depends
+        on the printer model.
+
+        Might raise LookupError()
+        """
+        with self._lock:
+            printer = self.select(label_sizes, printer_name=printer_name)
+            job = create_job(printer)
+            job.printer = printer.name
+            # Account for the load of the job before releasing the lock.
+            printer.queue.register(job)
+        return printer.queue.submit(job)
+
+    def resume(self, journal: JobJournal) -> list[PrintJob]:
+        """
+        Queue the interrupted jobs of the journal shared by the print queues again.
+        Jobs of printers which are no longer configured and jobs which have been
+        interrupted before all of their labels had been rendered fail.
+
+        Might raise sqlite3.Error()
+        """
+        jobs = []
+        for entry in journal.take_interrupted_jobs():
+            printer = self.get_printer(entry.printer)
+            if printer is None:
+                error = f"Unknown printer: {entry.printer}"
+            elif not entry.rendered:
+                error = (
+                    "Interrupted before all labels had been rendered, "
+                    f"{entry.labels_printed} of {entry.label_count} labels printed"
+                )
+            else:
+                jobs.append(printer.queue.resume(entry))
+                continue
+            logger.warning("Print job %s failed: %s", entry.id, error)
+            journal.update(
+                job_id=entry.id,
+                state=JOB_FAILED,
+                labels_printed=entry.labels_printed,
+                bytes_written=entry.bytes_written,
+                error=error,
+                finished_at=time.time(),
+            )
+        return jobs
+
+    def get_job(self, job_id: str) -> PrintJob | None:
+        """
+        Look up a job of this process or else read the state of a job of another
+        worker process from the journal, which lacks the printer status.
+
+        Might raise sqlite3.Error()
+        """
+        for printer in self.printers:
+            job = printer.queue.get_job(job_id)
+            if job is not None:
+                return job
+        entry = None if self.journal is None else self.journal.get_job(job_id)
+        if entry is None:
+            return None
+        return PrintJob(
+            render=list,
+            label_count=entry.label_count,
+            labels_printed=entry.labels_printed,
+            bytes_written=entry.bytes_written,
+            cancel_requested=entry.cancel_requested,
+            printer=entry.printer,
+            id=entry.id,
+            state=entry.state,
+            error=entry.error,
+            created_at=entry.created_at,
+            rendering_started_at=entry.rendering_started_at,
+            printing_started_at=entry.printing_started_at,
+            finished_at=entry.finished_at,
+        )
+
+    def cancel(self, job: PrintJob) -> bool:
+        """
+        Request to cancel a job retrieved by `get_job()`, which might be processed by
+        another worker process. Returns False if the job has already been finished.
+
+        Might raise sqlite3.Error()
+        """
+        if any(printer.queue.get_job(job.id) is job for printer in self.printers):
+            return job.cancel()
+        if job.is_finished or self.journal is None:
+            return False
+        job.cancel_requested = self.journal.request_cancel(job.id)
+        return job.cancel_requested
+
+
+class StatusPoller:
+    """
+    Request the status of the printers in the background every `interval` seconds,
+    skipping printers with pending jobs. The last status of each printer is cached,
+    thus checking it does not involve the printer.
+
+    If multiple worker processes share the printers, a `shared_file` has to be given.
+    Only the process holding its lock file polls the printers and writes their status
+    to the file, which is read by the other processes.
+    """
+
+    def __init__(
+        self,
+        printers: list[Printer],
+        interval: float = 10,
+        timeout: float = 1,
+        shared_file: str | None = None,
+    ) -> None:
+        self.printers = printers
+        self.interval = interval
+        self.timeout = timeout
+        self.shared_file = shared_file
+        self._statuses: dict[str, PrinterStatus] = {}
+        self._stopped = Event()
+        self._thread: Thread | None = None
+        self._pid = os.getpid()
+        self._poller_lock = (
+            InterProcessLock(f"{shared_file}.lock") if shared_file else None
+        )
+        self._is_polling = False
+
+    def start(self) -> None:
+        if self.interval <= 0:
+            return
+        if self._pid != os.getpid():
+            # Forked worker process, which does not inherit the worker thread.
+            self._pid = os.getpid()
+            self._stopped = Event()
+            self._thread = None
+        if self._thread is None:
+            self._thread = Thread(target=self._run, name="status-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopped.set()
+            thread.join(timeout)
+        if self._is_polling and self._poller_lock is not None:
+            self._is_polling = False
+            self._poller_lock.release()
+
+    def get(self, name: str) -> PrinterStatus | None:
+        if self._thread is not None and self._pid != os.getpid():
+            self.start()
+        return self._statuses.get(name)
+
+    def poll(self, printer: Printer) -> PrinterStatus:
+        try:
+            response = printer.queue.backend_manager.request_status(self.timeout)
+        except Exception as e:
+            status = PrinterStatus(online=False, error=str(e))
+        else:
+            if response is None:
+                status = PrinterStatus(online=True)
+            else:
+                status = PrinterStatus.from_response(response)
+        previous = self._statuses.get(printer.name)
+        if previous is None or previous.problem != status.problem:
+            logger.info("Printer %s: %s", printer.name, status.problem or "ready")
+        self._statuses[printer.name] = status
+        return status
+
+    def _acquire_polling(self) -> bool:
+        if self._poller_lock is not None and not self._is_polling:
+            self._is_polling = self._poller_lock.acquire(blocking=False)
+        return self._poller_lock is None or self._is_polling
+
+    def _write_shared_file(self) -> None:
+        assert self.shared_file
+        data = {name: asdict(status) for name, status in self._statuses.items()}
+        fd, temporary_path = tempfile.mkstemp(
+            dir=os.path.dirname(self.shared_file), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, mode="w") as temporary_file:
+                json.dump(data, temporary_file)
+            os.replace(temporary_path, self.shared_file)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def _read_shared_file(self) -> None:
+        assert self.shared_file
+        try:
+            with open(self.shared_file) as fd:
+                data: dict[str, dict[str, Any]] = json.load(fd)
+        except (OSError, ValueError):
+            # Not written by the polling process yet.
+            return
+        self._statuses = {
+            name: PrinterStatus(**{**values, "errors": tuple(values["errors"])})
+            for name, values in data.items()
+        }
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            if self._acquire_polling():
+                for printer in self.printers:
+                    if not printer.queue.load and not self._stopped.is_set():
+                        self.poll(printer)
+                if self.shared_file:
+                    try:
+                        self._write_shared_file()
+                    except OSError as e:
+                        logger.warning("Sharing the printer status failed: %s", e)
+            else:
+                self._read_shared_file()
+            self._stopped.wait(self.interval)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from typing import Iterable, Iterator, NamedTuple
+
+
+# Commands of the page header with the length of their arguments.
+_STATUS_INFORMATION = b"\x1b\x69\x53"
+_MEDIA_AND_QUALITY = b"\x1b\x69\x7a"
+_AUTOCUT = b"\x1b\x69\x4d"
+_CUT_EVERY = b"\x1b\x69\x41"
+_HEADER_COMMANDS = {
+    _STATUS_INFORMATION: 0,
+    _MEDIA_AND_QUALITY: 10,
+    _AUTOCUT: 1,
+    _CUT_EVERY: 1,
+    b"\x1b\x69\x4b": 1,  # Expanded mode.
+    b"\x1b\x69\x64": 2,  # Margins.
+    b"\x4d": 1,  # Compression.
+}
+# Offset of the flag marking the first page inside the media and quality command.
+_PAGE_FLAG_OFFSET = len(_MEDIA_AND_QUALITY) + 8
+_PRINT = b"\x0c"
+_PRINT_LAST = b"\x1a"
+# Invalidate and initialize, discarding the remaining pages of a cancelled stream.
+RESET = b"\x00" * 200 + b"\x1b\x40"
+# Ask the printer to report its status. Unlike resetting it first, this does not
+# interrupt printing the labels which it has already received.
+STATUS_REQUEST = _STATUS_INFORMATION
+
+
+class RasterLabel(NamedTuple):
+    """
+    The raster data of a single label as generated by `labels.generate_label()`, to
+    be printed `copies` times, cutting after every `cut_every` labels or only after
+    the last one for 0.
+    """
+
+    data: bytes
+    copies: int = 1
+    cut_every: int = 1
+
+
+def split_raster_data(data: bytes) -> tuple[bytes, list[bytes], bytes]:
+    """
+    Split the raster data of a single label into the preamble initializing the
+    printer, the commands of the page header and the raster rows, without the final
+    print command.
+
+    Might raise ValueError()
+    """
+    start = data.find(_STATUS_INFORMATION)
+    if start < 0 or not data.endswith(_PRINT_LAST):
+        raise ValueError("The raster data does not contain a single label")
+    commands = []
+    position = start
+    while True:
+        for command, length in _HEADER_COMMANDS.items():
+            if data.startswith(command, position):
+                break
+        else:
+            break
+        end = position + len(command) + length
+        commands.append(data[position:end])
+        position = end
+    return data[:start], commands, data[position:-1]
+
+
+def _create_page_header(commands: list[bytes], first: bool, cut_every: int) -> bytes:
+    header = []
+    for command in commands:
+        if command.startswith(_MEDIA_AND_QUALITY):
+            flagged = bytearray(command)
+            flagged[_PAGE_FLAG_OFFSET] = 0 if first else 1
+            command = bytes(flagged)
+        elif command.startswith(_AUTOCUT):
+            command = _AUTOCUT + (b"\x40" if cut_every else b"\x00")
+        elif command.startswith(_CUT_EVERY):
+            if not cut_every:
+                continue
+            command = _CUT_EVERY + bytes([cut_every])
+        header.append(command)
+    return b"".join(header)
+
+
+def iter_raster_pages(labels: Iterable[RasterLabel]) -> Iterator[bytes]:
+    """
+    Combine the labels into a single raster stream, yielding the data of each page.
+    The printer is initialized once only and the pages are separated by form feeds
+    instead of sending a complete print job for each copy. The raster rows of a
+    label are never converted again for its copies.
+
+    The labels are consumed lazily, with the page of the previous label being held
+    back until it is known whether it is the last one.
+
+    Might raise ValueError()
+    """
+    pending: bytes | None = None
+    first = True
+    for label in labels:
+        preamble, commands, rows = split_raster_data(label.data)
+        # The pages of this label, for the first page of the stream and for the
+        # following ones, which are reused for all copies.
+        pages: dict[bool, bytes] = {}
+        for _ in range(label.copies):
+            if first not in pages:
+                pages[first] = (
+                    (preamble if first else b"")
+                    + _create_page_header(commands, first, label.cut_every)
+                    + rows
+                    + _PRINT
+                )
+            if pending is not None:
+                yield pending
+            pending = pages[first]
+            first = False
+    if pending is not None:
+        yield pending[: -len(_PRINT)] + _PRINT_LAST
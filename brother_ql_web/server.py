@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import socket
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+from wsgiref.simple_server import WSGIServer
+
+import bottle
+from brother_ql_web.configuration import Configuration, PrinterConfiguration
+
+
+logger = logging.getLogger(__name__)
+del logging
+
+SERVER_BACKENDS = ("wsgiref", "threading", "waitress", "cheroot", "gunicorn")
+
+
+class PooledWSGIServer(WSGIServer):
+    """
+    WSGI reference server handling the requests with a fixed pool of threads.
+    """
+
+    workers = 4
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="request"
+        )
+
+    def process_request(
+        self, request: socket.socket, client_address: Any  # type: ignore[override]
+    ) -> None:
+        self._executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request: socket.socket, client_address: Any) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._executor.shutdown(wait=False)
+
+
+class ThreadPoolServer(bottle.WSGIRefServer):  # type: ignore[misc]
+    """
+    Bottle adapter for the WSGI reference server using a pool of worker threads.
+    """
+
+    def run(self, app: Any) -> None:
+        workers = self.options.pop("workers", PooledWSGIServer.workers)
+        self.options["server_class"] = type(
+            "PooledWSGIServer", (PooledWSGIServer,), {"workers": workers}
+        )
+        super().run(app)  # type: ignore[no-untyped-call]
+
+
+def uses_forked_workers(configuration: Configuration) -> bool:
+    """
+    Whether the requests are handled by worker processes forked from the process
+    running `main()`, even if there is only a single one.
+    """
+    return configuration.server.backend == "gunicorn"
+
+
+def uses_multiple_processes(configuration: Configuration) -> bool:
+    return uses_forked_workers(configuration) and configuration.server.workers > 1
+
+
+def get_printer_lock_file(
+    configuration: Configuration, printer: PrinterConfiguration | None = None
+) -> str | None:
+    """
+    Retrieve the lock file used to allow only one process to access the given printer,
+    defaulting to the default one, at a time if multiple worker processes are used.
+    """
+    return _get_lock_file(configuration, (printer or configuration.printer).printer)
+
+
+def get_template_lock_file(configuration: Configuration) -> str | None:
+    """
+    Retrieve the lock file serializing the changes of the label templates if multiple
+    worker processes are used.
+    """
+    return _get_lock_file(
+        configuration, f"templates:{configuration.server.template_file}"
+    )
+
+
+def get_printer_status_file(configuration: Configuration) -> str | None:
+    """
+    Retrieve the file sharing the status of the printers polled by one process with
+    the other ones if multiple worker processes are used.
+    """
+    identifiers = ",".join(printer.printer for printer in configuration.all_printers)
+    return _get_shared_file(configuration, f"status:{identifiers}", suffix=".json")
+
+
+def _get_lock_file(configuration: Configuration, identifier: str) -> str | None:
+    return _get_shared_file(configuration, identifier, suffix=".lock")
+
+
+def _get_shared_file(
+    configuration: Configuration, identifier: str, suffix: str
+) -> str | None:
+    if not uses_multiple_processes(configuration):
+        return None
+    digest = hashlib.sha256(identifier.encode("utf-8")).hexdigest()[:16]
+    return str(Path(tempfile.gettempdir()) / f"brother_ql_web-{digest}{suffix}")
+
+
+def get_server_options(configuration: Configuration) -> dict[str, Any]:
+    """
+    Map the server configuration to the keyword arguments of `bottle.run()`.
+    """
+    backend = configuration.server.backend
+    workers = max(1, configuration.server.workers)
+    if backend == "wsgiref":
+        if workers > 1:
+            logger.warning(
+                'The "wsgiref" server handles one request at a time. '
+                'Use the "threading" server for multiple workers.'
+            )
+        return {"server": "wsgiref"}
+    if backend == "threading":
+        return {"server": ThreadPoolServer, "workers": workers}
+    if backend == "waitress":
+        return {"server": "waitress", "threads": workers}
+    if backend == "cheroot":
+        return {"server": "cheroot", "numthreads": workers}
+    if backend == "gunicorn":
+        return {"server": "gunicorn", "workers": workers}
+    raise ValueError(f"Unknown server backend: {backend}")
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from brother_ql_web.caching import LRUCache
+from PIL import Image
+
+
+SYMBOL_TYPES = ("code128", "qr")
+
+# Widths of the alternating bars and spaces of each Code 128 symbol value.
+_CODE128_PATTERNS = (
+    "212222 222122 222221 121223 121322 131222 122213 122312 132212 221213 "
+    "221312 231212 112232 122132 122231 113222 123122 123221 223211 221132 "
+    "221231 213212 223112 312131 311222 321122 321221 312212 322112 322211 "
+    "212123 212321 232121 111323 131123 131321 112313 132113 132311 211313 "
+    "231113 231311 112133 112331 132131 113123 113321 133121 313121 211331 "
+    "231131 213113 213311 213131 311123 311321 331121 312113 312311 332111 "
+    "314111 221411 431111 111224 111422 121124 121421 141122 141221 112214 "
+    "112412 122114 122411 142112 142211 241211 221114 413111 241112 134111 "
+    "111242 121142 121241 114212 124112 124211 411212 421112 421211 212141 "
+    "214121 412121 111143 111341 131141 114113 114311 411113 411311 113141 "
+    "114131 311141 411131 211412 211214 211232 2331112"
+).split()
+_CODE128_CODE_C = 99
+_CODE128_CODE_B = 100
+_CODE128_START_B = 104
+_CODE128_START_C = 105
+_CODE128_STOP = 106
+_CODE128_QUIET_ZONE = 10
+
+_QR_QUIET_ZONE = 4
+
+_symbol_cache: LRUCache[tuple[str, str], Image.Image] = LRUCache(max_entries=1024)
+
+
+def get_cache_statistics() -> dict[str, int]:
+    return _symbol_cache.statistics
+
+
+def _count_digits(data: str, start: int) -> int:
+    end = start
+    while end < len(data) and data[end] in "0123456789":
+        end += 1
+    return end - start
+
+
+def encode_code128(data: str) -> list[int]:
+    """
+    Encode the given ASCII text as Code 128 symbol values, including the start and
+    stop symbols and the checksum. Runs of at least four digits use code set C.
+
+    Might raise ValueError()
+    """
+    if not data:
+        raise ValueError("Code 128 barcodes require data")
+    for character in data:
+        if not 32 <= ord(character) <= 126:
+            raise ValueError(f"Unsupported character for Code 128: {character!r}")
+
+    values: list[int] = []
+    code_set = ""
+    position = 0
+    while position < len(data):
+        digits = _count_digits(data, position)
+        if digits >= 4 or (digits == len(data) and digits % 2 == 0):
+            if digits % 2 and code_set != "C":
+                # Encode the odd digit in code set B to use complete pairs.
+                if not code_set:
+                    values.append(_CODE128_START_B)
+                    code_set = "B"
+                values.append(ord(data[position]) - 32)
+                position += 1
+                digits -= 1
+            if not code_set:
+                values.append(_CODE128_START_C)
+            elif code_set != "C":
+                values.append(_CODE128_CODE_C)
+            code_set = "C"
+            for _ in range(digits // 2):
+                values.append(int(data[position] + data[position + 1]))
+                position += 2
+            continue
+        if not code_set:
+            values.append(_CODE128_START_B)
+        elif code_set != "B":
+            values.append(_CODE128_CODE_B)
+        code_set = "B"
+        values.append(ord(data[position]) - 32)
+        position += 1
+
+    checksum = values[0] + sum(index * value for index, value in enumerate(values))
+    values.append(checksum % 103)
+    values.append(_CODE128_STOP)
+    return values
+
+
+def _create_code128_matrix(data: str) -> Image.Image:
+    modules: list[int] = []
+    for value in encode_code128(data):
+        for index, width in enumerate(_CODE128_PATTERNS[value]):
+            # Bars are black (0), spaces white (255).
+            modules.extend([255 if index % 2 else 0] * int(width))
+    quiet_zone = [255] * _CODE128_QUIET_ZONE
+    modules = quiet_zone + modules + quiet_zone
+    image = Image.new("L", (len(modules), 1))
+    image.putdata(modules)
+    return image
+
+
+def _create_qr_matrix(data: str) -> Image.Image:
+    try:
+        import segno
+    except ImportError:
+        raise ValueError("QR codes require segno to be installed")
+    if not data:
+        raise ValueError("QR codes require data")
+    qr_code = segno.make_qr(data)
+    rows = [
+        [0 if module else 255 for module in row]
+        for row in qr_code.matrix_iter(scale=1, border=_QR_QUIET_ZONE)
+    ]
+    image = Image.new("L", (len(rows[0]), len(rows)))
+    image.putdata([module for row in rows for module in row])
+    return image
+
+
+def get_symbol_matrix(symbol_type: str, data: str) -> Image.Image:
+    """
+    Retrieve the symbol with one pixel per module, including the quiet zone, which is
+    cached by the payload. The returned image must not be modified.
+
+    Might raise ValueError()
+    """
+    key = (symbol_type, data)
+    matrix = _symbol_cache.get(key)
+    if matrix is None:
+        if symbol_type == "code128":
+            matrix = _create_code128_matrix(data)
+        elif symbol_type == "qr":
+            matrix = _create_qr_matrix(data)
+        else:
+            raise ValueError(f"Unknown barcode type: {symbol_type}")
+        _symbol_cache.put(key, matrix)
+    return matrix
+
+
+def render_symbol(
+    symbol_type: str, data: str, module_size: int, height: int
+) -> Image.Image:
+    """
+    Render the symbol with the given number of dots per module, thus no resampling is
+    involved. The bars of linear barcodes get the given height in dots.
+
+    Might raise ValueError()
+    """
+    if module_size < 1:
+        raise ValueError("The module size has to be at least one dot")
+    matrix = get_symbol_matrix(symbol_type, data)
+    width = matrix.size[0] * module_size
+    if matrix.size[1] == 1:
+        return matrix.resize((width, height), Image.NEAREST)
+    return matrix.resize((width, matrix.size[1] * module_size), Image.NEAREST)
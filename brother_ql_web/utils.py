@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import sys
+from threading import Lock
 from typing import cast
 
 from brother_ql.backends import backend_factory, BrotherQLBackendGeneric, guess_backend
 from brother_ql.devicedependent import label_type_specs, label_sizes
-from brother_ql_web.configuration import Configuration
+from brother_ql_web.configuration import Configuration, PrinterConfiguration
 from brother_ql_web.font_helpers import get_fonts
 
 if sys.version_info < (3, 9):
@@ -23,6 +24,81 @@ def collect_fonts(configuration: Configuration) -> dict[str, dict[str, str]]:
     return fonts
 
 
+class FontRegistry:
+    """
+    Process-wide lookup of family -> style -> file path.
+
+    The fonts are collected once and kept in memory, so that resolving a font for a
+    label does not have to call `fc-list`/`fc-scan` again. The dictionary returned by
+    `fonts` is updated in place by `refresh()`, thus references to it stay valid.
+    """
+
+    def __init__(
+        self,
+        configuration: Configuration,
+        fonts: dict[str, dict[str, str]] | None = None,
+    ) -> None:
+        self.configuration = configuration
+        self.font_folder = configuration.server.additional_font_folder
+        self._fonts: dict[str, dict[str, str]] = dict(fonts or {})
+        self._lock = Lock()
+
+    @property
+    def fonts(self) -> dict[str, dict[str, str]]:
+        return self._fonts
+
+    def refresh(self) -> dict[str, dict[str, str]]:
+        fonts = collect_fonts(self.configuration)
+        with self._lock:
+            # Update before removing to never expose a partially filled dictionary.
+            self._fonts.update(fonts)
+            for family in set(self._fonts) - set(fonts):
+                del self._fonts[family]
+        return self._fonts
+
+    def get_path(self, family: str, style: str) -> str:
+        """
+        Might raise KeyError()
+        """
+        return self._fonts[family][style]
+
+
+_font_registry: FontRegistry | None = None
+_font_registry_lock = Lock()
+
+
+def get_font_registry(configuration: Configuration) -> FontRegistry:
+    """
+    Retrieve the process-wide font registry, building it on first usage or if the
+    configured font folder changed.
+    """
+    global _font_registry
+    with _font_registry_lock:
+        registry = _font_registry
+        if (
+            registry is None
+            or registry.font_folder != configuration.server.additional_font_folder
+        ):
+            registry = FontRegistry(configuration)
+            registry.refresh()
+            _font_registry = registry
+    return registry
+
+
+def set_font_registry(registry: FontRegistry | None) -> None:
+    """
+    Replace the process-wide font registry, for example with the fonts collected by a
+    parent process.
+    """
+    global _font_registry
+    with _font_registry_lock:
+        _font_registry = registry
+
+
+def refresh_fonts(configuration: Configuration) -> dict[str, dict[str, str]]:
+    return get_font_registry(configuration).refresh()
+
+
 def get_label_sizes() -> list[tuple[str, str]]:
     return [(name, cast(str, label_type_specs[name]["name"])) for name in label_sizes]
 
@@ -31,14 +107,31 @@ class BackendGuessingError(ValueError):
     pass
 
 
-def get_backend_class(configuration: Configuration) -> BACKEND_TYPE:
+def get_printer_backend_class(printer: PrinterConfiguration) -> BACKEND_TYPE:
+    selected_backend = printer.backend
+    if not selected_backend:
+        try:
+            selected_backend = guess_backend(printer.printer)
+        except ValueError:
+            raise BackendGuessingError(
+                "Couln't guess the backend to use from the printer string descriptor"
+            )
     try:
-        selected_backend = guess_backend(configuration.printer.printer)
-    except ValueError:
-        raise BackendGuessingError(
-            "Couln't guess the backend to use from the printer string descriptor"
-        )
-    return cast(
-        BACKEND_TYPE,
-        backend_factory(selected_backend)["backend_class"],
-    )
+        backend_class = backend_factory(selected_backend)["backend_class"]
+    except NotImplementedError as e:
+        raise BackendGuessingError(str(e))
+    return cast(BACKEND_TYPE, backend_class)
+
+
+def get_backend_class(configuration: Configuration) -> BACKEND_TYPE:
+    return get_printer_backend_class(configuration.printer)
+
+
+def get_backend_classes(configuration: Configuration) -> dict[str, BACKEND_TYPE]:
+    """
+    Resolve the backend class of each configured printer by its name.
+    """
+    return {
+        printer.name: get_printer_backend_class(printer)
+        for printer in configuration.all_printers
+    }
@@ -1,17 +1,54 @@
 from __future__ import annotations
 
+import json
 import logging
+import os
+import shutil
+import tempfile
+from functools import partial
 from pathlib import Path
-from typing import Any, cast
+from typing import Any, Callable, cast, Collection, Iterable, Iterator, Mapping
 
 import bottle
+from brother_ql_web.caching import LRUCache
 from brother_ql_web.configuration import Configuration
+from brother_ql_web.journal import JobJournal
 from brother_ql_web.labels import (
     LabelParameters,
+    LabelRenderPool,
+    configure_caches,
     create_label_image,
+    get_cache_statistics,
+    get_image_font,
     image_to_png_bytes,
     generate_label,
-    print_label,
+    PARAMETER_NAMES,
+    PARAMETER_TYPES,
+)
+from brother_ql_web.label_templates import TemplateStore
+from brother_ql_web.merge import count_merged_labels, guess_format, iter_merged_labels
+from brother_ql_web.printing import (
+    BackendManager,
+    Printer,
+    PrinterUnavailableError,
+    PrintJob,
+    PrintQueue,
+    PrintScheduler,
+    StatusPoller,
+)
+from brother_ql_web.preview import (
+    CachedPreview,
+    PreviewSequencer,
+    create_preview_cache,
+)
+from brother_ql_web.raster import RasterLabel
+from brother_ql_web.server import (
+    get_printer_lock_file,
+    get_printer_status_file,
+    get_server_options,
+    get_template_lock_file,
+    uses_forked_workers,
+    uses_multiple_processes,
 )
 from brother_ql_web.utils import BACKEND_TYPE
 
@@ -52,57 +89,234 @@ def labeldesigner() -> dict[str, Any]:
     }
 
 
+def parse_label_parameters(
+    d: Mapping[str, Any], configuration: Configuration
+) -> LabelParameters:
+    """
+    Might raise LookupError() or ValueError()
+    """
+    return LabelParameters.parse(d, configuration=configuration)
+
+
+def compile_template(
+    values: Mapping[str, Any], configuration: Configuration
+) -> LabelParameters:
+    """
+    Resolve the label parameters of a template once when saving it. The font is looked
+    up and loaded and the label size is validated, thus printing from the template only
+    has to lay out the variable text.
+
+    Might raise LookupError() or ValueError()
+    """
+    parameters = parse_label_parameters(values, configuration=configuration)
+    get_image_font(parameters.font_path, parameters.font_size)
+    return parameters
+
+
+def _get_request_values(request: bottle.BaseRequest) -> dict[str, Any]:
+    """
+    Retrieve the label values from a JSON object body or from the form data.
+
+    Might raise ValueError()
+    """
+    body = request.json
+    if body is not None:
+        if not isinstance(body, dict):
+            raise ValueError("Label parameters have to be a JSON object")
+        return {name: body[name] for name in PARAMETER_NAMES if name in body}
+    # Only decode the known values instead of the whole form data.
+    params = request.params
+    return {name: params.getunicode(name) for name in PARAMETER_NAMES if name in params}
+
+
 def get_label_parameters(request: bottle.BaseRequest) -> LabelParameters:
     """
-    Might raise LookupError()
+    Might raise LookupError() or ValueError()
     """
-    d = request.params.decode()  # UTF-8 decoded form data
-
-    font_family = d.get("font_family").rpartition("(")[0].strip()
-    font_style = d.get("font_family").rpartition("(")[2].rstrip(")")
-    context = {
-        "text": d.get("text", ""),
-        "font_size": int(d.get("font_size", 100)),
-        "font_family": font_family,
-        "font_style": font_style,
-        "label_size": d.get("label_size", "62"),
-        "margin": int(d.get("margin", 10)),
-        "threshold": int(d.get("threshold", 70)),
-        "align": d.get("align", "center"),
-        "orientation": d.get("orientation", "standard"),
-        "margin_top": int(d.get("margin_top", 24)),
-        "margin_bottom": int(d.get("margin_bottom", 45)),
-        "margin_left": int(d.get("margin_left", 35)),
-        "margin_right": int(d.get("margin_right", 35)),
-        "label_count": int(d.get("label_count", 1)),
-        "high_quality": bool(d.get("high_quality", True)),
-        "configuration": request.app.config["brother_ql_web.configuration"],
-    }
+    return parse_label_parameters(
+        _get_request_values(request),
+        configuration=request.app.config["brother_ql_web.configuration"],
+    )
 
-    return LabelParameters(**context)
 
+def get_image_label_parameters(request: bottle.BaseRequest) -> LabelParameters:
+    """
+    Might raise LookupError() or ValueError()
+    """
+    upload = request.files.get("image")
+    if upload is None:
+        raise ValueError("Please provide the image")
+    return LabelParameters.parse(
+        _get_request_values(request),
+        configuration=request.app.config["brother_ql_web.configuration"],
+        image_data=upload.file.read(),
+    )
 
-@bottle.get("/api/preview/text")  # type: ignore[misc]
-@bottle.post("/api/preview/text")  # type: ignore[misc]
-def get_preview_image() -> bytes:
-    parameters = get_label_parameters(bottle.request)
-    image = create_label_image(parameters=parameters)
+
+def _matches_etag(etag: str) -> bool:
+    header = bottle.request.get_header("If-None-Match") or ""
+    tags = {tag.strip() for tag in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+def _get_preview(parameters: LabelParameters) -> bytes:
+    key = parameters.image_key
     return_format = bottle.request.query.get("return_format", "png")
-    if return_format == "base64":
-        import base64
+    if return_format != "base64":
+        return_format = "png"
+    # The PNG and base64 responses have different bodies.
+    etag = f'"{key}-{return_format}"'
+    bottle.response.set_header("ETag", etag)
+    if _matches_etag(etag):
+        # The key is derived from the content, thus the client copy is still valid.
+        # Other methods than GET and HEAD fail the precondition (RFC 7232).
+        bottle.response.status = (
+            304 if bottle.request.method in ("GET", "HEAD") else 412
+        )
+        return b""
 
+    cache = cast(
+        LRUCache[str, CachedPreview], get_config("brother_ql_web.preview_cache")
+    )
+    preview = cache.get(key)
+    if preview is None:
+        sequencer = cast(
+            PreviewSequencer, get_config("brother_ql_web.preview_sequencer")
+        )
+        with sequencer.render(
+            client_id=bottle.request.params.get("preview_client"),
+            sequence=int(bottle.request.params.get("preview_sequence", 0)),
+        ) as is_current:
+            if not is_current:
+                # A newer preview of the same client has been requested meanwhile.
+                bottle.response.status = 204
+                return b""
+            image = create_label_image(parameters=parameters)
+        preview = CachedPreview.from_png(png=image_to_png_bytes(image))
+        cache.put(key, preview)
+
+    if return_format == "base64":
         bottle.response.set_header("Content-type", "text/plain")
-        return base64.b64encode(image_to_png_bytes(image))
+        return preview.base64
     else:
         bottle.response.set_header("Content-type", "image/png")
-        return image_to_png_bytes(image)
+        return preview.png
+
+
+@bottle.get("/api/preview/text")  # type: ignore[misc]
+@bottle.post("/api/preview/text")  # type: ignore[misc]
+def get_preview_image() -> bytes:
+    try:
+        return _get_preview(get_label_parameters(bottle.request))
+    except (LookupError, ValueError) as e:
+        bottle.response.status = 400
+        bottle.response.set_header("Content-type", "text/plain")
+        return str(e).encode("utf-8")
+
+
+@bottle.post("/api/preview/image")  # type: ignore[misc]
+def get_image_preview_image() -> bytes:
+    try:
+        return _get_preview(get_image_label_parameters(bottle.request))
+    except (LookupError, ValueError) as e:
+        bottle.response.status = 400
+        bottle.response.set_header("Content-type", "text/plain")
+        return str(e).encode("utf-8")
+
+
+def _select_printer(label_sizes: Collection[str]) -> Printer:
+    """
+    Choose the printer for a job, which might be requested using the `printer` query
+    parameter.
+
+    Might raise LookupError()
+    """
+    scheduler = cast(PrintScheduler, get_config("brother_ql_web.print_scheduler"))
+    return scheduler.select(
+        label_sizes, printer_name=bottle.request.query.get("printer") or None
+    )
+
+
+def _submit(
+    render: Callable[[Configuration], Iterable[RasterLabel]],
+    label_count: int,
+    label_sizes: Collection[str],
+    printer: Printer | None = None,
+    cleanup: Callable[[], None] | None = None,
+    rendered: bool = False,
+) -> PrintJob:
+    """
+    Queue a print job on the given or selected printer. The labels are rendered using
+    the configuration of that printer, as the raster data depends on its model.
+    `cleanup` is called once the job has been finished, even if it never started.
+    `rendered` tells that `render` only returns labels which have been rendered for
+    the given printer already.
+
+    Might raise LookupError()
+    """
+    scheduler = cast(PrintScheduler, get_config("brother_ql_web.print_scheduler"))
+    configurations = cast(
+        dict[str, Configuration], get_config("brother_ql_web.printer_configurations")
+    )
+    return scheduler.submit(
+        lambda selected: PrintJob(
+            render=lambda: render(configurations[selected.name]),
+            label_count=label_count,
+            cleanup=cleanup,
+            rendered=rendered,
+        ),
+        label_sizes=label_sizes,
+        printer_name=printer.name if printer else bottle.request.query.get("printer"),
+    )
+
+
+def _submit_label(parameters: LabelParameters) -> PrintJob:
+    """
+    Might raise LookupError() or PrinterUnavailableError()
+    """
+    return _submit(
+        lambda printer_configuration: [
+            RasterLabel(
+                generate_label(
+                    parameters=parameters, configuration=printer_configuration
+                ).data,
+                copies=parameters.label_count,
+                cut_every=parameters.cut_every,
+            )
+        ],
+        label_count=parameters.label_count,
+        label_sizes={parameters.label_size},
+    )
+
+
+def _print(parameters: LabelParameters) -> dict[str, bool | str]:
+    return_dict: dict[str, bool | str] = {"success": False}
+    configuration = cast(Configuration, get_config("brother_ql_web.configuration"))
+    if bottle.DEBUG:
+        qlr = generate_label(
+            parameters=parameters,
+            configuration=configuration,
+            save_image_to="sample-out.png",
+        )
+        return_dict["success"] = True
+        return_dict["data"] = str(qlr.data)
+        return return_dict
+
+    try:
+        job = _submit_label(parameters)
+    except LookupError as e:
+        return_dict["error"] = str(e)
+        return return_dict
+    return_dict["success"] = True
+    return_dict["job_id"] = job.id
+    return return_dict
 
 
 @bottle.post("/api/print/text")  # type: ignore[misc]
 @bottle.get("/api/print/text")  # type: ignore[misc]
 def print_text() -> dict[str, bool | str]:
     """
-    API to print a label
+    API to queue a label for printing
 
     returns: JSON
     """
@@ -110,7 +324,7 @@ def print_text() -> dict[str, bool | str]:
 
     try:
         parameters = get_label_parameters(bottle.request)
-    except LookupError as e:
+    except (LookupError, ValueError) as e:
         return_dict["error"] = str(e)
         return return_dict
 
@@ -118,47 +332,645 @@ def print_text() -> dict[str, bool | str]:
         return_dict["error"] = "Please provide the text for the label"
         return return_dict
 
-    qlr = generate_label(
-        parameters=parameters,
-        configuration=cast(Configuration, get_config("brother_ql_web.configuration")),
-        save_image_to="sample-out.png" if bottle.DEBUG else None,
-    )
+    return _print(parameters)
 
-    if not bottle.DEBUG:
+
+@bottle.post("/api/print/image")  # type: ignore[misc]
+def print_image() -> dict[str, bool | str]:
+    """
+    API to queue an image label, given as PNG, JPEG or SVG upload, for printing
+
+    returns: JSON
+    """
+    try:
+        parameters = get_image_label_parameters(bottle.request)
+        # Decode the image right away to report invalid images. The fitted image is
+        # cached for rendering the label afterwards.
+        create_label_image(parameters)
+    except (LookupError, ValueError) as e:
+        return {"success": False, "error": str(e)}
+    return _print(parameters)
+
+
+def _get_json_body(max_size: int) -> Any:
+    """
+    Parse the JSON request body like `bottle.request.json`, but allowing bodies up to
+    the given size instead of `bottle.BaseRequest.MEMFILE_MAX`.
+
+    Might raise bottle.HTTPError()
+    """
+    request = bottle.request
+    content_type = request.environ.get("CONTENT_TYPE", "").lower().split(";")[0]
+    if content_type not in ("application/json", "application/json-rpc"):
+        return None
+    if request.content_length > max_size:
+        raise bottle.HTTPError(413, "Request entity too large")
+    data = request.body.read(max_size + 1)
+    if len(data) > max_size:
+        raise bottle.HTTPError(413, "Request entity too large")
+    if not data:
+        return None
+    try:
+        return json.loads(data)
+    except (ValueError, TypeError):
+        raise bottle.HTTPError(400, "Invalid JSON")
+
+
+@bottle.post("/api/print/batch")  # type: ignore[misc]
+def print_batch() -> dict[str, Any]:
+    """
+    API to print multiple labels at once, given as a JSON array of label parameters
+    using the same keys as `/api/print/text`. The labels are rendered in parallel and
+    printed as a single job. The size of the body is limited by
+    `server.batch_max_size`.
+
+    returns: JSON
+    """
+    configuration = cast(Configuration, get_config("brother_ql_web.configuration"))
+    items = _get_json_body(configuration.server.batch_max_size)
+    if not isinstance(items, list) or not items:
+        return {"success": False, "error": "Please provide a JSON array of labels"}
+
+    results: list[dict[str, Any]] = []
+    valid: list[tuple[int, LabelParameters]] = []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("Label parameters have to be a JSON object")
+            parameters = parse_label_parameters(item, configuration=configuration)
+        except (LookupError, ValueError) as e:
+            results.append({"success": False, "error": str(e)})
+            continue
+        results.append({"success": True})
+        valid.append((index, parameters))
+
+    # The raster data depends on the printer model, thus choose the printer first.
+    label_sizes = {parameters.label_size for _, parameters in valid}
+    printer = None
+    if valid and not bottle.DEBUG:
         try:
-            print_label(
-                parameters=parameters,
-                qlr=qlr,
-                configuration=cast(
-                    Configuration, get_config("brother_ql_web.configuration")
-                ),
-                backend_class=cast(
-                    BACKEND_TYPE,
-                    get_config("brother_ql_web.backend_class"),
-                ),
+            printer = _select_printer(label_sizes)
+        except LookupError as e:
+            return {"success": False, "error": str(e), "results": results}
+        printer_configurations = cast(
+            dict[str, Configuration],
+            get_config("brother_ql_web.printer_configurations"),
+        )
+        configuration = printer_configurations[printer.name]
+
+    render_pool = cast(LabelRenderPool, get_config("brother_ql_web.render_pool"))
+    rendered: list[RasterLabel] = []
+    for (index, parameters), data in zip(
+        valid,
+        render_pool.render(
+            (parameters for _, parameters in valid), configuration=configuration
+        ),
+    ):
+        if isinstance(data, Exception):
+            results[index] = {"success": False, "error": str(data)}
+        else:
+            rendered.append(
+                RasterLabel(
+                    data,
+                    copies=parameters.label_count,
+                    cut_every=parameters.cut_every,
+                )
             )
-        except Exception as e:
-            return_dict["message"] = str(e)
-            logger.warning("Exception happened: %s", e)
-            return return_dict
 
-    return_dict["success"] = True
-    if bottle.DEBUG:
-        return_dict["data"] = str(qlr.data)
+    return_dict: dict[str, Any] = {
+        "success": len(rendered) == len(items),
+        "results": results,
+    }
+    if not rendered or printer is None:
+        return return_dict
+
+    job = _submit(
+        lambda _: rendered,
+        label_count=sum(label.copies for label in rendered),
+        label_sizes=label_sizes,
+        printer=printer,
+        rendered=True,
+    )
+    return_dict["job_id"] = job.id
     return return_dict
 
 
+def _iter_merged_labels_from_file(
+    path: str, format: str, parameters: LabelParameters, configuration: Configuration
+) -> Iterator[RasterLabel]:
+    with open(path, mode="rb") as fd:
+        yield from iter_merged_labels(
+            fd, format=format, parameters=parameters, configuration=configuration
+        )
+
+
+@bottle.post("/api/print/merge")  # type: ignore[misc]
+def print_merge() -> dict[str, Any]:
+    """
+    API to print one label per row of an uploaded CSV or JSON lines file (`data`),
+    using the text as template with `{column}` placeholders
+
+    returns: JSON
+    """
+    upload = bottle.request.files.get("data")
+    if upload is None:
+        return {"success": False, "error": "Please provide the data file"}
+
+    try:
+        parameters = get_label_parameters(bottle.request)
+    except (LookupError, ValueError) as e:
+        return {"success": False, "error": str(e)}
+    format = bottle.request.forms.get("format") or guess_format(upload.raw_filename)
+
+    # Keep a copy of the upload for the print queue, as the request will be done
+    # before the labels have been rendered.
+    with tempfile.NamedTemporaryFile(
+        prefix="brother_ql_web-merge-", delete=False
+    ) as fd:
+        shutil.copyfileobj(upload.file, fd)
+        path = fd.name
+    try:
+        with open(path, mode="rb") as fd:
+            label_count = count_merged_labels(fd, format=format, parameters=parameters)
+    except (LookupError, ValueError) as e:
+        os.unlink(path)
+        return {"success": False, "error": str(e)}
+    if not label_count or bottle.DEBUG:
+        os.unlink(path)
+        if not label_count:
+            return {"success": False, "error": "The data file does not contain rows"}
+        return {"success": True, "label_count": label_count}
+
+    try:
+        job = _submit(
+            lambda configuration: _iter_merged_labels_from_file(
+                path, format=format, parameters=parameters, configuration=configuration
+            ),
+            label_count=label_count,
+            label_sizes={parameters.label_size},
+            # The job might be cancelled or stopped before reading the file.
+            cleanup=partial(os.unlink, path),
+        )
+    except LookupError as e:
+        os.unlink(path)
+        return {"success": False, "error": str(e)}
+    return {"success": True, "job_id": job.id, "label_count": label_count}
+
+
+def _get_template_values() -> tuple[str, dict[str, Any]]:
+    """
+    Might raise ValueError()
+    """
+    body = bottle.request.json
+    if not isinstance(body, dict) or not isinstance(body.get("parameters", {}), dict):
+        raise ValueError("Please provide the template as a JSON object")
+    return str(body.get("name", "")), body.get("parameters", {})
+
+
+@bottle.get("/api/templates")  # type: ignore[misc]
+def list_templates() -> dict[str, Any]:
+    """
+    API to list the saved label templates
+
+    returns: JSON
+    """
+    store = cast(TemplateStore, get_config("brother_ql_web.template_store"))
+    return {"templates": [template.to_dict() for template in store.list()]}
+
+
+@bottle.post("/api/templates")  # type: ignore[misc]
+def create_template() -> dict[str, Any]:
+    """
+    API to save a label template, given as a JSON object with the `name` and the
+    `parameters` using the same keys as `/api/print/text`
+
+    returns: JSON
+    """
+    store = cast(TemplateStore, get_config("brother_ql_web.template_store"))
+    try:
+        template = store.save(*_get_template_values())
+    except (LookupError, ValueError) as e:
+        bottle.response.status = 400
+        return {"success": False, "error": str(e)}
+    return {"success": True, "template": template.to_dict()}
+
+
+@bottle.get("/api/templates/<template_id>")  # type: ignore[misc]
+def get_template(template_id: str) -> dict[str, Any]:
+    store = cast(TemplateStore, get_config("brother_ql_web.template_store"))
+    template = store.get(template_id)
+    if template is None:
+        bottle.response.status = 404
+        return {"error": "Unknown template"}
+    return template.to_dict()
+
+
+@bottle.put("/api/templates/<template_id>")  # type: ignore[misc]
+def update_template(template_id: str) -> dict[str, Any]:
+    store = cast(TemplateStore, get_config("brother_ql_web.template_store"))
+    if store.get(template_id) is None:
+        bottle.response.status = 404
+        return {"success": False, "error": "Unknown template"}
+    try:
+        name, values = _get_template_values()
+        template = store.save(name, values, template_id=template_id)
+    except (LookupError, ValueError) as e:
+        bottle.response.status = 400
+        return {"success": False, "error": str(e)}
+    return {"success": True, "template": template.to_dict()}
+
+
+@bottle.delete("/api/templates/<template_id>")  # type: ignore[misc]
+def delete_template(template_id: str) -> dict[str, Any]:
+    store = cast(TemplateStore, get_config("brother_ql_web.template_store"))
+    if not store.delete(template_id):
+        bottle.response.status = 404
+        return {"success": False, "error": "Unknown template"}
+    return {"success": True}
+
+
+def _get_template_parameters(template_id: str) -> LabelParameters:
+    """
+    Might raise LookupError() or ValueError()
+    """
+    store = cast(TemplateStore, get_config("brother_ql_web.template_store"))
+    template = store.get(template_id)
+    if template is None:
+        raise LookupError("Unknown template")
+    values = _get_request_values(bottle.request)
+    variables: dict[str, Any] = {
+        key: values[key] for key in ("text", "barcode") if key in values
+    }
+    if "label_count" in values:
+        variables["label_count"] = int(values["label_count"])
+    return template.create_parameters(**variables)
+
+
+@bottle.get("/api/preview/template/<template_id>")  # type: ignore[misc]
+@bottle.post("/api/preview/template/<template_id>")  # type: ignore[misc]
+def get_template_preview_image(template_id: str) -> bytes:
+    try:
+        return _get_preview(_get_template_parameters(template_id))
+    except (LookupError, ValueError) as e:
+        bottle.response.status = 400
+        bottle.response.set_header("Content-type", "text/plain")
+        return str(e).encode("utf-8")
+
+
+@bottle.post("/api/print/template/<template_id>")  # type: ignore[misc]
+def print_template(template_id: str) -> dict[str, bool | str]:
+    """
+    API to queue a label created from a saved template for printing, replacing the
+    variable `text`, `barcode` and `label_count` values of the template
+
+    returns: JSON
+    """
+    try:
+        parameters = _get_template_parameters(template_id)
+    except (LookupError, ValueError) as e:
+        return {"success": False, "error": str(e)}
+    return _print(parameters)
+
+
+@bottle.get("/api/print/jobs/<job_id>")  # type: ignore[misc]
+def print_job_status(job_id: str) -> dict[str, Any]:
+    """
+    API to retrieve the state of a print job
+
+    returns: JSON
+    """
+    scheduler = cast(PrintScheduler, get_config("brother_ql_web.print_scheduler"))
+    job = scheduler.get_job(job_id)
+    if job is None:
+        bottle.response.status = 404
+        return {"error": "Unknown print job"}
+    return job.to_dict()
+
+
+@bottle.delete("/api/print/jobs/<job_id>")  # type: ignore[misc]
+def cancel_print_job(job_id: str) -> dict[str, Any]:
+    """
+    API to cancel a print job. Printing stops before the next label, thus labels
+    which have already been sent to the printer are still printed.
+
+    returns: JSON with the state of the print job
+    """
+    scheduler = cast(PrintScheduler, get_config("brother_ql_web.print_scheduler"))
+    job = scheduler.get_job(job_id)
+    if job is None:
+        bottle.response.status = 404
+        return {"error": "Unknown print job"}
+    if not scheduler.cancel(job):
+        bottle.response.status = 409
+        return {"error": "The print job has already been finished"}
+    bottle.response.status = 202
+    return job.to_dict()
+
+
+@bottle.get("/api/printers")  # type: ignore[misc]
+def printer_status() -> dict[str, Any]:
+    """
+    API to retrieve the configured printers with their last known status, which is
+    null if it has not been requested yet
+
+    returns: JSON
+    """
+    scheduler = cast(PrintScheduler, get_config("brother_ql_web.print_scheduler"))
+    printer_configurations = cast(
+        dict[str, Configuration], get_config("brother_ql_web.printer_configurations")
+    )
+    printers = []
+    for printer in scheduler.printers:
+        status = scheduler.get_status(printer.name)
+        printers.append(
+            {
+                "name": printer.name,
+                "model": printer_configurations[printer.name].printer.model,
+                "label_sizes": list(printer.label_sizes),
+                "load": printer.queue.load,
+                "status": status.to_dict() if status else None,
+            }
+        )
+    return {"printers": printers}
+
+
+@bottle.get("/api/statistics/caches")  # type: ignore[misc]
+def cache_statistics() -> dict[str, dict[str, int]]:
+    preview_cache = cast(
+        LRUCache[str, CachedPreview], get_config("brother_ql_web.preview_cache")
+    )
+    return {**get_cache_statistics(), "previews": preview_cache.statistics}
+
+
+class ApiError(Exception):
+    """
+    Error of the `/api/v2/` endpoints, reported as structured JSON response.
+    """
+
+    def __init__(
+        self, status: int, code: str, message: str, field: str | None = None
+    ) -> None:
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.field = field
+
+    def to_dict(self) -> dict[str, Any]:
+        error: dict[str, Any] = {"code": self.code, "message": self.message}
+        if self.field is not None:
+            error["field"] = self.field
+        return {"error": error}
+
+
+_JSON_TYPE_NAMES = {str: "a string", int: "an integer", bool: "a boolean"}
+
+
+def _error_response(error: ApiError) -> dict[str, Any]:
+    bottle.response.status = error.status
+    return error.to_dict()
+
+
+def get_typed_label_parameters(request: bottle.BaseRequest) -> LabelParameters:
+    """
+    Parse the label parameters from a JSON object body, requiring the JSON types of
+    `PARAMETER_TYPES` instead of converting strings. `null` values use the defaults.
+
+    Might raise ApiError()
+    """
+    try:
+        body = request.json
+    except bottle.HTTPError:
+        raise ApiError(400, "invalid_json", "The request body is no valid JSON")
+    if not isinstance(body, dict):
+        raise ApiError(
+            400, "invalid_request", "The request body has to be a JSON object"
+        )
+    values: dict[str, Any] = {}
+    for name, value in body.items():
+        expected = PARAMETER_TYPES.get(name)
+        if expected is None:
+            raise ApiError(400, "unknown_field", f"Unknown field: {name}", field=name)
+        if value is None:
+            continue
+        # JSON booleans are no valid integers.
+        if not isinstance(value, expected) or (
+            expected is int and isinstance(value, bool)
+        ):
+            raise ApiError(
+                400,
+                "invalid_type",
+                f"The {name} has to be {_JSON_TYPE_NAMES[expected]}",
+                field=name,
+            )
+        values[name] = value
+    try:
+        return LabelParameters.parse(
+            values, configuration=request.app.config["brother_ql_web.configuration"]
+        )
+    except (LookupError, ValueError) as e:
+        raise ApiError(422, "invalid_value", str(e))
+
+
+@bottle.post("/api/v2/labels/preview")  # type: ignore[misc]
+def preview_label_v2() -> bytes:
+    """
+    API to render the preview of a label given as JSON object
+
+    returns: PNG image, Base64 encoded PNG image or JSON error
+    """
+    try:
+        parameters = get_typed_label_parameters(bottle.request)
+    except ApiError as e:
+        error = _error_response(e)
+        bottle.response.set_header("Content-type", "application/json")
+        return json.dumps(error).encode("utf-8")
+    return _get_preview(parameters)
+
+
+@bottle.post("/api/v2/labels/print")  # type: ignore[misc]
+def print_label_v2() -> dict[str, Any]:
+    """
+    API to queue a label given as JSON object for printing
+
+    returns: JSON with the `job_id` and the `label_count`
+    """
+    try:
+        parameters = get_typed_label_parameters(bottle.request)
+    except ApiError as e:
+        return _error_response(e)
+    if bottle.DEBUG:
+        result: dict[str, Any] = dict(_print(parameters))
+        del result["success"]
+        result["label_count"] = parameters.label_count
+        return result
+
+    scheduler = cast(PrintScheduler, get_config("brother_ql_web.print_scheduler"))
+    printer_name = bottle.request.query.get("printer")
+    if printer_name and scheduler.get_printer(printer_name) is None:
+        return _error_response(
+            ApiError(
+                422,
+                "unknown_printer",
+                f"Unknown printer: {printer_name}",
+                field="printer",
+            )
+        )
+    try:
+        job = _submit_label(parameters)
+    except PrinterUnavailableError as e:
+        # The printer has been rejected before rendering the label.
+        return _error_response(ApiError(503, "printer_unavailable", str(e)))
+    except LookupError as e:
+        # None of the printers has the labels loaded.
+        return _error_response(
+            ApiError(422, "unsupported_label_size", str(e), field="label_size")
+        )
+    bottle.response.status = 202
+    return {"job_id": job.id, "label_count": parameters.label_count}
+
+
+@bottle.get("/api/v2/jobs/<job_id>")  # type: ignore[misc]
+def job_status_v2(job_id: str) -> dict[str, Any]:
+    """
+    API to retrieve the state of a print job
+
+    returns: JSON
+    """
+    scheduler = cast(PrintScheduler, get_config("brother_ql_web.print_scheduler"))
+    job = scheduler.get_job(job_id)
+    if job is None:
+        return _error_response(
+            ApiError(404, "not_found", "Unknown print job", field="job_id")
+        )
+    return job.to_dict()
+
+
+@bottle.delete("/api/v2/jobs/<job_id>")  # type: ignore[misc]
+def cancel_job_v2(job_id: str) -> dict[str, Any]:
+    """
+    API to cancel a print job before its next label
+
+    returns: JSON with the state of the print job
+    """
+    scheduler = cast(PrintScheduler, get_config("brother_ql_web.print_scheduler"))
+    job = scheduler.get_job(job_id)
+    if job is None:
+        return _error_response(
+            ApiError(404, "not_found", "Unknown print job", field="job_id")
+        )
+    if not scheduler.cancel(job):
+        return _error_response(
+            ApiError(409, "conflict", "The print job has already been finished")
+        )
+    bottle.response.status = 202
+    return job.to_dict()
+
+
 def main(
     configuration: Configuration,
     fonts: dict[str, dict[str, str]],
     label_sizes: list[tuple[str, str]],
-    backend_class: BACKEND_TYPE,
+    backend_classes: dict[str, BACKEND_TYPE],
 ) -> None:
     app = bottle.default_app()
     app.config["brother_ql_web.configuration"] = configuration
     app.config["brother_ql_web.fonts"] = fonts
     app.config["brother_ql_web.label_sizes"] = label_sizes
-    app.config["brother_ql_web.backend_class"] = backend_class
+    app.config["brother_ql_web.backend_classes"] = backend_classes
+    journal = None
+    if configuration.server.job_journal_file:
+        journal = JobJournal(configuration.server.job_journal_file)
+        journal.open()
+    elif uses_multiple_processes(configuration):
+        logger.warning(
+            "Without a job journal, the print jobs are only known to the worker "
+            "process which accepted them. Set server.job_journal_file to share them."
+        )
+    backend_managers: list[BackendManager] = []
+    printers: list[Printer] = []
+    printer_configurations: dict[str, Configuration] = {}
+    for printer_configuration in configuration.all_printers:
+        backend_manager = BackendManager(
+            backend_class=backend_classes[printer_configuration.name],
+            printer=printer_configuration.printer,
+            idle_timeout=printer_configuration.connection_idle_timeout,
+            lock_file=get_printer_lock_file(configuration, printer_configuration),
+            chunk_size=printer_configuration.write_chunk_size,
+        )
+        backend_managers.append(backend_manager)
+        printers.append(
+            Printer(
+                name=printer_configuration.name,
+                queue=PrintQueue(backend_manager=backend_manager, journal=journal),
+                label_sizes=tuple(printer_configuration.label_sizes),
+            )
+        )
+        printer_configurations[printer_configuration.name] = configuration.for_printer(
+            printer_configuration
+        )
+    status_poller = StatusPoller(
+        printers,
+        interval=configuration.server.printer_status_interval,
+        shared_file=get_printer_status_file(configuration),
+    )
+    print_scheduler = PrintScheduler(printers, status_poller=status_poller)
+    app.config["brother_ql_web.print_scheduler"] = print_scheduler
+    app.config["brother_ql_web.printer_configurations"] = printer_configurations
+    app.config["brother_ql_web.preview_sequencer"] = PreviewSequencer()
+    app.config["brother_ql_web.preview_cache"] = create_preview_cache(
+        max_size=configuration.server.preview_cache_size
+    )
+    render_pool = LabelRenderPool(
+        configuration=configuration,
+        max_processes=configuration.server.render_processes,
+    )
+    app.config["brother_ql_web.render_pool"] = render_pool
+    template_store = TemplateStore(
+        path=configuration.server.template_file or None,
+        compile=lambda values: compile_template(values, configuration=configuration),
+        lock_file=get_template_lock_file(configuration),
+    )
+    app.config["brother_ql_web.template_store"] = template_store
+    configure_caches(configuration)
+    # Compile the templates after configuring the font cache, which they populate.
+    template_store.load()
     bottle.TEMPLATE_PATH.append(CURRENT_DIRECTORY / "views")
     debug = configuration.server.is_in_debug_mode
-    app.run(host=configuration.server.host, port=configuration.server.port, debug=debug)
+
+    def start_background_threads() -> None:
+        print_scheduler.start()
+        status_poller.start()
+        if journal is not None:
+            # Only the first worker process takes the interrupted jobs.
+            resumed = print_scheduler.resume(journal)
+            if resumed:
+                logger.warning("Resuming %d interrupted print jobs", len(resumed))
+
+    def stop_background_threads() -> None:
+        status_poller.stop()
+        print_scheduler.stop()
+        if journal is not None:
+            journal.close()
+
+    server_options = get_server_options(configuration)
+    if uses_forked_workers(configuration):
+        # Forking copies the locks held by running threads without the threads, thus
+        # they are only started inside the worker processes. Otherwise the process
+        # forking the workers would access the printers as well.
+        server_options["post_fork"] = lambda server, worker: start_background_threads()
+        server_options["worker_exit"] = lambda server, worker: stop_background_threads()
+    else:
+        start_background_threads()
+    try:
+        app.run(
+            host=configuration.server.host,
+            port=configuration.server.port,
+            debug=debug,
+            **server_options,
+        )
+    finally:
+        stop_background_threads()
+        render_pool.shutdown()
+        for backend_manager in backend_managers:
+            backend_manager.close()
@@ -28,8 +28,19 @@ setup(
             "flake8",
             "pep8-naming",
         ],
+        "fast": [
+            "numpy",
+        ],
+        "qr": [
+            "segno",
+        ],
+        "svg": [
+            "cairosvg",
+        ],
         "mypy": [
             "mypy",
+            "numpy",
+            "segno",
             "types-Pillow",
         ],
     },
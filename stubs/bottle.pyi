@@ -198,10 +198,12 @@ class BaseRequest:
         digestmod=...,
     ): ...
     def query(self): ...
-    def forms(self): ...
+    @property
+    def forms(self) -> FormsDict: ...
     @property
     def params(self) -> FormsDict: ...
-    def files(self): ...
+    @property
+    def files(self) -> FormsDict: ...
     def json(self): ...
     @property
     def body(self): ...
@@ -37,12 +37,20 @@ class BrotherQLRaster:
     def add_invalidate(self) -> None: ...
     @property
     def mtype(self) -> bytes: ...
+    @mtype.setter
+    def mtype(self, value: int) -> None: ...
     @property
     def mwidth(self) -> bytes: ...
+    @mwidth.setter
+    def mwidth(self, value: int) -> None: ...
     @property
     def mlength(self) -> bytes: ...
+    @mlength.setter
+    def mlength(self, value: int) -> None: ...
     @property
     def pquality(self) -> bool: ...
+    @pquality.setter
+    def pquality(self, value: bool) -> None: ...
     def add_media_and_quality(self, rnumber: int) -> None: ...
     def add_autocut(self, autocut: bool = ...) -> None: ...
     def add_cut_every(self, n: int = ...) -> None: ...
@@ -14,7 +14,7 @@ RESP_BYTE_NAMES: Incomplete
 def hex_format(data): ...
 def chunker(data, raise_exception: bool = ...) -> Generator[Incomplete, None, None]: ...
 def match_opcode(data): ...
-def interpret_response(data): ...
+def interpret_response(data: bytes) -> dict[str, Incomplete]: ...
 def merge_specific_instructions(
     chunks, join_preamble: bool = ..., join_raster: bool = ...
 ): ...
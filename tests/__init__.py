@@ -4,9 +4,13 @@ from pathlib import Path
 from unittest import TestCase as _TestCase
 from typing import Any
 
+from brother_ql_web import utils
 from brother_ql_web.configuration import Configuration
 
 
+ROBOTO_REGULAR = "/usr/share/fonts/truetype/roboto/unhinted/RobotoTTF/Roboto-Regular.ttf"  # noqa: E501
+
+
 def patch_deprecation_warning() -> None:
     """
     Avoid the deprecation warning from `brother_ql.devicedependent`. This has been
@@ -29,6 +33,23 @@ def patch_deprecation_warning() -> None:
 patch_deprecation_warning()
 
 
+def create_raster_page(rows: bytes, first: bool = True, last: bool = True) -> bytes:
+    """
+    Raster data of a page like the ones generated by `brother_ql`, cutting after each
+    label. The data of a single label is its first and last page.
+    """
+    return (
+        (b"\x00" * 200 + b"\x1b\x40" if first else b"")
+        + b"\x1b\x69\x53"
+        + b"\x1b\x69\x7a\x8e\x0a\x3e\x00\x01\x00\x00\x00"
+        + (b"\x00" if first else b"\x01")
+        + b"\x00"
+        + b"\x1b\x69\x4d\x40\x1b\x69\x41\x01\x1b\x69\x4b\x08\x1b\x69\x64\x23\x00"
+        + rows
+        + (b"\x1a" if last else b"\x0c")
+    )
+
+
 class TestCase(_TestCase):
     @cached_property
     def example_configuration_path(self) -> str:
@@ -37,3 +58,12 @@ class TestCase(_TestCase):
     @property
     def example_configuration(self) -> Configuration:
         return Configuration.from_json(self.example_configuration_path)
+
+    def use_fonts(self, fonts: dict[str, dict[str, str]]) -> None:
+        """
+        Replace the process-wide font registry for the current test.
+        """
+        self.addCleanup(utils.set_font_registry, utils._font_registry)
+        utils.set_font_registry(
+            utils.FontRegistry(self.example_configuration, fonts=fonts)
+        )
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from threading import Thread
+
+from brother_ql_web.caching import LRUCache
+
+from tests import TestCase
+
+
+class LRUCacheTestCase(TestCase):
+    def test_get_put(self) -> None:
+        cache: LRUCache[str, int] = LRUCache(max_entries=2)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", 1)
+        self.assertEqual(1, cache.get("a"))
+        self.assertIn("a", cache)
+        self.assertEqual(1, len(cache))
+        self.assertEqual(
+            {
+                "hits": 1,
+                "misses": 1,
+                "entries": 1,
+                "max_entries": 2,
+                "size": 0,
+                "max_size": 0,
+            },
+            cache.statistics,
+        )
+
+    def test_evict_least_recently_used(self) -> None:
+        cache: LRUCache[str, int] = LRUCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+
+    def test_evict_by_size(self) -> None:
+        cache: LRUCache[str, bytes] = LRUCache(max_entries=10, max_size=10, sizeof=len)
+        cache.put("a", b"12345")
+        cache.put("b", b"1234")
+        self.assertEqual(9, cache.size)
+        cache.put("c", b"12")
+        self.assertNotIn("a", cache)
+        self.assertEqual(6, cache.size)
+
+        # Values larger than the whole cache are not stored at all.
+        cache.put("d", b"12345678901")
+        self.assertNotIn("d", cache)
+        self.assertEqual(2, len(cache))
+
+    def test_replace(self) -> None:
+        cache: LRUCache[str, bytes] = LRUCache(max_entries=10, max_size=10, sizeof=len)
+        cache.put("a", b"12345")
+        cache.put("a", b"12")
+        self.assertEqual(2, cache.size)
+        self.assertEqual(b"12", cache.get("a"))
+
+    def test_disabled(self) -> None:
+        cache: LRUCache[str, int] = LRUCache(max_entries=0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_resize(self) -> None:
+        cache: LRUCache[int, int] = LRUCache(max_entries=5)
+        for i in range(5):
+            cache.put(i, i)
+        cache.resize(max_entries=2)
+        self.assertEqual(2, len(cache))
+        self.assertIn(3, cache)
+        self.assertIn(4, cache)
+
+    def test_clear(self) -> None:
+        cache: LRUCache[str, int] = LRUCache(max_entries=5)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.hits)
+
+    def test_threads(self) -> None:
+        cache: LRUCache[int, int] = LRUCache(max_entries=50)
+
+        def work() -> None:
+            for i in range(1000):
+                if cache.get(i % 100) is None:
+                    cache.put(i % 100, i)
+
+        threads = [Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(50, len(cache))
+        self.assertEqual(4000, cache.hits + cache.misses)
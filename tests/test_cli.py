@@ -42,6 +42,8 @@ class GetParametersTestCase(TestCase):
             Namespace(
                 port=False,
                 log_level=20,
+                server_backend=False,
+                workers=False,
                 font_folder=False,
                 default_label_size=False,
                 default_orientation=False,
@@ -175,6 +177,8 @@ class UpdateConfigurationFromParametersTestCase(TestCase):
         parameters = Namespace(
             port=False,
             log_level=False,
+            server_backend=False,
+            workers=False,
             font_folder=False,
             default_label_size=False,
             default_orientation=False,
@@ -195,6 +199,8 @@ class UpdateConfigurationFromParametersTestCase(TestCase):
         parameters = Namespace(
             port=False,
             log_level=False,
+            server_backend=False,
+            workers=False,
             font_folder=False,
             default_label_size=False,
             default_orientation=False,
@@ -214,11 +220,37 @@ class UpdateConfigurationFromParametersTestCase(TestCase):
                 parameters=parameters, configuration=configuration
             )
 
+    def test_invalid_server_backend(self) -> None:
+        configuration = self.example_configuration
+        parameters = Namespace(
+            port=False,
+            log_level=False,
+            server_backend=False,
+            workers=False,
+            font_folder=False,
+            default_label_size=False,
+            default_orientation=False,
+            model=False,
+            printer=False,
+            configuration=self.example_configuration_path,
+        )
+        configuration.server.backend = "dummy"
+
+        with self.assertRaisesRegex(
+            cli.InvalidServerBackend,
+            r"^Invalid server backend\. Please choose one of the following:\nwsgiref .+$",  # noqa: E501
+        ):
+            cli.update_configuration_from_parameters(
+                parameters=parameters, configuration=configuration
+            )
+
     def test_no_fonts_found(self) -> None:
         configuration = self.example_configuration
         parameters = Namespace(
             port=False,
             log_level=False,
+            server_backend=False,
+            workers=False,
             font_folder=False,
             default_label_size=False,
             default_orientation=False,
@@ -242,6 +274,8 @@ class UpdateConfigurationFromParametersTestCase(TestCase):
         parameters = Namespace(
             port=1337,
             log_level=False,
+            server_backend=False,
+            workers=False,
             font_folder=False,
             default_label_size=False,
             default_orientation=False,
@@ -268,6 +302,8 @@ class UpdateConfigurationFromParametersTestCase(TestCase):
                 parameters = Namespace(
                     port=False,
                     log_level=log_level,
+                    server_backend=False,
+                    workers=False,
                     font_folder=False,
                     default_label_size=False,
                     default_orientation=False,
@@ -285,11 +321,38 @@ class UpdateConfigurationFromParametersTestCase(TestCase):
                 expected_configuration.server.log_level = "INFO"
                 self.assertEqual(expected_configuration, configuration)
 
+    def test_overwrite_server_backend_and_workers(self) -> None:
+        configuration = self.example_configuration
+        parameters = Namespace(
+            port=False,
+            log_level=False,
+            server_backend="threading",
+            workers=8,
+            font_folder=False,
+            default_label_size=False,
+            default_orientation=False,
+            model=False,
+            printer=False,
+            configuration=self.example_configuration_path,
+        )
+
+        cli.update_configuration_from_parameters(
+            parameters=parameters, configuration=configuration
+        )
+        self.choose_mock.assert_called_once()
+
+        expected_configuration = self.expected_configuration
+        expected_configuration.server.backend = "threading"
+        expected_configuration.server.workers = 8
+        self.assertEqual(expected_configuration, configuration)
+
     def test_overwrite_font_folder(self) -> None:
         configuration = self.example_configuration
         parameters = Namespace(
             port=False,
             log_level=False,
+            server_backend=False,
+            workers=False,
             font_folder="/path/to/fonts",
             default_label_size=False,
             default_orientation=False,
@@ -321,6 +384,8 @@ class UpdateConfigurationFromParametersTestCase(TestCase):
         parameters = Namespace(
             port=False,
             log_level=False,
+            server_backend=False,
+            workers=False,
             font_folder=False,
             default_label_size=False,
             default_orientation=False,
@@ -343,6 +408,8 @@ class UpdateConfigurationFromParametersTestCase(TestCase):
         parameters = Namespace(
             port=False,
             log_level=False,
+            server_backend=False,
+            workers=False,
             font_folder=False,
             default_label_size=False,
             default_orientation=False,
@@ -365,6 +432,8 @@ class UpdateConfigurationFromParametersTestCase(TestCase):
         parameters = Namespace(
             port=False,
             log_level=False,
+            server_backend=False,
+            workers=False,
             font_folder=False,
             default_label_size="38",
             default_orientation=False,
@@ -387,6 +456,8 @@ class UpdateConfigurationFromParametersTestCase(TestCase):
         parameters = Namespace(
             port=False,
             log_level=False,
+            server_backend=False,
+            workers=False,
             font_folder=False,
             default_label_size=False,
             default_orientation="my_orientation",
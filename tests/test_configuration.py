@@ -22,11 +22,27 @@ CUSTOM_CONFIGURATION = """
     "port": 1337,
     "host": "test.local",
     "log_level": "ERROR",
-    "additional_font_folder": ""
+    "additional_font_folder": "",
+    "font_cache_size": 16,
+    "preview_cache_size": 1048576,
+    "raster_cache_size": 2097152,
+    "image_cache_size": 4194304,
+    "backend": "waitress",
+    "workers": 8,
+    "render_processes": 2,
+    "template_file": "labels/templates.json",
+    "printer_status_interval": 30,
+    "job_journal_file": "jobs.sqlite",
+    "batch_max_size": 1048576
   },
   "printer": {
     "model": "QL-800",
-    "printer": "file:///dev/usb/lp1"
+    "printer": "file:///dev/usb/lp1",
+    "connection_idle_timeout": 5,
+    "name": "office",
+    "backend": "",
+    "label_sizes": [],
+    "write_chunk_size": 4096
   },
   "label": {
     "default_size": "62",
@@ -52,7 +68,21 @@ CUSTOM_CONFIGURATION = """
     "html_title": "Label Designer",
     "page_title": "Brother QL Label Designer",
     "page_headline": "Design your label and print it!"
-  }
+  },
+  "printers": [
+    {
+      "model": "QL-820NWB",
+      "printer": "tcp://192.168.0.23",
+      "connection_idle_timeout": 30,
+      "name": "warehouse",
+      "backend": "network",
+      "label_sizes": [
+        "62",
+        "29x90"
+      ],
+      "write_chunk_size": 16384
+    }
+  ]
 }
 """
 
@@ -77,13 +107,46 @@ class ConfigurationTestCase(TestCase):
                     host="test.local",
                     log_level="ERROR",
                     additional_font_folder="",
+                    font_cache_size=16,
+                    preview_cache_size=1048576,
+                    raster_cache_size=2097152,
+                    image_cache_size=4194304,
+                    backend="waitress",
+                    workers=8,
+                    render_processes=2,
+                    template_file="labels/templates.json",
+                    printer_status_interval=30,
+                    job_journal_file="jobs.sqlite",
+                    batch_max_size=1048576,
                 ),
                 configuration.server,
             )
             self.assertEqual(
-                PrinterConfiguration(model="QL-800", printer="file:///dev/usb/lp1"),
+                PrinterConfiguration(
+                    model="QL-800",
+                    printer="file:///dev/usb/lp1",
+                    connection_idle_timeout=5,
+                    name="office",
+                    write_chunk_size=4096,
+                ),
                 configuration.printer,
             )
+            self.assertEqual(
+                [
+                    PrinterConfiguration(
+                        model="QL-820NWB",
+                        printer="tcp://192.168.0.23",
+                        name="warehouse",
+                        backend="network",
+                        label_sizes=["62", "29x90"],
+                    )
+                ],
+                configuration.printers,
+            )
+            self.assertEqual(
+                ["office", "warehouse"],
+                [printer.name for printer in configuration.all_printers],
+            )
             self.assertEqual(
                 LabelConfiguration(
                     default_size="62",
@@ -140,6 +203,20 @@ class ConfigurationTestCase(TestCase):
             with self.assertRaisesRegex(ValueError, r"^Printer configuration missing$"):
                 Configuration.from_json(json_file.name)
 
+    def test_from_json__duplicate_printer_name(self) -> None:
+        with NamedTemporaryFile(suffix=".json", mode="w+t") as json_file:
+            data = self.example_json
+            data["printers"] = [  # type: ignore[assignment]
+                {"model": "QL-800", "printer": "tcp://192.168.0.23"}
+            ]
+            json_file.write(json.dumps(data))
+            json_file.seek(0)
+
+            with self.assertRaisesRegex(
+                ValueError, r"^Duplicate printer name: default$"
+            ):
+                Configuration.from_json(json_file.name)
+
     def test_to_json(self) -> None:
         with NamedTemporaryFile(suffix=".json", mode="w+t") as json_file:
             json_file.write(CUSTOM_CONFIGURATION)
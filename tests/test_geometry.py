@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from dataclasses import FrozenInstanceError
+
+from brother_ql.devicedependent import DIE_CUT_LABEL, ENDLESS_LABEL
+from brother_ql_web import geometry
+
+from tests import TestCase
+
+
+class LabelGeometryTestCase(TestCase):
+    def test_create(self) -> None:
+        for label_size, orientation, expected in [
+            ("62", "standard", (ENDLESS_LABEL, 696, 0, 0)),
+            ("62", "rotated", (ENDLESS_LABEL, 0, 696, 90)),
+            ("29x90", "standard", (DIE_CUT_LABEL, 991, 306, "auto")),
+            ("29x90", "rotated", (DIE_CUT_LABEL, 306, 991, "auto")),
+        ]:
+            with self.subTest(label_size=label_size, orientation=orientation):
+                result = geometry.LabelGeometry.create(
+                    label_size, orientation, font_size=50, margins=(24, 45, 35, 35)
+                )
+                self.assertEqual(
+                    expected,
+                    (result.kind, result.width, result.height, result.rotate),
+                )
+                self.assertEqual(
+                    (12, 22, 17, 17),
+                    (
+                        result.margin_top,
+                        result.margin_bottom,
+                        result.margin_left,
+                        result.margin_right,
+                    ),
+                )
+
+    def test_unknown_label_size(self) -> None:
+        with self.assertRaisesRegex(LookupError, r"^Unknown label_size$"):
+            geometry.LabelGeometry.create("foo", "standard", 50, (0, 0, 0, 0))
+
+    def test_immutable(self) -> None:
+        result = geometry.LabelGeometry.create("62", "standard", 50, (0, 0, 0, 0))
+        self.assertFalse(hasattr(result, "__dict__"))
+        with self.assertRaises(FrozenInstanceError):
+            result.width = 10  # type: ignore[misc]
+
+
+class GetLabelGeometryTestCase(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        geometry._geometry_cache.clear()
+        self.addCleanup(geometry._geometry_cache.clear)
+
+    def test_cached(self) -> None:
+        first = geometry.get_label_geometry("62", "standard", 50, (24, 45, 35, 35))
+        self.assertIs(
+            first, geometry.get_label_geometry("62", "standard", 50, (24, 45, 35, 35))
+        )
+        self.assertIsNot(
+            first, geometry.get_label_geometry("62", "standard", 60, (24, 45, 35, 35))
+        )
+        self.assertEqual(1, geometry.get_cache_statistics()["hits"])
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import sys
+from io import BytesIO
+from unittest import mock
+
+from brother_ql_web import images
+from PIL import Image
+
+from tests import TestCase
+
+
+def create_image(
+    size: tuple[int, int], mode: str = "RGB", image_format: str = "PNG"
+) -> bytes:
+    image = Image.new(mode, size, "black")
+    buffer = BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+class DecodeImageTestCase(TestCase):
+    def test_png_and_jpeg(self) -> None:
+        for image_format in images.IMAGE_FORMATS:
+            with self.subTest(image_format=image_format):
+                image = images.decode_image(
+                    create_image((30, 20), image_format=image_format)
+                )
+                self.assertEqual((30, 20), image.size)
+
+    def test_transparency(self) -> None:
+        for color, expected in [
+            ((0, 0, 0, 0), (255, 255, 255, 255)),
+            ((0, 0, 0, 255), (0, 0, 0, 255)),
+        ]:
+            with self.subTest(color=color):
+                data = BytesIO()
+                Image.new("RGBA", (3, 2), color).save(data, format="PNG")
+                image = images.decode_image(data.getvalue())
+                self.assertEqual(expected, image.getpixel((0, 0)))
+
+    def test_unsupported(self) -> None:
+        with self.assertRaisesRegex(ValueError, r"^Unsupported image format: GIF$"):
+            images.decode_image(create_image((3, 2), image_format="GIF"))
+        with self.assertRaisesRegex(ValueError, r"^Unsupported image format$"):
+            images.decode_image(b"Hello")
+        with self.assertRaisesRegex(ValueError, r"^Invalid image"):
+            images.decode_image(create_image((30, 20))[:50])
+
+    def test_svg(self) -> None:
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="5"/>'
+        cairosvg = mock.Mock(svg2png=mock.Mock(return_value=create_image((40, 20))))
+        with mock.patch.dict(sys.modules, {"cairosvg": cairosvg}):
+            image = images.decode_image(svg, width=40)
+        cairosvg.svg2png.assert_called_once_with(bytestring=svg, output_width=40)
+        self.assertEqual((40, 20), image.size)
+
+        with mock.patch.dict(sys.modules, {"cairosvg": None}):
+            with self.assertRaisesRegex(ValueError, r"require CairoSVG"):
+                images.decode_image(svg)
+
+
+class FitImageTestCase(TestCase):
+    def test_fit(self) -> None:
+        image = Image.new("L", (200, 100), "black")
+        for width, height, size in [
+            (100, 0, (100, 50)),
+            (0, 300, (600, 300)),
+            (100, 100, (100, 100)),
+            (400, 200, (400, 200)),
+        ]:
+            with self.subTest(width=width, height=height):
+                self.assertEqual(size, images.fit_image(image, width, height).size)
+
+    def test_centered(self) -> None:
+        image = Image.new("L", (200, 100), "black")
+        fitted = images.fit_image(image, 100, 100)
+        self.assertEqual(255, fitted.getpixel((50, 10)))
+        self.assertEqual(0, fitted.getpixel((50, 50)))
+        self.assertEqual(255, fitted.getpixel((50, 90)))
+
+
+class GetFittedImageTestCase(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        images._image_cache.clear()
+        self.addCleanup(images._image_cache.clear)
+
+    def test_cached(self) -> None:
+        data = create_image((200, 100))
+        image = images.get_fitted_image(data, 100, 0, mode="L")
+        self.assertEqual(("L", (100, 50)), (image.mode, image.size))
+
+        with mock.patch.object(images, "decode_image") as decode_mock:
+            self.assertIs(image, images.get_fitted_image(data, 100, 0, mode="L"))
+        decode_mock.assert_not_called()
+        self.assertIsNot(image, images.get_fitted_image(data, 50, 0, mode="L"))
+        self.assertEqual(
+            {"hits": 1, "misses": 2, "entries": 2},
+            {
+                key: value
+                for key, value in images.get_cache_statistics().items()
+                if key in ("hits", "misses", "entries")
+            },
+        )
+
+    def test_configure_cache(self) -> None:
+        self.addCleanup(images.configure_cache, 16 * 1024 * 1024)
+        images.configure_cache(0)
+        images.get_fitted_image(create_image((20, 10)), 10, 0, mode="L")
+        self.assertEqual(0, len(images._image_cache))
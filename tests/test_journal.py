@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any
+
+from brother_ql_web.journal import JobJournal, JournalEntry
+from brother_ql_web.raster import RasterLabel
+
+from tests import TestCase
+
+
+class JobJournalTestCase(TestCase):
+    def get_journal(self, **kwargs: int) -> JobJournal:
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        journal = JobJournal(str(Path(directory.name) / "jobs.sqlite"), **kwargs)
+        journal.open()
+        self.addCleanup(journal.close)
+        return journal
+
+    def reopen(self, journal: JobJournal) -> None:
+        journal.close()
+        journal.open()
+
+    def select(self, journal: JobJournal, query: str) -> list[tuple[Any, ...]]:
+        journal.flush()
+        with closing(sqlite3.connect(journal.path)) as connection:
+            return connection.execute(query).fetchall()
+
+    def test_add(self) -> None:
+        journal = self.get_journal(max_batch=2)
+        journal.add_job("job", "default", 4, 42.0)
+        journal.add_label("job", 0, 0, RasterLabel(b"1", copies=3))
+        journal.add_label("job", 1, 3, RasterLabel(b"2", cut_every=0))
+        journal.set_rendered("job")
+
+        self.reopen(journal)
+        self.assertEqual(
+            [JournalEntry("job", "default", 4, 0, 0, 42.0, rendered=True)],
+            journal.take_interrupted_jobs(),
+        )
+        # The jobs are only taken once.
+        self.assertEqual([], journal.take_interrupted_jobs())
+        self.assertEqual(
+            [RasterLabel(b"1", copies=3), RasterLabel(b"2", cut_every=0)],
+            list(journal.iter_labels("job")),
+        )
+        self.assertEqual(
+            [RasterLabel(b"1", copies=1), RasterLabel(b"2", cut_every=0)],
+            list(journal.iter_labels("job", start=2)),
+        )
+        self.assertEqual(
+            [RasterLabel(b"2", cut_every=0)], list(journal.iter_labels("job", start=3))
+        )
+
+    def test_unrendered(self) -> None:
+        journal = self.get_journal()
+        journal.add_job("job", "default", 2, 42.0)
+        journal.add_label("job", 0, 0, RasterLabel(b"1"))
+
+        self.reopen(journal)
+        self.assertEqual(
+            [JournalEntry("job", "default", 2, 0, 0, 42.0, rendered=False)],
+            journal.take_interrupted_jobs(),
+        )
+
+    def test_update(self) -> None:
+        journal = self.get_journal()
+        journal.add_job("job", "default", 3, 42.0)
+        journal.add_label("job", 0, 0, RasterLabel(b"1", copies=3))
+        journal.update("job", "printing", labels_printed=1, bytes_written=1)
+        self.assertEqual(
+            [("printing", 1, 1)],
+            self.select(
+                journal, "SELECT state, labels_printed, bytes_written FROM jobs"
+            ),
+        )
+
+        journal.update(
+            "job",
+            "failed",
+            labels_printed=2,
+            bytes_written=2,
+            error="Printer error",
+            finished_at=43.0,
+        )
+        self.assertEqual(
+            [("failed", 2, "Printer error")],
+            self.select(journal, "SELECT state, labels_printed, error FROM jobs"),
+        )
+        # The labels of finished jobs are not kept.
+        self.assertEqual([], self.select(journal, "SELECT * FROM labels"))
+
+        self.reopen(journal)
+        self.assertEqual([], journal.take_interrupted_jobs())
+
+    def test_shared_state(self) -> None:
+        journal = self.get_journal()
+        journal.add_job("job", "default", 1, 42.0)
+        journal.add_job("other", "other", 1, 42.0)
+        journal.update("job", "printing", 0, 0, rendering_started_at=43.0)
+        journal.flush()
+
+        entry = journal.get_job("job")
+        assert entry is not None
+        self.assertEqual(
+            ("printing", 43.0, None, False),
+            (
+                entry.state,
+                entry.rendering_started_at,
+                entry.finished_at,
+                entry.cancel_requested,
+            ),
+        )
+        self.assertIsNone(journal.get_job("unknown"))
+        self.assertEqual({"default": 1, "other": 1}, journal.count_unfinished_jobs())
+
+        self.assertFalse(journal.is_cancel_requested("job"))
+        self.assertTrue(journal.request_cancel("job"))
+        self.assertTrue(journal.is_cancel_requested("job"))
+        journal.update("job", "cancelled", 0, 0, finished_at=44.0)
+        journal.flush()
+        self.assertFalse(journal.request_cancel("job"))
+        self.assertFalse(journal.request_cancel("unknown"))
+        self.assertEqual({"other": 1}, journal.count_unfinished_jobs())
+
+    def test_forget_finished_jobs(self) -> None:
+        journal = self.get_journal(max_finished_jobs=1)
+        for index in range(3):
+            job_id = str(index)
+            journal.add_job(job_id, "default", 1, 42.0)
+            journal.update(job_id, "done", 1, 4, finished_at=43.0 + index)
+        journal.add_job("queued", "default", 1, 42.0)
+        journal.add_label("queued", 0, 0, RasterLabel(b"1"))
+        journal.add_label("removed", 0, 0, RasterLabel(b"1"))
+
+        self.reopen(journal)
+        self.assertEqual(
+            [("2", "done"), ("queued", "interrupted")],
+            self.select(journal, "SELECT id, state FROM jobs ORDER BY id"),
+        )
+        self.assertEqual(
+            [("queued",)], self.select(journal, "SELECT job_id FROM labels")
+        )
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import os
+from tempfile import TemporaryDirectory
+from typing import Any, Mapping
+from unittest import mock
+
+from brother_ql_web.label_templates import TemplateStore
+from brother_ql_web.labels import LabelParameters
+from brother_ql_web.web import compile_template
+
+from tests import ROBOTO_REGULAR, TestCase
+
+
+class TemplateStoreTestCase(TestCase):
+    VALUES = {"font_family": "Roboto (Regular)", "font_size": 40, "text": "Default"}
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.use_fonts({"Roboto": {"Regular": ROBOTO_REGULAR}})
+        self.configuration = self.example_configuration
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "templates.json")
+
+    def compile(self, values: Mapping[str, Any]) -> LabelParameters:
+        return compile_template(values, configuration=self.configuration)
+
+    def test_save_and_load(self) -> None:
+        store = TemplateStore(self.path, compile=self.compile)
+        template = store.save("Asset tag", self.VALUES)
+        self.assertEqual(ROBOTO_REGULAR, template.parameters.font_path)
+        with open(self.path) as fd:
+            self.assertEqual({"templates": [template.to_dict()]}, json.load(fd))
+        self.assertEqual(["templates.json"], os.listdir(os.path.dirname(self.path)))
+
+        loaded = TemplateStore(self.path, compile=self.compile)
+        loaded.load()
+        self.assertEqual([template.to_dict()], [t.to_dict() for t in loaded.list()])
+
+        self.assertTrue(loaded.delete(template.id))
+        self.assertFalse(loaded.delete(template.id))
+        with open(self.path) as fd:
+            self.assertEqual({"templates": []}, json.load(fd))
+
+    def test_compiled_once(self) -> None:
+        compile_mock = mock.Mock(side_effect=self.compile)
+        store = TemplateStore(None, compile=compile_mock)
+        template = store.save("Asset tag", self.VALUES)
+        first = template.create_parameters(text="A-1", label_count=2)
+        second = template.create_parameters(text="A-2")
+        compile_mock.assert_called_once_with(self.VALUES)
+        self.assertEqual(("A-1", 2), (first.text, first.label_count))
+        self.assertEqual(("A-2", 1), (second.text, second.label_count))
+        self.assertEqual("Default", template.parameters.text)
+
+        with self.assertRaisesRegex(ValueError, r"^Unknown template variables"):
+            template.create_parameters(font_size=10)
+
+    def test_invalid(self) -> None:
+        store = TemplateStore(self.path, compile=self.compile)
+        with self.assertRaisesRegex(ValueError, r"^Please provide the name"):
+            store.save("", self.VALUES)
+        with self.assertRaisesRegex(LookupError, r"^Unknown label_size$"):
+            store.save("Tag", {**self.VALUES, "label_size": "foo"})
+        with self.assertRaisesRegex(LookupError, r"^Unknown template$"):
+            store.save("Tag", self.VALUES, template_id="unknown")
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_load_skips_invalid(self) -> None:
+        with open(self.path, mode="w") as fd:
+            json.dump(
+                {
+                    "templates": [
+                        {"id": "a", "name": "Valid", "parameters": self.VALUES},
+                        {"id": "b", "name": "Invalid", "parameters": {"margin": "x"}},
+                    ]
+                },
+                fd,
+            )
+        store = TemplateStore(self.path, compile=self.compile)
+        with self.assertLogs("brother_ql_web.label_templates", level="WARNING"):
+            store.load()
+        self.assertEqual(["a"], [template.id for template in store.list()])
+
+    def test_shared_file(self) -> None:
+        compile_mock = mock.Mock(side_effect=self.compile)
+        lock_file = os.path.join(os.path.dirname(self.path), "templates.lock")
+        first = TemplateStore(self.path, compile=compile_mock, lock_file=lock_file)
+        second = TemplateStore(self.path, compile=compile_mock, lock_file=lock_file)
+        first.load()
+        second.load()
+
+        a = first.save("A", self.VALUES)
+        self.assertEqual(a, second.get(a.id))
+        b = second.save("B", self.VALUES)
+        # Saving in one process keeps the templates saved by other ones.
+        self.assertEqual([a.id, b.id], [template.id for template in first.list()])
+        self.assertEqual(["A", "B"], [template.name for template in second.list()])
+        # Each process compiles each template once, unchanged ones are reused.
+        self.assertEqual(4, compile_mock.call_count)
+
+        self.assertTrue(first.delete(b.id))
+        self.assertIsNone(second.get(b.id))
+        self.assertFalse(second.delete(b.id))
+        with self.assertRaisesRegex(LookupError, r"^Unknown template$"):
+            second.save("B", self.VALUES, template_id=b.id)
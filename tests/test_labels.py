@@ -1,8 +1,137 @@
-from unittest import TestCase
+from __future__ import annotations
+
+from importlib.util import find_spec
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any
+from unittest import mock, skipIf
+
+from brother_ql import BrotherQLRaster, create_label
+from brother_ql_web import labels, symbols
+from brother_ql_web.layout import TextLayout
+from PIL import Image
+
+from tests import create_raster_page, ROBOTO_REGULAR, TestCase
 
 
 class LabelParametersTestCase(TestCase):
-    pass
+    def setUp(self) -> None:
+        super().setUp()
+        self.use_fonts({"Roboto": {"Regular": ROBOTO_REGULAR}})
+
+    def parse(self, **values: Any) -> labels.LabelParameters:
+        return labels.LabelParameters.parse(
+            {"font_family": "Roboto (Regular)", **values},
+            configuration=self.example_configuration,
+        )
+
+    def test_parse(self) -> None:
+        parameters = self.parse(
+            text="Hello",
+            font_size="42",
+            margin_top="",
+            high_quality="false",
+            label_count=2,
+        )
+        self.assertEqual(
+            ("Roboto", "Regular", ROBOTO_REGULAR),
+            (parameters.font_family, parameters.font_style, parameters.font_path),
+        )
+        self.assertEqual(
+            (42, 24, False, 2),
+            (
+                parameters.font_size,
+                parameters.margin_top,
+                parameters.high_quality,
+                parameters.label_count,
+            ),
+        )
+        self.assertTrue(self.parse(high_quality="on").high_quality)
+
+    def test_invalid(self) -> None:
+        cases: list[tuple[dict[str, Any], type[Exception], str]] = [
+            ({"font_family": "Unknown (Bold)"}, LookupError, "Couln't find the font"),
+            ({"label_size": "foo"}, LookupError, "Unknown label_size"),
+            ({"font_size": "large"}, ValueError, "Invalid value for font_size"),
+            ({"font_size": 0}, ValueError, "The font size has to be positive"),
+            ({"orientation": "upside"}, ValueError, "Unknown orientation: upside"),
+            ({"align": "justify"}, ValueError, "Unknown alignment: justify"),
+            ({"threshold": 101}, ValueError, "The threshold has to be between"),
+            ({"margin_left": -1}, ValueError, "The margins must not be negative"),
+            ({"label_count": 0}, ValueError, "The label count has to be at least"),
+            ({"cut_every": 256}, ValueError, "The cut interval has to be between"),
+            ({"conversion_mode": "fs"}, ValueError, "Unknown conversion mode: fs"),
+            ({"barcode_type": "ean"}, ValueError, "Unknown barcode type: ean"),
+            ({"barcode": "Grüße"}, ValueError, "Unsupported character for Code 128"),
+        ]
+        for values, exception, message in cases:
+            with self.subTest(values=values):
+                with self.assertRaisesRegex(exception, f"^{message}"):
+                    self.parse(**values)
+        with mock.patch("brother_ql_web.labels.numpy", None):
+            with self.assertRaisesRegex(ValueError, r"^The otsu conversion mode"):
+                self.parse(conversion_mode="otsu")
+
+    def test_immutable(self) -> None:
+        parameters = self.parse(text="Hello")
+        self.assertFalse(hasattr(parameters, "__dict__"))
+        with self.assertRaises(AttributeError):
+            parameters.text = "World"  # type: ignore[misc]
+
+        changed = parameters.replace(text="World")
+        self.assertEqual(("Hello", "World"), (parameters.text, changed.text))
+        with self.assertRaisesRegex(ValueError, r"^The label count"):
+            parameters.replace(label_count=0)
+
+    def test_canonical(self) -> None:
+        parameters = self.parse(text="Hello", font_size=42, orientation="rotated")
+        self.assertEqual("Roboto (Regular)", parameters.to_dict()["font_family"])
+        self.assertEqual(
+            parameters,
+            labels.LabelParameters.parse(
+                parameters.to_dict(), configuration=self.example_configuration
+            ),
+        )
+        self.assertEqual(
+            parameters.canonical,
+            self.parse(orientation="rotated", font_size="42", text="Hello").canonical,
+        )
+        self.assertNotEqual(parameters.canonical, self.parse(text="Hello").canonical)
+
+
+class GetImageFontTestCase(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        labels._image_font_cache.clear()
+        self.addCleanup(labels._image_font_cache.clear)
+
+    def test_cached(self) -> None:
+        font = labels.get_image_font(ROBOTO_REGULAR, 42)
+        self.assertEqual(42, font.size)
+        self.assertIs(font, labels.get_image_font(ROBOTO_REGULAR, 42))
+        self.assertIsNot(font, labels.get_image_font(ROBOTO_REGULAR, 43))
+        self.assertEqual(
+            {"hits": 1, "misses": 2, "entries": 2},
+            {
+                key: value
+                for key, value in labels.get_cache_statistics()["fonts"].items()
+                if key in {"hits", "misses", "entries"}
+            },
+        )
+
+    def test_configure_caches(self) -> None:
+        configuration = self.example_configuration
+        configuration.server.font_cache_size = 1
+        self.addCleanup(labels._image_font_cache.resize, max_entries=32)
+        labels.configure_caches(configuration)
+
+        with mock.patch(
+            "PIL.ImageFont.truetype", side_effect=lambda path, size: (path, size)
+        ) as truetype_mock:
+            labels.get_image_font(ROBOTO_REGULAR, 42)
+            labels.get_image_font(ROBOTO_REGULAR, 43)
+            labels.get_image_font(ROBOTO_REGULAR, 42)
+        self.assertEqual(3, truetype_mock.call_count)
 
 
 class DetermineImageDimensionsTestCase(TestCase):
@@ -13,17 +142,299 @@ class DetermineTextOffsetsTestCase(TestCase):
     pass
 
 
-class CreateLabelImageTestCase(TestCase):
+class ImageToPngBytesTestCase(TestCase):
     pass
 
 
-class ImageToPngBytesTestCase(TestCase):
-    pass
+class LabelTestCase(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.use_fonts({"Roboto": {"Regular": ROBOTO_REGULAR}})
+        labels._raster_cache.clear()
+        self.addCleanup(labels._raster_cache.clear)
 
+    def get_parameters(self, **kwargs: Any) -> labels.LabelParameters:
+        # The PyPI version of `brother_ql` fails to resize 600 dpi images with recent
+        # Pillow versions, thus default to the standard quality.
+        values: dict[str, Any] = {
+            "font_family": "Roboto (Regular)",
+            "text": "Hello",
+            "font_size": 40,
+            "high_quality": False,
+        }
+        values.update(kwargs)
+        return labels.LabelParameters.parse(
+            values, configuration=self.example_configuration
+        )
 
-class GenerateLabelTestCase(TestCase):
-    pass
+
+class CreateLabelImageTestCase(LabelTestCase):
+    def test_barcode(self) -> None:
+        text_only = labels.create_label_image(self.get_parameters())
+        parameters = self.get_parameters(
+            barcode="SKU-123", barcode_module_size=2, barcode_height=50
+        )
+        image = labels.create_label_image(parameters)
+        self.assertEqual(text_only.size[0], image.size[0])
+        self.assertEqual(text_only.size[1] + 4 + 50, image.size[1])
+
+        symbol = symbols.render_symbol("code128", "SKU-123", 2, 50)
+        left = (image.size[0] - symbol.size[0]) // 2
+        # The text is drawn below its ascent, which the bottom margin accounts for.
+        font = labels.get_image_font(ROBOTO_REGULAR, parameters.font_size)
+        ascent = int(TextLayout.create("Hello", font).bbox[1])
+        top = image.size[1] - parameters.margin_bottom_scaled - 50 + ascent
+        self.assertEqual(
+            symbol.tobytes(),
+            image.crop((left, top, left + symbol.size[0], top + 50)).tobytes(),
+        )
+
+    def test_barcode_too_wide(self) -> None:
+        parameters = self.get_parameters(barcode="X" * 100, barcode_module_size=5)
+        with self.assertRaisesRegex(ValueError, r"^The barcode does not fit"):
+            labels.create_label_image(parameters)
+
+
+class GenerateLabelTestCase(LabelTestCase):
+    def test_cached(self) -> None:
+        configuration = self.example_configuration
+        qlr = labels.generate_label(self.get_parameters(), configuration)
+        self.assertTrue(qlr.data)
+
+        with mock.patch.object(labels, "create_label_image") as create_mock:
+            cached = labels.generate_label(self.get_parameters(), configuration)
+        create_mock.assert_not_called()
+        self.assertEqual(qlr.data, cached.data)
+        self.assertEqual(configuration.printer.model, cached.model)
+
+    def test_cache_key(self) -> None:
+        configuration = self.example_configuration
+        labels.generate_label(self.get_parameters(), configuration)
+
+        for name, parameters in [
+            ("threshold", self.get_parameters(threshold=50)),
+            ("label_size", self.get_parameters(label_size="29")),
+            ("orientation", self.get_parameters(orientation="rotated")),
+        ]:
+            with self.subTest(name=name):
+                qlr = labels.generate_label(parameters, configuration)
+                self.assertTrue(qlr.data)
+        self.assertEqual(0, labels._raster_cache.hits)
+
+        configuration.printer.model = "QL-800"
+        labels.generate_label(self.get_parameters(), configuration)
+        self.assertEqual(0, labels._raster_cache.hits)
+
+        self.assertNotEqual(
+            labels._get_raster_key(self.get_parameters(), configuration),
+            labels._get_raster_key(
+                self.get_parameters(high_quality=True), configuration
+            ),
+        )
+
+    def test_save_image_bypasses_cache(self) -> None:
+        configuration = self.example_configuration
+        labels.generate_label(self.get_parameters(), configuration)
+        with NamedTemporaryFile(suffix=".png") as image_file:
+            labels.generate_label(
+                self.get_parameters(), configuration, save_image_to=image_file.name
+            )
+            self.assertTrue(Path(image_file.name).stat().st_size)
+
+    def test_grayscale(self) -> None:
+        configuration = self.example_configuration
+        for label_size, mode in [("62", "L"), ("17x54", "L"), ("62red", "RGB")]:
+            with self.subTest(label_size=label_size):
+                parameters = self.get_parameters(label_size=label_size)
+                image = labels.create_label_image(parameters)
+                self.assertEqual(mode, image.mode)
+
+                # Same raster data as for the previously used RGB image.
+                with mock.patch.object(
+                    labels,
+                    "create_label_image",
+                    return_value=image.convert("RGB"),
+                ):
+                    expected = labels.generate_label(parameters, configuration).data
+                labels._raster_cache.clear()
+                self.assertEqual(
+                    expected, labels.generate_label(parameters, configuration).data
+                )
+
+
+@skipIf(find_spec("numpy") is None, "NumPy is not installed")
+class CreateLabelFastTestCase(LabelTestCase):
+    def assert_same_raster(
+        self, image: Image.Image, model: str, label_size: str, **kwargs: Any
+    ) -> None:
+        expected = BrotherQLRaster(model)
+        # `brother_ql` still uses the alias removed in Pillow 10.
+        with mock.patch.object(Image, "ANTIALIAS", Image.LANCZOS, create=True):
+            create_label(expected, image, label_size, cut=True, **kwargs)
+        qlr = BrotherQLRaster(model)
+        labels._create_label_fast(qlr, image, label_size, cut=True, **kwargs)
+        self.assertEqual(expected.data, qlr.data)
+
+    def test_same_as_brother_ql(self) -> None:
+        for label_size, orientation, rotate in [
+            ("62", "standard", 0),
+            ("62", "rotated", 90),
+            ("29", "standard", 0),
+            ("62red", "standard", 0),
+            ("29x90", "standard", "auto"),
+            ("29x90", "rotated", "auto"),
+            ("d24", "standard", "auto"),
+        ]:
+            parameters = self.get_parameters(
+                label_size=label_size, orientation=orientation
+            )
+            image = labels.create_label_image(parameters)
+            for model in ["QL-500", "QL-800", "QL-1060N"]:
+                for threshold in [10, 70, 95]:
+                    with self.subTest(
+                        label_size=label_size,
+                        orientation=orientation,
+                        model=model,
+                        threshold=threshold,
+                    ):
+                        self.assert_same_raster(
+                            image,
+                            model,
+                            label_size,
+                            threshold=threshold,
+                            rotate=rotate,
+                        )
+
+    def test_same_as_brother_ql_600_dpi(self) -> None:
+        endless = labels.create_label_image(self.get_parameters(label_size="62"))
+        self.assert_same_raster(endless, "QL-500", "62", rotate=0, dpi_600=True)
+
+        die_cut = Image.new("L", (612, 1982), "white")
+        die_cut.paste(0, (100, 100, 500, 300))
+        self.assert_same_raster(die_cut, "QL-500", "29x90", rotate=0, dpi_600=True)
+
+    def test_bad_dimensions(self) -> None:
+        qlr = BrotherQLRaster("QL-500")
+        image = Image.new("L", (100, 100), "white")
+        with self.assertRaisesRegex(ValueError, r"^Bad image dimensions"):
+            labels._create_label_fast(qlr, image, "29x90", rotate="auto")
+
+    def test_generate_label_fallback(self) -> None:
+        configuration = self.example_configuration
+        configuration.printer.model = "QL-800"
+        with mock.patch("brother_ql_web.labels.numpy", None):
+            expected = labels.generate_label(self.get_parameters(), configuration)
+        labels._raster_cache.clear()
+        with mock.patch.object(
+            labels, "_create_label_fast", wraps=labels._create_label_fast
+        ) as fast_mock:
+            qlr = labels.generate_label(self.get_parameters(), configuration)
+        fast_mock.assert_called_once()
+        self.assertEqual(expected.data, qlr.data)
+
+
+@skipIf(find_spec("numpy") is None, "NumPy is not installed")
+class ConvertToDotsTestCase(TestCase):
+    def test_threshold(self) -> None:
+        import numpy
+
+        pixels = numpy.array([[0, 179, 180, 255]], dtype=numpy.uint8)
+        self.assertEqual(
+            [[True, True, False, False]],
+            labels.convert_to_dots(pixels, threshold=70).tolist(),
+        )
+
+    def test_otsu(self) -> None:
+        import numpy
+
+        pixels = numpy.array([[20, 30, 40, 180, 190, 200]], dtype=numpy.uint8)
+        self.assertEqual(
+            [[True, True, True, False, False, False]],
+            labels.convert_to_dots(pixels, mode="otsu").tolist(),
+        )
+        white = numpy.full((2, 2), 255, dtype=numpy.uint8)
+        self.assertFalse(labels.convert_to_dots(white, mode="otsu").any())
+
+    def test_bayer(self) -> None:
+        import numpy
+
+        for value, expected in [(0, 1.0), (64, 0.75), (128, 0.5), (255, 0.0)]:
+            with self.subTest(value=value):
+                pixels = numpy.full((10, 20), value, dtype=numpy.uint8)
+                dots = labels.convert_to_dots(pixels, mode="bayer")
+                self.assertEqual((10, 20), dots.shape)
+                self.assertEqual(expected, dots[:8, :8].mean())
+
+    def test_unknown_mode(self) -> None:
+        import numpy
+
+        with self.assertRaisesRegex(ValueError, r"^Unknown conversion mode: fs$"):
+            labels.convert_to_dots(numpy.zeros((1, 1), numpy.uint8), mode="fs")
+
+    def test_generate_label(self) -> None:
+        configuration = self.example_configuration
+        self.use_fonts({"Roboto": {"Regular": ROBOTO_REGULAR}})
+        parameters = labels.LabelParameters.parse(
+            {
+                "font_family": "Roboto (Regular)",
+                "text": "Hello",
+                "high_quality": False,
+                "conversion_mode": "bayer",
+            },
+            configuration=configuration,
+        )
+        self.addCleanup(labels._raster_cache.clear)
+        self.assertTrue(labels.generate_label(parameters, configuration).data)
+        with mock.patch("brother_ql_web.labels.numpy", None):
+            with self.assertRaisesRegex(ValueError, r"requires NumPy"):
+                labels.generate_label(
+                    parameters.replace(conversion_mode="otsu"), configuration
+                )
+
+
+class LabelRenderPoolTestCase(LabelTestCase):
+    def test_render(self) -> None:
+        configuration = self.example_configuration
+        pool = labels.LabelRenderPool(configuration, max_processes=2)
+        self.addCleanup(pool.shutdown)
+
+        parameters = [
+            self.get_parameters(),
+            # Only rendering the label reveals that the barcode is too wide.
+            self.get_parameters(barcode="Too wide" * 10),
+            self.get_parameters(label_size="29"),
+        ]
+        first, second, third = pool.render(parameters)
+
+        self.assertEqual(
+            labels.generate_label(parameters[0], configuration).data, first
+        )
+        self.assertIsInstance(second, ValueError)
+        self.assertEqual(
+            labels.generate_label(parameters[2], configuration).data, third
+        )
 
 
 class PrintLabelTestCase(TestCase):
-    pass
+    def test_print_label(self) -> None:
+        parameters = labels.LabelParameters(
+            font_family="Roboto",
+            font_style="Regular",
+            font_path=ROBOTO_REGULAR,
+            label_count=3,
+        )
+        qlr = BrotherQLRaster("QL-500")
+        qlr.data = create_raster_page(b"data")
+        backend_manager = mock.MagicMock()
+        labels.print_label(
+            parameters=parameters, qlr=qlr, backend_manager=backend_manager
+        )
+        backend_manager.session.assert_called_once_with()
+        self.assertEqual(
+            [
+                mock.call(create_raster_page(b"data", last=False)),
+                mock.call(create_raster_page(b"data", first=False, last=False)),
+                mock.call(create_raster_page(b"data", first=False)),
+            ],
+            backend_manager.write.call_args_list,
+        )
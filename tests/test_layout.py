@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import cast, Literal
+
+from brother_ql_web import layout
+from PIL import Image, ImageDraw, ImageFont
+
+from tests import ROBOTO_REGULAR, TestCase
+
+
+class TextLayoutTestCase(TestCase):
+    TEXTS = ["Hello", "Hello\nWorld wide\n \nx", "AVAV\n  jg|", "Ünïcödé\nTé"]
+
+    def setUp(self) -> None:
+        super().setUp()
+        layout._line_metrics_cache.clear()
+        self.addCleanup(layout._line_metrics_cache.clear)
+        self.font = ImageFont.truetype(ROBOTO_REGULAR, 47)
+
+    def test_bbox(self) -> None:
+        draw = ImageDraw.Draw(Image.new("L", (20, 20), "white"))
+        for text in self.TEXTS:
+            with self.subTest(text=text):
+                text_layout = layout.TextLayout.create(text, self.font)
+                self.assertEqual(
+                    draw.multiline_textbbox((0, 0), text, font=self.font),
+                    text_layout.bbox,
+                )
+
+    def test_draw(self) -> None:
+        for text in self.TEXTS:
+            for align in ["left", "center", "right"]:
+                with self.subTest(text=text, align=align):
+                    expected = Image.new("RGB", (400, 300), "white")
+                    ImageDraw.Draw(expected).multiline_text(
+                        (10, 20),
+                        text,
+                        (255, 0, 0),
+                        font=self.font,
+                        align=cast(Literal["left", "center", "right"], align),
+                    )
+                    image = Image.new("RGB", (400, 300), "white")
+                    layout.TextLayout.create(text, self.font).draw(
+                        ImageDraw.Draw(image), (10, 20), (255, 0, 0), align=align
+                    )
+                    self.assertEqual(expected.tobytes(), image.tobytes())
+
+    def test_line_metrics_cached(self) -> None:
+        layout.TextLayout.create("Hello\nWorld", self.font)
+        layout.TextLayout.create("Hello\nThere", self.font)
+        statistics = layout.get_cache_statistics()
+        # "A" is measured for the line spacing.
+        self.assertEqual(2, statistics["hits"])
+        self.assertEqual(4, statistics["misses"])
+
+    def test_invalid_align(self) -> None:
+        image = Image.new("RGB", (400, 300), "white")
+        with self.assertRaisesRegex(ValueError, r"^align must be"):
+            layout.TextLayout.create("Hello", self.font).draw(
+                ImageDraw.Draw(image), (0, 0), (0, 0, 0), align="justify"
+            )
@@ -1,5 +1,7 @@
+import os
 from unittest import mock
 
+from brother_ql_web import utils
 from brother_ql_web.__main__ import main
 from brother_ql_web.configuration import Font
 
@@ -12,6 +14,7 @@ class Backend:
 
 class MainTestCase(TestCase):
     def test_main(self) -> None:
+        self.addCleanup(setattr, utils, "_font_registry", None)
         fonts = {
             "DejaVu Serif": {"Book": "dummy", "Regular": "dummy2"},
         }
@@ -29,7 +32,8 @@ class MainTestCase(TestCase):
         ) as fonts_mock, mock.patch(
             "brother_ql_web.utils.get_label_sizes", return_value=label_sizes
         ) as labels_mock, mock.patch(
-            "brother_ql_web.utils.get_backend_class", return_value=Backend
+            "brother_ql_web.utils.get_backend_classes",
+            return_value={"default": Backend},
         ) as backend_mock, mock.patch(
             "brother_ql_web.web.main"
         ) as main_mock:
@@ -37,13 +41,16 @@ class MainTestCase(TestCase):
 
         configuration = self.example_configuration
         configuration.label.default_font = Font(family="DejaVu Serif", style="Book")
+        configuration.server.template_file = os.path.join(
+            os.path.dirname(self.example_configuration_path), "templates.json"
+        )
 
         basic_config_mock.assert_called_once_with(level="WARNING")
         main_mock.assert_called_once_with(
             configuration=configuration,
             fonts=fonts,
             label_sizes=label_sizes,
-            backend_class=Backend,
+            backend_classes={"default": Backend},
         )
         fonts_mock.assert_called_once_with(configuration)
         labels_mock.assert_called_once_with()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from io import BytesIO
+from unittest import mock
+
+from brother_ql_web import merge
+from brother_ql_web.labels import LabelParameters
+from brother_ql_web.raster import RasterLabel
+
+from tests import create_raster_page, ROBOTO_REGULAR, TestCase
+
+
+class IterRowsTestCase(TestCase):
+    def test_csv(self) -> None:
+        file = BytesIO('\ufeffname,price\nTea,"1,50"\n"Multi\nline",2\n'.encode())
+        self.assertEqual(
+            [{"name": "Tea", "price": "1,50"}, {"name": "Multi\nline", "price": "2"}],
+            list(merge.iter_rows(file, "csv")),
+        )
+        self.assertFalse(file.closed)
+
+    def test_jsonl(self) -> None:
+        file = BytesIO(b'{"name": "Tea", "price": 1.5}\n\n{"name": "Coffee"}\n')
+        self.assertEqual(
+            [{"name": "Tea", "price": 1.5}, {"name": "Coffee"}],
+            list(merge.iter_rows(file, "jsonl")),
+        )
+
+    def test_jsonl_invalid(self) -> None:
+        rows = merge.iter_rows(BytesIO(b'{"name": "Tea"}\n[1, 2]\n'), "jsonl")
+        self.assertEqual({"name": "Tea"}, next(rows))
+        with self.assertRaisesRegex(ValueError, r"^Line 2 is not a JSON object$"):
+            next(rows)
+
+    def test_unknown_format(self) -> None:
+        with self.assertRaisesRegex(ValueError, r"^Unknown merge format: xml$"):
+            list(merge.iter_rows(BytesIO(b""), "xml"))
+
+
+class FillTemplateTestCase(TestCase):
+    def test_fill(self) -> None:
+        self.assertEqual(
+            "Tea\n1.50 EUR",
+            merge.fill_template(
+                "{name}\n{price:.2f} EUR", {"name": "Tea", "price": 1.5}
+            ),
+        )
+
+    def test_unknown_column(self) -> None:
+        with self.assertRaisesRegex(LookupError, r"^Unknown column: price$"):
+            merge.fill_template("{price}", {"name": "Tea"})
+
+    def test_attribute_access(self) -> None:
+        with self.assertRaisesRegex(LookupError, r"^Unknown column: name.upper$"):
+            merge.fill_template("{name.upper}", {"name": "Tea"})
+
+
+class IterMergedLabelsTestCase(TestCase):
+    def get_parameters(self) -> LabelParameters:
+        return LabelParameters(
+            font_family="Roboto",
+            font_style="Regular",
+            font_path=ROBOTO_REGULAR,
+            text="Item: {name}",
+            label_count=2,
+        )
+
+    def test_streaming(self) -> None:
+        file = BytesIO(b"name\nTea\nCoffee\n")
+        with mock.patch.object(
+            merge,
+            "generate_label",
+            side_effect=lambda parameters, configuration: mock.Mock(
+                data=create_raster_page(parameters.text.encode())
+            ),
+        ) as generate_mock:
+            labels = merge.iter_merged_labels(
+                file,
+                format="csv",
+                parameters=self.get_parameters(),
+                configuration=self.example_configuration,
+            )
+            generate_mock.assert_not_called()
+            self.assertEqual(
+                RasterLabel(create_raster_page(b"Item: Tea"), copies=2), next(labels)
+            )
+            self.assertEqual(1, generate_mock.call_count)
+            self.assertEqual(
+                [RasterLabel(create_raster_page(b"Item: Coffee"), copies=2)],
+                list(labels),
+            )
+        self.assertEqual(2, generate_mock.call_count)
+
+    def test_count(self) -> None:
+        self.assertEqual(
+            4,
+            merge.count_merged_labels(
+                BytesIO(b"name\nTea\nCoffee\n"), "csv", self.get_parameters()
+            ),
+        )
+        with self.assertRaisesRegex(LookupError, r"^Row 2: Unknown column: name$"):
+            merge.count_merged_labels(
+                BytesIO(b'{"name": "Tea"}\n{"title": "Coffee"}\n'),
+                "jsonl",
+                self.get_parameters(),
+            )
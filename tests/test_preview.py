@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from threading import Event, Thread
+
+from brother_ql_web.preview import PreviewSequencer
+
+from tests import TestCase
+
+
+class PreviewSequencerTestCase(TestCase):
+    def test_without_client(self) -> None:
+        sequencer = PreviewSequencer()
+        with sequencer.render(client_id=None, sequence=0) as is_current:
+            self.assertTrue(is_current)
+        with sequencer.render(client_id="", sequence=0) as is_current:
+            self.assertTrue(is_current)
+
+    def test_superseded(self) -> None:
+        sequencer = PreviewSequencer()
+        sequencer.announce("client", 2)
+        with sequencer.render(client_id="client", sequence=1) as is_current:
+            self.assertFalse(is_current)
+        with sequencer.render(client_id="client", sequence=2) as is_current:
+            self.assertTrue(is_current)
+
+        # Other clients are not affected.
+        with sequencer.render(client_id="other", sequence=1) as is_current:
+            self.assertTrue(is_current)
+
+    def test_queued_requests_are_dropped(self) -> None:
+        sequencer = PreviewSequencer()
+        rendering = Event()
+        release = Event()
+        results: dict[int, bool] = {}
+
+        def request(sequence: int) -> None:
+            with sequencer.render(client_id="client", sequence=sequence) as current:
+                results[sequence] = current
+                if sequence == 1:
+                    rendering.set()
+                    release.wait(timeout=5)
+
+        first = Thread(target=request, args=(1,))
+        first.start()
+        rendering.wait(timeout=5)
+
+        queued = [Thread(target=request, args=(sequence,)) for sequence in (2, 3)]
+        for thread in queued:
+            thread.start()
+        # Make sure both requests have been registered before releasing the first one.
+        while sequencer.announce("client", 0).latest_sequence < 3:
+            pass
+        release.set()
+        for thread in [first, *queued]:
+            thread.join()
+
+        self.assertEqual({1: True, 2: False, 3: True}, results)
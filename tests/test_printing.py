@@ -0,0 +1,760 @@
+from __future__ import annotations
+
+import fcntl
+import os
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, cast, Iterator
+from unittest import mock
+
+from brother_ql_web.journal import JobJournal
+from brother_ql_web.printing import (
+    JOB_CANCELLED,
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_QUEUED,
+    BackendManager,
+    Printer,
+    PrinterStatus,
+    PrintJob,
+    PrintQueue,
+    PrintScheduler,
+    StatusPoller,
+)
+from brother_ql_web.raster import iter_raster_pages, RasterLabel, RESET, STATUS_REQUEST
+from brother_ql_web.utils import BACKEND_TYPE
+
+from tests import create_raster_page, TestCase
+
+
+def create_status(
+    errors: int = 0, status_type: int = 0, media: tuple[int, int] = (62, 0)
+) -> bytes:
+    width, length = media
+    status = bytearray(32)
+    status[:3] = b"\x80\x20\x42"
+    status[8] = errors
+    status[10] = width
+    status[11] = 0x00 if not width else 0x0B if length else 0x0A
+    status[17] = length
+    status[18] = status_type
+    return bytes(status)
+
+
+class DummyBackend:
+    instances: list[DummyBackend] = []
+    # The errors raised by the next writes, with None for a successful one.
+    failures: list[Exception | None] = []
+    statuses: list[bytes] = []
+
+    def __init__(self, device_specifier: str) -> None:
+        self.device_specifier = device_specifier
+        self.written: list[bytes] = []
+        self.disposed = False
+        self.instances.append(self)
+
+    def write(self, data: bytes) -> None:
+        failure = self.failures.pop(0) if self.failures else None
+        if failure is not None:
+            raise failure
+        self.written.append(data)
+
+    def read(self, length: int = 32) -> bytes:
+        return self.statuses.pop(0) if self.statuses else b""
+
+    def dispose(self) -> None:
+        self.disposed = True
+
+
+class BackendTestCase(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        DummyBackend.instances = []
+        DummyBackend.failures = []
+        DummyBackend.statuses = []
+
+    def get_manager(self, **kwargs: Any) -> BackendManager:
+        manager = BackendManager(
+            backend_class=cast(BACKEND_TYPE, DummyBackend),
+            printer="tcp://printer",
+            **kwargs,
+        )
+        self.addCleanup(manager.close)
+        return manager
+
+
+class BackendManagerTestCase(BackendTestCase):
+    def test_connection_is_reused(self) -> None:
+        manager = self.get_manager()
+        manager.write(b"1")
+        with manager.session():
+            manager.write(b"2")
+            manager.write(b"3")
+
+        self.assertEqual(1, len(DummyBackend.instances))
+        backend = DummyBackend.instances[0]
+        self.assertEqual("tcp://printer", backend.device_specifier)
+        self.assertEqual([b"1", b"2", b"3"], backend.written)
+        self.assertTrue(manager.is_connected)
+
+        manager.close()
+        self.assertTrue(backend.disposed)
+        self.assertFalse(manager.is_connected)
+
+    def test_reconnect_on_error(self) -> None:
+        manager = self.get_manager()
+        manager.write(b"1")
+        DummyBackend.failures = [BrokenPipeError("closed")]
+        manager.write(b"2")
+
+        self.assertEqual(2, len(DummyBackend.instances))
+        first, second = DummyBackend.instances
+        self.assertTrue(first.disposed)
+        self.assertEqual([b"1"], first.written)
+        self.assertEqual([b"2"], second.written)
+
+    def test_no_reconnect_for_new_connection(self) -> None:
+        manager = self.get_manager()
+        DummyBackend.failures = [ConnectionRefusedError("offline")]
+        with self.assertRaises(ConnectionRefusedError):
+            manager.write(b"1")
+        self.assertEqual(1, len(DummyBackend.instances))
+        self.assertTrue(DummyBackend.instances[0].disposed)
+        self.assertFalse(manager.is_connected)
+
+    def test_chunks(self) -> None:
+        manager = self.get_manager(chunk_size=4)
+        progress: list[int] = []
+        manager.write(b"0123456789", progress=progress.append)
+
+        self.assertEqual([b"0123", b"4567", b"89"], DummyBackend.instances[0].written)
+        self.assertEqual([4, 4, 2], progress)
+
+    def test_no_reconnect_after_first_chunk(self) -> None:
+        manager = self.get_manager(chunk_size=4)
+        manager.write(b"1")
+        DummyBackend.failures = [None, BrokenPipeError("closed")]
+        with self.assertRaises(BrokenPipeError):
+            manager.write(b"01234567")
+        self.assertEqual(1, len(DummyBackend.instances))
+        self.assertEqual([b"1", b"0123"], DummyBackend.instances[0].written)
+
+    def test_no_reconnect_after_first_page(self) -> None:
+        manager = self.get_manager()
+        manager.write(b"1")
+        with manager.session():
+            manager.write(b"2")
+            DummyBackend.failures = [BrokenPipeError("closed")]
+            # The next page of the raster stream would lack the preamble.
+            with self.assertRaises(BrokenPipeError):
+                manager.write(b"3")
+        self.assertEqual(1, len(DummyBackend.instances))
+        self.assertEqual([b"1", b"2"], DummyBackend.instances[0].written)
+
+    def test_read_status(self) -> None:
+        manager = self.get_manager()
+        self.assertIsNone(manager.read_status())
+
+        manager.write(b"1")
+        DummyBackend.statuses = [create_status(errors=0x01, status_type=0x02)]
+        status = manager.read_status()
+        assert status is not None
+        self.assertEqual("Error occurred", status["status_type"])
+        self.assertEqual(["No media when printing"], status["errors"])
+        self.assertIsNone(manager.read_status())
+
+    def test_request_status(self) -> None:
+        manager = self.get_manager()
+        DummyBackend.statuses = [
+            # Reported after the previous job, thus skipped.
+            create_status(status_type=0x01),
+            create_status(media=(29, 90)),
+        ]
+        status = manager.request_status()
+        assert status is not None
+        self.assertEqual((29, 90), (status["media_width"], status["media_length"]))
+        # The printer is not reset, which would interrupt printing.
+        self.assertEqual([b"\x1biS"], DummyBackend.instances[0].written)
+        self.assertEqual(STATUS_REQUEST, b"\x1biS")
+
+        self.assertIsNone(manager.request_status(timeout=0.1))
+
+    def test_idle_timeout(self) -> None:
+        manager = self.get_manager(idle_timeout=0.05)
+        manager.write(b"1")
+        self.assertTrue(manager.is_connected)
+        for _ in range(100):
+            if not manager.is_connected:
+                break
+            time.sleep(0.01)
+        self.assertFalse(manager.is_connected)
+        self.assertTrue(DummyBackend.instances[0].disposed)
+
+    def test_no_idle_timeout(self) -> None:
+        manager = self.get_manager(idle_timeout=0)
+        with manager.session():
+            manager.write(b"1")
+            manager.write(b"2")
+            self.assertTrue(manager.is_connected)
+        self.assertFalse(manager.is_connected)
+        self.assertEqual(1, len(DummyBackend.instances))
+
+
+def create_labels(*texts: bytes) -> list[RasterLabel]:
+    return [RasterLabel(create_raster_page(text)) for text in texts]
+
+
+class PrintQueueTestCase(BackendTestCase):
+    def get_queue(self) -> PrintQueue:
+        queue = PrintQueue(backend_manager=self.get_manager(), max_finished_jobs=2)
+        queue.start()
+        self.addCleanup(queue.stop)
+        return queue
+
+    def wait_for(self, job: PrintJob) -> None:
+        for _ in range(500):
+            if job.is_finished:
+                return
+            time.sleep(0.01)
+        self.fail(f"Job did not finish: {job}")
+
+    def test_success(self) -> None:
+        queue = self.get_queue()
+        labels = [RasterLabel(create_raster_page(b"data"), copies=2)]
+        job = queue.submit(PrintJob(render=lambda: labels, label_count=2))
+        self.assertIs(job, queue.get_job(job.id))
+        self.wait_for(job)
+
+        self.assertEqual(JOB_DONE, job.state)
+        pages = list(iter_raster_pages(labels))
+        self.assertEqual(pages, DummyBackend.instances[0].written)
+        status = job.to_dict()
+        self.assertEqual(job.id, status["job_id"])
+        self.assertEqual("done", status["state"])
+        self.assertEqual("", status["error"])
+        self.assertEqual(2, status["label_count"])
+        self.assertEqual(2, status["labels_printed"])
+        self.assertEqual(len(b"".join(pages)), status["bytes_written"])
+        self.assertEqual({"queued", "rendering", "printing"}, set(status["timings"]))
+        for name, duration in status["timings"].items():
+            with self.subTest(name=name):
+                self.assertGreaterEqual(duration, 0)
+
+    def test_failure(self) -> None:
+        def render() -> list[RasterLabel]:
+            raise LookupError("Unknown label_size")
+
+        queue = self.get_queue()
+        job = queue.submit(PrintJob(render=render))
+        self.wait_for(job)
+
+        self.assertEqual(JOB_FAILED, job.state)
+        self.assertEqual("Unknown label_size", job.error)
+        self.assertEqual([], DummyBackend.instances)
+        self.assertIsNone(job.to_dict()["timings"]["printing"])
+
+    def test_printer_error(self) -> None:
+        DummyBackend.statuses = [
+            create_status(),
+            create_status(errors=0x01, status_type=0x02),
+        ]
+        queue = self.get_queue()
+        job = queue.submit(
+            PrintJob(render=lambda: create_labels(b"1", b"2", b"3"), label_count=3)
+        )
+        self.wait_for(job)
+
+        self.assertEqual(JOB_FAILED, job.state)
+        self.assertEqual("Printer error: No media when printing", job.error)
+        self.assertEqual(2, job.labels_printed)
+        self.assertEqual(
+            "Error occurred", job.to_dict()["printer_status"]["status_type"]
+        )
+
+    def test_cancel_queued(self) -> None:
+        render = mock.Mock(return_value=create_labels(b"data"))
+        cleanup = mock.Mock()
+        queue = PrintQueue(backend_manager=self.get_manager())
+        job = queue.submit(PrintJob(render=render, cleanup=cleanup))
+        self.assertTrue(job.cancel())
+        queue.start()
+        self.addCleanup(queue.stop)
+        self.wait_for(job)
+
+        self.assertEqual(JOB_CANCELLED, job.state)
+        render.assert_not_called()
+        cleanup.assert_called_once_with()
+        self.assertEqual([], DummyBackend.instances)
+        self.assertFalse(job.cancel())
+
+    def test_cancel_between_labels(self) -> None:
+        labels = create_labels(b"1", b"2", b"3")
+
+        def render() -> Iterator[RasterLabel]:
+            yield from labels[:2]
+            # Requested while the first label is being printed, as the page of each
+            # label is held back until the next label is available.
+            job.cancel()
+            yield labels[2]
+
+        queue = self.get_queue()
+        job = queue.submit(PrintJob(render=render, label_count=3))
+        self.wait_for(job)
+
+        self.assertEqual(JOB_CANCELLED, job.state)
+        first_page = next(iter_raster_pages(labels))
+        self.assertEqual((1, len(first_page)), (job.labels_printed, job.bytes_written))
+        # The printer discards the rest of the raster stream.
+        self.assertEqual([first_page, RESET], DummyBackend.instances[0].written)
+
+    def test_cleanup(self) -> None:
+        def render() -> list[RasterLabel]:
+            raise LookupError("Unknown label_size")
+
+        cleanups = [mock.Mock(), mock.Mock(side_effect=OSError("Missing file"))]
+        queue = self.get_queue()
+        jobs = [
+            queue.submit(
+                PrintJob(render=lambda: create_labels(b"data"), cleanup=cleanups[0])
+            ),
+            queue.submit(PrintJob(render=render, cleanup=cleanups[1])),
+        ]
+        self.wait_for(jobs[1])
+
+        self.assertEqual([JOB_DONE, JOB_FAILED], [job.state for job in jobs])
+        for cleanup in cleanups:
+            cleanup.assert_called_once_with()
+
+    def test_stopped(self) -> None:
+        cleanup = mock.Mock()
+        queue = self.get_queue()
+        queue.stop()
+        job = queue.submit(
+            PrintJob(render=lambda: create_labels(b"data"), cleanup=cleanup)
+        )
+        queue.stop()
+
+        self.assertEqual(JOB_CANCELLED, job.state)
+        self.assertEqual("The print queue has been stopped", job.error)
+        self.assertEqual(0, queue.load)
+        cleanup.assert_called_once_with()
+
+    def test_queued(self) -> None:
+        job = PrintJob(render=lambda: create_labels(b"data"))
+        self.assertEqual(JOB_QUEUED, job.state)
+        self.assertFalse(job.is_finished)
+        status = job.to_dict()
+        self.assertGreaterEqual(status["timings"]["queued"], 0)
+        self.assertIsNone(status["timings"]["rendering"])
+
+    def test_forget_finished_jobs(self) -> None:
+        queue = self.get_queue()
+        jobs = [
+            queue.submit(PrintJob(render=lambda: create_labels(b"data")))
+            for _ in range(4)
+        ]
+        self.wait_for(jobs[-1])
+        queue.stop()
+
+        self.assertIsNone(queue.get_job(jobs[0].id))
+        self.assertIsNone(queue.get_job(jobs[1].id))
+        self.assertIs(jobs[2], queue.get_job(jobs[2].id))
+        self.assertIs(jobs[3], queue.get_job(jobs[3].id))
+
+
+class PrintSchedulerTestCase(BackendTestCase):
+    def get_scheduler(self) -> PrintScheduler:
+        return PrintScheduler(
+            [
+                Printer(name="a", queue=PrintQueue(backend_manager=self.get_manager())),
+                Printer(
+                    name="b",
+                    queue=PrintQueue(backend_manager=self.get_manager()),
+                    label_sizes=("29x90",),
+                ),
+            ]
+        )
+
+    def submit(
+        self, scheduler: PrintScheduler, label_size: str, printer: str | None = None
+    ) -> PrintJob:
+        return scheduler.submit(
+            lambda selected: PrintJob(
+                render=lambda: create_labels(selected.name.encode())
+            ),
+            label_sizes={label_size},
+            printer_name=printer,
+        )
+
+    def test_routing(self) -> None:
+        # The queues are not started, thus the jobs stay queued.
+        scheduler = self.get_scheduler()
+        for label_size, expected in [
+            ("29x90", "a"),
+            ("29x90", "b"),
+            ("62", "a"),
+            ("29x90", "b"),
+            ("29x90", "a"),
+        ]:
+            with self.subTest(label_size=label_size, expected=expected):
+                job = self.submit(scheduler, label_size)
+                self.assertEqual(expected, job.printer)
+                self.assertIs(job, scheduler.get_job(job.id))
+        self.assertEqual([3, 2], [printer.queue.load for printer in scheduler.printers])
+
+    def test_explicit_printer(self) -> None:
+        scheduler = self.get_scheduler()
+        self.submit(scheduler, "29x90")
+        self.assertEqual("a", self.submit(scheduler, "29x90", printer="a").printer)
+        with self.assertRaisesRegex(LookupError, r"^Unknown printer: c$"):
+            self.submit(scheduler, "62", printer="c")
+        with self.assertRaisesRegex(LookupError, r"^No printer has 62 labels loaded$"):
+            self.submit(scheduler, "62", printer="b")
+
+    def test_print(self) -> None:
+        scheduler = self.get_scheduler()
+        scheduler.start()
+        self.addCleanup(scheduler.stop)
+        jobs = [self.submit(scheduler, "29x90") for _ in range(4)]
+        scheduler.stop()
+
+        self.assertTrue(all(job.state == JOB_DONE for job in jobs))
+        self.assertEqual(
+            {create_raster_page(b"a"), create_raster_page(b"b")},
+            {data for backend in DummyBackend.instances for data in backend.written},
+        )
+
+
+class JournalTestCase(BackendTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.journal = JobJournal(str(Path(directory.name) / "jobs.sqlite"))
+        self.journal.open()
+        self.addCleanup(self.journal.close)
+
+    def get_scheduler(self) -> PrintScheduler:
+        scheduler = PrintScheduler(
+            [
+                Printer(
+                    name="a",
+                    queue=PrintQueue(
+                        backend_manager=self.get_manager(), journal=self.journal
+                    ),
+                )
+            ]
+        )
+        self.addCleanup(scheduler.stop)
+        return scheduler
+
+    def select(self, query: str) -> list[tuple[Any, ...]]:
+        self.journal.flush()
+        with closing(sqlite3.connect(self.journal.path)) as connection:
+            return connection.execute(query).fetchall()
+
+    def test_print(self) -> None:
+        labels = [
+            RasterLabel(create_raster_page(b"1"), copies=2),
+            RasterLabel(create_raster_page(b"2"), cut_every=0),
+        ]
+        stored = []
+
+        def render() -> Iterator[RasterLabel]:
+            yield from labels
+            stored.extend(
+                self.select("SELECT number, first_page, copies, cut_every FROM labels")
+            )
+
+        scheduler = self.get_scheduler()
+        job = scheduler.submit(
+            lambda printer: PrintJob(render=render, label_count=3),
+            label_sizes={"62"},
+        )
+        # The labels are rendered and stored by the worker.
+        self.assertEqual(
+            [("a", 3, "queued", 0)],
+            self.select("SELECT printer, label_count, state, rendered FROM jobs"),
+        )
+        self.assertEqual([], self.select("SELECT * FROM labels"))
+
+        scheduler.start()
+        scheduler.stop()
+        self.assertEqual(JOB_DONE, job.state)
+        self.assertEqual(
+            list(iter_raster_pages(labels)), DummyBackend.instances[0].written
+        )
+        # Each label is stored once, together with its copies.
+        self.assertEqual([(0, 0, 2, 1), (1, 2, 1, 0)], stored)
+        self.assertEqual(
+            [("done", 3, 1)],
+            self.select("SELECT state, labels_printed, rendered FROM jobs"),
+        )
+        self.assertEqual([], self.select("SELECT * FROM labels"))
+
+    def test_rendered(self) -> None:
+        labels = [RasterLabel(create_raster_page(b"1"), copies=2)]
+        scheduler = self.get_scheduler()
+        job = scheduler.submit(
+            lambda printer: PrintJob(
+                render=lambda: labels, label_count=2, rendered=True
+            ),
+            label_sizes={"62"},
+        )
+        # The labels have been committed before returning.
+        with closing(sqlite3.connect(self.journal.path)) as connection:
+            self.assertEqual(
+                [(job.id, 0, 0, 2)],
+                connection.execute(
+                    "SELECT job_id, number, first_page, copies FROM labels"
+                ).fetchall(),
+            )
+        self.journal.close()
+        self.journal.open()
+
+        scheduler = self.get_scheduler()
+        jobs = scheduler.resume(self.journal)
+        self.assertEqual([job.id], [job.id for job in jobs])
+        scheduler.start()
+        scheduler.stop()
+        self.assertEqual(JOB_DONE, jobs[0].state)
+        self.assertEqual(
+            list(iter_raster_pages(labels)), DummyBackend.instances[0].written
+        )
+
+    def test_other_process(self) -> None:
+        # Another worker process sharing the journal.
+        other_scheduler = self.get_scheduler()
+        scheduler = self.get_scheduler()
+        job = scheduler.submit(
+            lambda printer: PrintJob(render=lambda: create_labels(b"1")), {"62"}
+        )
+        self.assertEqual({"a": 1}, other_scheduler._get_loads())
+        other_job = other_scheduler.get_job(job.id)
+        assert other_job is not None
+        self.assertIsNot(job, other_job)
+        self.assertEqual(
+            (job.id, "a", JOB_QUEUED),
+            (other_job.id, other_job.printer, other_job.state),
+        )
+        self.assertTrue(other_scheduler.cancel(other_job))
+        self.assertIsNone(other_scheduler.get_job("unknown"))
+
+        scheduler.start()
+        scheduler.stop()
+        self.assertEqual(JOB_CANCELLED, job.state)
+        self.assertEqual([], DummyBackend.instances)
+        self.journal.flush()
+        other_job = other_scheduler.get_job(job.id)
+        assert other_job is not None
+        self.assertEqual(JOB_CANCELLED, other_job.state)
+        self.assertFalse(other_scheduler.cancel(other_job))
+        self.assertEqual({"a": 0}, other_scheduler._get_loads())
+
+    def test_render_failure(self) -> None:
+        def render() -> Iterator[RasterLabel]:
+            yield RasterLabel(create_raster_page(b"1"))
+            raise LookupError("Unknown label_size")
+
+        scheduler = self.get_scheduler()
+        job = scheduler.submit(lambda printer: PrintJob(render=render), {"62"})
+        scheduler.start()
+        scheduler.stop()
+
+        self.assertEqual(JOB_FAILED, job.state)
+        self.assertEqual("Unknown label_size", job.error)
+        self.assertEqual(0, scheduler.printers[0].queue.load)
+        self.assertEqual(
+            [("failed", "Unknown label_size", 0)],
+            self.select("SELECT state, error, rendered FROM jobs"),
+        )
+        self.assertEqual([], self.select("SELECT * FROM labels"))
+
+    def test_resume(self) -> None:
+        label = RasterLabel(create_raster_page(b"data"), copies=3)
+        for index, (job_id, printer) in enumerate(
+            [("printed", "a"), ("queued", "a"), ("removed", "b"), ("unrendered", "a")]
+        ):
+            self.journal.add_job(job_id, printer, 3, 42.0 + index)
+            self.journal.add_label(job_id, 0, 0, label)
+            if job_id != "unrendered":
+                self.journal.set_rendered(job_id)
+        self.journal.update("printed", "printing", labels_printed=1, bytes_written=9)
+        self.journal.close()
+        self.journal.open()
+
+        scheduler = self.get_scheduler()
+        jobs = scheduler.resume(self.journal)
+        self.assertEqual(["printed", "queued"], [job.id for job in jobs])
+        self.assertEqual([1, 0], [job.labels_printed for job in jobs])
+        self.assertEqual([], scheduler.resume(self.journal))
+        scheduler.start()
+        scheduler.stop()
+
+        self.assertEqual([JOB_DONE, JOB_DONE], [job.state for job in jobs])
+        self.assertEqual(3, jobs[0].labels_printed)
+        # The remaining copies are printed as a new raster stream.
+        self.assertEqual(
+            [
+                *iter_raster_pages([label._replace(copies=2)]),
+                *iter_raster_pages([label]),
+            ],
+            DummyBackend.instances[0].written,
+        )
+        self.assertEqual(
+            [
+                ("printed", "done", ""),
+                ("queued", "done", ""),
+                ("removed", "failed", "Unknown printer: b"),
+                (
+                    "unrendered",
+                    "failed",
+                    "Interrupted before all labels had been rendered, "
+                    "0 of 3 labels printed",
+                ),
+            ],
+            self.select("SELECT id, state, error FROM jobs ORDER BY id"),
+        )
+
+
+class PrinterStatusTestCase(TestCase):
+    def test_check(self) -> None:
+        for status, label_size, expected in [
+            (PrinterStatus(online=True), "62", ""),
+            (PrinterStatus(online=False, error="refused"), "62", "offline (refused)"),
+            (PrinterStatus(online=True, errors=("Cover open",)), "62", "Cover open"),
+            (
+                PrinterStatus(online=True, media_type="No media"),
+                "62",
+                "no labels loaded",
+            ),
+            (
+                PrinterStatus(online=True, media_type="Die-cut", media_width=29),
+                "62",
+                "29 mm endless labels loaded instead of 62",
+            ),
+            (
+                PrinterStatus(
+                    online=True, media_type="Die-cut", media_width=29, media_length=90
+                ),
+                "29x90",
+                "",
+            ),
+        ]:
+            with self.subTest(status=status, label_size=label_size):
+                self.assertEqual(expected, status.check(label_size))
+
+    def test_from_response(self) -> None:
+        status = PrinterStatus.from_response(
+            {
+                "status_type": "Reply to status request",
+                "media_type": "Continuous length tape",
+                "media_width": 62,
+                "media_length": 0,
+                "errors": [],
+            }
+        )
+        self.assertEqual("62 mm endless", status.media)
+        self.assertTrue(status.to_dict()["ready"])
+
+
+class StatusPollerTestCase(BackendTestCase):
+    def get_printers(self) -> list[Printer]:
+        return [
+            Printer(name=name, queue=PrintQueue(backend_manager=self.get_manager()))
+            for name in ["a", "b"]
+        ]
+
+    def test_poll(self) -> None:
+        printers = self.get_printers()
+        poller = StatusPoller(printers, interval=0, timeout=0.1)
+        scheduler = PrintScheduler(printers, status_poller=poller)
+        self.assertIsNone(scheduler.get_status("a"))
+
+        DummyBackend.failures = [ConnectionRefusedError("refused")]
+        DummyBackend.statuses = [create_status(media=(29, 90))]
+        self.assertFalse(poller.poll(printers[0]).online)
+        self.assertEqual("29x90 mm", poller.poll(printers[1]).media)
+
+        # Both printers are rejected without rendering anything.
+        with self.assertRaisesRegex(
+            LookupError,
+            r"^Printer a is not ready: offline \(refused\); "
+            r"Printer b is not ready: 29x90 mm labels loaded instead of 62$",
+        ):
+            scheduler.select({"62"})
+        self.assertIs(printers[1], scheduler.select({"29x90"}))
+        with self.assertRaisesRegex(LookupError, r"^Printer a is not ready"):
+            scheduler.select({"29x90"}, printer_name="a")
+
+    def test_background(self) -> None:
+        printers = self.get_printers()
+        DummyBackend.statuses = [create_status(), create_status(media=(29, 90))]
+        poller = StatusPoller(printers, interval=60, timeout=1)
+        poller.start()
+        self.addCleanup(poller.stop)
+        for _ in range(200):
+            if poller.get("b") is not None:
+                break
+            time.sleep(0.01)
+        poller.stop()
+
+        self.assertEqual(
+            ["62 mm endless", "29x90 mm"],
+            [cast(PrinterStatus, poller.get(name)).media for name in ["a", "b"]],
+        )
+
+    def test_shared_file(self) -> None:
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared_file = str(Path(directory.name) / "status.json")
+        DummyBackend.statuses = [create_status(), create_status(media=(29, 90))]
+        polling = StatusPoller(
+            self.get_printers(), interval=60, timeout=1, shared_file=shared_file
+        )
+        polling.start()
+        self.addCleanup(polling.stop)
+        for _ in range(200):
+            if os.path.exists(shared_file):
+                break
+            time.sleep(0.01)
+        other = StatusPoller(
+            self.get_printers(), interval=0.01, timeout=1, shared_file=shared_file
+        )
+        other.start()
+        self.addCleanup(other.stop)
+        for _ in range(200):
+            if other.get("b") is not None:
+                break
+            time.sleep(0.01)
+        other.stop()
+        polling.stop()
+
+        # Only the first process polled the printers.
+        self.assertEqual(2, len(DummyBackend.instances))
+        self.assertEqual(
+            ["62 mm endless", "29x90 mm"],
+            [cast(PrinterStatus, other.get(name)).media for name in ["a", "b"]],
+        )
+
+
+class InterProcessLockTestCase(BackendTestCase):
+    def test_session_holds_lock(self) -> None:
+        with TemporaryDirectory() as directory:
+            lock_file = str(Path(directory) / "printer.lock")
+            manager = self.get_manager(lock_file=lock_file)
+            with manager.session():
+                manager.write(b"1")
+                with open(lock_file) as fd:
+                    with self.assertRaises(BlockingIOError):
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self.assertTrue(manager.is_connected)
+
+            # The connection is closed for other processes to use the printer.
+            self.assertFalse(manager.is_connected)
+            with open(lock_file) as fd:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(fd, fcntl.LOCK_UN)
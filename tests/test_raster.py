@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from brother_ql_web import raster
+from brother_ql_web.labels import generate_label, LabelParameters
+
+from tests import create_raster_page, ROBOTO_REGULAR, TestCase
+
+
+class SplitRasterDataTestCase(TestCase):
+    def test_split(self) -> None:
+        preamble, commands, rows = raster.split_raster_data(create_raster_page(b"data"))
+        self.assertEqual(b"\x00" * 200 + b"\x1b\x40", preamble)
+        self.assertEqual(
+            [b"\x1biS", b"\x1biz", b"\x1biM", b"\x1biA", b"\x1biK", b"\x1bid"],
+            [command[:3] for command in commands],
+        )
+        self.assertEqual(b"data", rows)
+
+    def test_invalid(self) -> None:
+        for data in [b"data", create_raster_page(b"data", last=False)]:
+            with self.subTest(data=data):
+                with self.assertRaisesRegex(ValueError, r"^The raster data does not"):
+                    raster.split_raster_data(data)
+
+
+class IterRasterPagesTestCase(TestCase):
+    def test_single_label(self) -> None:
+        parameters = LabelParameters(
+            font_family="Roboto",
+            font_style="Regular",
+            font_path=ROBOTO_REGULAR,
+            text="Hello",
+        )
+        data = generate_label(parameters, self.example_configuration).data
+        self.assertEqual(
+            [data], list(raster.iter_raster_pages([raster.RasterLabel(data)]))
+        )
+
+    def test_copies(self) -> None:
+        pages = list(
+            raster.iter_raster_pages(
+                [
+                    raster.RasterLabel(create_raster_page(b"first"), copies=3),
+                    raster.RasterLabel(create_raster_page(b"second")),
+                ]
+            )
+        )
+        self.assertEqual(
+            [
+                create_raster_page(b"first", last=False),
+                create_raster_page(b"first", first=False, last=False),
+                create_raster_page(b"first", first=False, last=False),
+                create_raster_page(b"second", first=False),
+            ],
+            pages,
+        )
+        # The pages of the copies are reused instead of being assembled again.
+        self.assertIs(pages[1], pages[2])
+        self.assertEqual([], list(raster.iter_raster_pages([])))
+
+    def test_cut_every(self) -> None:
+        data = create_raster_page(b"data")
+        for cut_every, expected in [
+            (3, b"\x1biM\x40\x1biA\x03\x1biK\x08"),
+            (0, b"\x1biM\x00\x1biK\x08"),
+        ]:
+            with self.subTest(cut_every=cut_every):
+                pages = list(
+                    raster.iter_raster_pages(
+                        [raster.RasterLabel(data, copies=2, cut_every=cut_every)]
+                    )
+                )
+                self.assertEqual(2, len(pages))
+                for page in pages:
+                    self.assertIn(expected, page)
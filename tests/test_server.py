@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from threading import Barrier, Thread
+from typing import Any, Callable, Iterable
+from urllib.request import urlopen
+from wsgiref.simple_server import WSGIServer, make_server
+
+from brother_ql_web import server
+
+from tests import TestCase
+
+
+class GetServerOptionsTestCase(TestCase):
+    def test_backends(self) -> None:
+        configuration = self.example_configuration
+        configuration.server.workers = 3
+        expected = {
+            "wsgiref": {"server": "wsgiref"},
+            "threading": {"server": server.ThreadPoolServer, "workers": 3},
+            "waitress": {"server": "waitress", "threads": 3},
+            "cheroot": {"server": "cheroot", "numthreads": 3},
+            "gunicorn": {"server": "gunicorn", "workers": 3},
+        }
+        self.assertEqual(set(server.SERVER_BACKENDS), set(expected))
+        for backend, options in expected.items():
+            with self.subTest(backend=backend):
+                configuration.server.backend = backend
+                self.assertEqual(options, server.get_server_options(configuration))
+
+    def test_unknown_backend(self) -> None:
+        configuration = self.example_configuration
+        configuration.server.backend = "dummy"
+        with self.assertRaisesRegex(ValueError, r"^Unknown server backend: dummy$"):
+            server.get_server_options(configuration)
+
+
+class GetPrinterLockFileTestCase(TestCase):
+    def test_get_printer_lock_file(self) -> None:
+        configuration = self.example_configuration
+        self.assertIsNone(server.get_printer_lock_file(configuration))
+
+        configuration.server.backend = "threading"
+        configuration.server.workers = 4
+        self.assertIsNone(server.get_printer_lock_file(configuration))
+
+        configuration.server.backend = "gunicorn"
+        lock_file = server.get_printer_lock_file(configuration)
+        self.assertRegex(str(lock_file), r"brother_ql_web-[0-9a-f]{16}\.lock$")
+
+        configuration.printer.printer = "tcp://192.168.0.23"
+        self.assertNotEqual(lock_file, server.get_printer_lock_file(configuration))
+
+
+class GetPrinterStatusFileTestCase(TestCase):
+    def test_get_printer_status_file(self) -> None:
+        configuration = self.example_configuration
+        self.assertIsNone(server.get_printer_status_file(configuration))
+
+        configuration.server.backend = "gunicorn"
+        configuration.server.workers = 4
+        self.assertRegex(
+            str(server.get_printer_status_file(configuration)),
+            r"brother_ql_web-[0-9a-f]{16}\.json$",
+        )
+
+
+class GetTemplateLockFileTestCase(TestCase):
+    def test_get_template_lock_file(self) -> None:
+        configuration = self.example_configuration
+        configuration.server.template_file = "/srv/templates.json"
+        self.assertIsNone(server.get_template_lock_file(configuration))
+
+        configuration.server.backend = "gunicorn"
+        configuration.server.workers = 4
+        lock_file = server.get_template_lock_file(configuration)
+        self.assertRegex(str(lock_file), r"brother_ql_web-[0-9a-f]{16}\.lock$")
+        self.assertNotEqual(lock_file, server.get_printer_lock_file(configuration))
+
+
+class PooledWSGIServerTestCase(TestCase):
+    def test_concurrent_requests(self) -> None:
+        # Both requests have to be processed at the same time to pass the barrier.
+        barrier = Barrier(2, timeout=5)
+
+        def app(
+            environ: dict[str, Any], start_response: Callable[..., Any]
+        ) -> Iterable[bytes]:
+            barrier.wait()
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return [b"ok"]
+
+        server_class = type("Server", (server.PooledWSGIServer,), {"workers": 2})
+        httpd: WSGIServer = make_server("127.0.0.1", 0, app, server_class=server_class)
+        thread = Thread(target=httpd.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(httpd.server_close)
+        self.addCleanup(httpd.shutdown)
+
+        url = f"http://127.0.0.1:{httpd.server_port}/"
+        results: list[bytes] = []
+
+        def fetch() -> None:
+            with urlopen(url, timeout=5) as response:
+                results.append(response.read())
+
+        clients = [Thread(target=fetch) for _ in range(2)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        self.assertEqual([b"ok", b"ok"], results)
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from importlib.util import find_spec
+from unittest import mock, skipIf
+
+from brother_ql_web import symbols
+
+from tests import TestCase
+
+
+def decode_code128(values: list[int]) -> str:
+    checksum = values[0] + sum(index * value for index, value in enumerate(values[:-2]))
+    assert values[-2] == checksum % 103
+    assert values[-1] == 106
+    text = ""
+    code_set = "C" if values[0] == 105 else "B"
+    for value in values[1:-2]:
+        if code_set == "B" and value == 99:
+            code_set = "C"
+        elif code_set == "C" and value == 100:
+            code_set = "B"
+        elif code_set == "C":
+            text += f"{value:02d}"
+        else:
+            text += chr(value + 32)
+    return text
+
+
+class EncodeCode128TestCase(TestCase):
+    def test_encode(self) -> None:
+        for data, expected in [
+            ("Hello", [104, 40, 69, 76, 76, 79]),
+            ("1234", [105, 12, 34]),
+            ("99", [105, 99]),
+            ("123", [104, 17, 18, 19]),
+            ("A1234567B", [104, 33, 17, 99, 23, 45, 67, 100, 34]),
+        ]:
+            with self.subTest(data=data):
+                values = symbols.encode_code128(data)
+                self.assertEqual(expected, values[:-2])
+                self.assertEqual(data, decode_code128(values))
+
+    def test_invalid(self) -> None:
+        with self.assertRaisesRegex(ValueError, r"^Code 128 barcodes require data$"):
+            symbols.encode_code128("")
+        with self.assertRaisesRegex(ValueError, r"^Unsupported character"):
+            symbols.encode_code128("Grüße")
+
+
+class RenderSymbolTestCase(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        symbols._symbol_cache.clear()
+        self.addCleanup(symbols._symbol_cache.clear)
+
+    def test_code128(self) -> None:
+        image = symbols.render_symbol("code128", "Hello", module_size=2, height=30)
+        # 7 symbols of 11 modules, the stop symbol of 13 modules and the quiet zones.
+        self.assertEqual(((7 * 11 + 13 + 20) * 2, 30), image.size)
+        self.assertEqual({0, 255}, set(image.tobytes()))
+        self.assertEqual(255, image.getpixel((19, 0)))
+        self.assertEqual(0, image.getpixel((20, 29)))
+
+    def test_cached(self) -> None:
+        symbols.render_symbol("code128", "Hello", module_size=2, height=30)
+        with mock.patch.object(symbols, "_create_code128_matrix") as create_mock:
+            symbols.render_symbol("code128", "Hello", module_size=3, height=40)
+        create_mock.assert_not_called()
+        self.assertEqual(1, symbols.get_cache_statistics()["hits"])
+
+    @skipIf(find_spec("segno") is None, "segno is not installed")
+    def test_qr(self) -> None:
+        image = symbols.render_symbol("qr", "Hello", module_size=4, height=30)
+        # Version 1 with 21 modules and the quiet zone of 4 modules.
+        self.assertEqual(((21 + 8) * 4, (21 + 8) * 4), image.size)
+        self.assertEqual(255, image.getpixel((15, 15)))
+        self.assertEqual(0, image.getpixel((16, 16)))
+
+    def test_invalid(self) -> None:
+        with self.assertRaisesRegex(ValueError, r"^Unknown barcode type: ean$"):
+            symbols.render_symbol("ean", "123", module_size=1, height=10)
+        with self.assertRaisesRegex(ValueError, r"^The module size"):
+            symbols.render_symbol("code128", "123", module_size=0, height=10)
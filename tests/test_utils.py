@@ -54,6 +54,81 @@ class CollectFontsTestCase(TestCase):
         )
 
 
+class FontRegistryTestCase(TestCase):
+    def test_refresh(self) -> None:
+        registry = utils.FontRegistry(self.example_configuration)
+        fonts = registry.fonts
+        self.assertEqual({}, fonts)
+
+        dummy_fonts = {
+            "DejaVu Serif": {"Book": "dummy", "Regular": "dummy2"},
+            "Font": {"Style": "path"},
+        }
+        with mock.patch.object(
+            utils, "collect_fonts", return_value=dummy_fonts
+        ) as collect_mock:
+            self.assertIs(fonts, registry.refresh())
+        collect_mock.assert_called_once_with(registry.configuration)
+        self.assertEqual(dummy_fonts, fonts)
+
+        with mock.patch.object(
+            utils, "collect_fonts", return_value={"Font": {"Style": "path2"}}
+        ):
+            registry.refresh()
+        self.assertIs(fonts, registry.fonts)
+        self.assertEqual({"Font": {"Style": "path2"}}, fonts)
+
+    def test_get_path(self) -> None:
+        registry = utils.FontRegistry(self.example_configuration)
+        with mock.patch.object(
+            utils, "collect_fonts", return_value={"Font": {"Style": "path"}}
+        ):
+            registry.refresh()
+
+        self.assertEqual("path", registry.get_path("Font", "Style"))
+        with self.assertRaises(KeyError):
+            registry.get_path("Font", "Bold")
+        with self.assertRaises(KeyError):
+            registry.get_path("Another font", "Style")
+
+
+class GetFontRegistryTestCase(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.addCleanup(setattr, utils, "_font_registry", None)
+
+    def test_built_once(self) -> None:
+        configuration = self.example_configuration
+        with mock.patch.object(
+            utils, "collect_fonts", return_value={"Font": {"Style": "path"}}
+        ) as collect_mock:
+            registry = utils.get_font_registry(configuration)
+            self.assertIs(registry, utils.get_font_registry(configuration))
+            self.assertIs(registry, utils.get_font_registry(self.example_configuration))
+        collect_mock.assert_called_once_with(configuration)
+        self.assertEqual({"Font": {"Style": "path"}}, registry.fonts)
+
+    def test_rebuilt_on_folder_change(self) -> None:
+        configuration = self.example_configuration
+        with mock.patch.object(
+            utils, "collect_fonts", return_value={"Font": {"Style": "path"}}
+        ) as collect_mock:
+            registry = utils.get_font_registry(configuration)
+            configuration = self.example_configuration
+            configuration.server.additional_font_folder = "/path/to/fonts"
+            self.assertIsNot(registry, utils.get_font_registry(configuration))
+        self.assertEqual(2, collect_mock.call_count)
+
+    def test_refresh_fonts(self) -> None:
+        configuration = self.example_configuration
+        with mock.patch.object(
+            utils, "collect_fonts", return_value={"Font": {"Style": "path"}}
+        ) as collect_mock:
+            fonts = utils.refresh_fonts(configuration)
+        self.assertEqual(2, collect_mock.call_count)
+        self.assertIs(fonts, utils.get_font_registry(configuration).fonts)
+
+
 class GetLabelSizesTestCase(TestCase):
     def test_get_label_sizes(self) -> None:
         sizes = utils.get_label_sizes()
@@ -1,4 +1,102 @@
-from unittest import TestCase
+from __future__ import annotations
+
+import base64
+import json
+import os
+import tempfile
+from io import BytesIO
+from typing import Any
+from unittest import mock
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+import bottle
+from brother_ql_web import web
+from brother_ql_web.labels import create_label_image
+from PIL import Image
+
+from tests import create_raster_page, ROBOTO_REGULAR, TestCase
+
+
+class Response:
+    def __init__(self, status: str, headers: list[tuple[str, str]], body: bytes):
+        self.status_code = int(status.split(" ", 1)[0])
+        self.headers = {key.lower(): value for key, value in headers}
+        self.body = body
+
+
+class WebTestCase(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.use_fonts({"Roboto": {"Regular": ROBOTO_REGULAR}})
+        self.configuration = self.example_configuration
+        self.configuration.server.printer_status_interval = 0
+        self.app = bottle.default_app()
+        self.backend_class = mock.MagicMock()
+        with mock.patch.object(self.app, "run"):
+            web.main(
+                configuration=self.configuration,
+                fonts={"Roboto": {"Regular": ROBOTO_REGULAR}},
+                label_sizes=[("62", "62mm endless")],
+                backend_classes={"default": self.backend_class},
+            )
+
+    def request(
+        self,
+        path: str,
+        data: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+        method: str = "POST",
+        json_data: Any = None,
+        files: dict[str, tuple[str, bytes]] | None = None,
+    ) -> Response:
+        if json_data is not None:
+            body = json.dumps(json_data).encode("utf-8")
+            content_type = "application/json"
+        elif files is not None:
+            boundary = "boundary"
+            parts = []
+            for name, value in (data or {}).items():
+                parts.append(
+                    f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"'
+                    f"\r\n\r\n{value}\r\n".encode("utf-8")
+                )
+            for name, (filename, content) in files.items():
+                parts.append(
+                    f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                    f'filename="{filename}"\r\n\r\n'.encode("utf-8") + content + b"\r\n"
+                )
+            body = b"".join(parts) + f"--{boundary}--\r\n".encode("utf-8")
+            content_type = f"multipart/form-data; boundary={boundary}"
+        else:
+            body = urlencode(data or {}).encode("utf-8")
+            content_type = "application/x-www-form-urlencoded"
+        environ: dict[str, Any] = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path.partition("?")[0],
+            "QUERY_STRING": path.partition("?")[2],
+            "CONTENT_TYPE": content_type,
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": BytesIO(body),
+        }
+        for key, value in (headers or {}).items():
+            environ["HTTP_" + key.upper().replace("-", "_")] = value
+        setup_testing_defaults(environ)
+
+        result: dict[str, Any] = {}
+
+        def start_response(
+            status: str, response_headers: list[tuple[str, str]], exc_info: Any = None
+        ) -> None:
+            result["status"] = status
+            result["headers"] = response_headers
+
+        chunks = self.app(environ, start_response)
+        return Response(
+            status=result["status"],
+            headers=result["headers"],
+            body=b"".join(chunks),
+        )
 
 
 class GetConfigTestCase(TestCase):
@@ -21,13 +119,711 @@ class GetLabelParametersTestCase(TestCase):
     pass
 
 
-class GetPreviewImageTestCase(TestCase):
-    pass
+class GetPreviewImageTestCase(WebTestCase):
+    DATA = {"text": "Hello", "font_family": "Roboto (Regular)", "font_size": 50}
 
+    def test_png(self) -> None:
+        response = self.request("/api/preview/text", data=self.DATA)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("image/png", response.headers["content-type"])
+        self.assertTrue(response.body.startswith(b"\x89PNG"))
+        self.assertRegex(response.headers["etag"], r'^"[0-9a-f]{64}-png"$')
 
-class PrintTextTestCase(TestCase):
-    pass
+    def test_cached(self) -> None:
+        with mock.patch(
+            "brother_ql_web.web.create_label_image", side_effect=create_label_image
+        ) as create_mock:
+            png = self.request("/api/preview/text", data=self.DATA)
+            encoded = self.request(
+                "/api/preview/text?return_format=base64", data=self.DATA
+            )
+        create_mock.assert_called_once()
+        self.assertEqual("text/plain", encoded.headers["content-type"])
+        self.assertEqual(
+            png.headers["etag"].replace("-png", "-base64"), encoded.headers["etag"]
+        )
+        self.assertEqual(png.body, base64.b64decode(encoded.body))
+
+        statistics = json.loads(
+            self.request("/api/statistics/caches", method="GET").body
+        )
+        self.assertEqual(1, statistics["previews"]["hits"])
+        self.assertEqual(1, statistics["previews"]["misses"])
+
+    def test_not_modified(self) -> None:
+        path = f"/api/preview/text?{urlencode(self.DATA)}"
+        etag = self.request(path, method="GET").headers["etag"]
+        with mock.patch("brother_ql_web.web.create_label_image") as create_mock:
+            response = self.request(
+                path, method="GET", headers={"If-None-Match": f'"other", {etag}'}
+            )
+        create_mock.assert_not_called()
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b"", response.body)
+
+        # The ETag of the PNG does not match the base64 response.
+        response = self.request(
+            f"{path}&return_format=base64",
+            method="GET",
+            headers={"If-None-Match": etag},
+        )
+        self.assertEqual(200, response.status_code)
+
+        response = self.request(
+            f"/api/preview/text?{urlencode({**self.DATA, 'text': 'Changed'})}",
+            method="GET",
+            headers={"If-None-Match": etag},
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.headers["etag"])
+
+    def test_precondition_failed(self) -> None:
+        etag = self.request("/api/preview/text", data=self.DATA).headers["etag"]
+        response = self.request(
+            "/api/preview/text", data=self.DATA, headers={"If-None-Match": etag}
+        )
+        self.assertEqual(412, response.status_code)
+        self.assertEqual(b"", response.body)
+
+    def test_superseded(self) -> None:
+        sequencer = self.app.config["brother_ql_web.preview_sequencer"]
+        sequencer.announce("client", 2)
+        with mock.patch("brother_ql_web.web.create_label_image") as create_mock:
+            response = self.request(
+                "/api/preview/text",
+                data={**self.DATA, "preview_client": "client", "preview_sequence": 1},
+            )
+        create_mock.assert_not_called()
+        self.assertEqual(204, response.status_code)
+
+
+class PrintTextTestCase(WebTestCase):
+    DATA = {"text": "Hello", "font_family": "Roboto (Regular)", "label_count": 2}
+
+    def test_print(self) -> None:
+        print_scheduler = self.app.config["brother_ql_web.print_scheduler"]
+        print_scheduler.start()
+        self.addCleanup(print_scheduler.stop)
+
+        with mock.patch(
+            "brother_ql_web.web.generate_label",
+            return_value=mock.Mock(data=create_raster_page(b"data")),
+        ):
+            response = self.request("/api/print/text", data=self.DATA)
+            result = json.loads(response.body)
+            self.assertTrue(result["success"])
+            print_scheduler.stop()
+
+        status = json.loads(
+            self.request(f"/api/print/jobs/{result['job_id']}", method="GET").body
+        )
+        self.assertEqual("done", status["state"])
+        self.assertEqual(2, status["labels_printed"])
+        backend = self.backend_class.return_value
+        # A single raster stream, with the printer being initialized once only.
+        self.assertEqual(
+            [
+                mock.call(create_raster_page(b"data", last=False)),
+                mock.call(create_raster_page(b"data", first=False)),
+            ],
+            backend.write.call_args_list,
+        )
+
+    def test_unknown_job(self) -> None:
+        response = self.request("/api/print/jobs/unknown", method="GET")
+        self.assertEqual(404, response.status_code)
+        self.assertEqual({"error": "Unknown print job"}, json.loads(response.body))
+
+    def test_cancel(self) -> None:
+        print_scheduler = self.app.config["brother_ql_web.print_scheduler"]
+        self.addCleanup(print_scheduler.stop)
+        with mock.patch("brother_ql_web.web.generate_label") as generate_mock:
+            response = self.request("/api/print/text", data=self.DATA)
+            job_id = json.loads(response.body)["job_id"]
+            response = self.request(f"/api/print/jobs/{job_id}", method="DELETE")
+            self.assertEqual(202, response.status_code)
+            print_scheduler.start()
+            print_scheduler.stop()
+        generate_mock.assert_not_called()
+
+        status = json.loads(
+            self.request(f"/api/print/jobs/{job_id}", method="GET").body
+        )
+        self.assertEqual("cancelled", status["state"])
+        response = self.request(f"/api/print/jobs/{job_id}", method="DELETE")
+        self.assertEqual(409, response.status_code)
+        response = self.request("/api/print/jobs/unknown", method="DELETE")
+        self.assertEqual(404, response.status_code)
+
+
+class PrinterStatusTestCase(WebTestCase):
+    DATA = {"text": "Hello", "font_family": "Roboto (Regular)"}
+
+    def test_status(self) -> None:
+        response = self.request("/api/printers", method="GET")
+        self.assertEqual(
+            {
+                "printers": [
+                    {
+                        "name": "default",
+                        "model": "QL-500",
+                        "label_sizes": [],
+                        "load": 0,
+                        "status": None,
+                    }
+                ]
+            },
+            json.loads(response.body),
+        )
+
+        print_scheduler = self.app.config["brother_ql_web.print_scheduler"]
+        self.backend_class.side_effect = OSError("No such device")
+        print_scheduler.status_poller.poll(print_scheduler.printers[0])
+        response = self.request("/api/printers", method="GET")
+        status = json.loads(response.body)["printers"][0]["status"]
+        self.assertEqual(
+            (False, "offline (No such device)"), (status["ready"], status["problem"])
+        )
+
+    def test_rejected_before_rendering(self) -> None:
+        print_scheduler = self.app.config["brother_ql_web.print_scheduler"]
+        self.backend_class.side_effect = OSError("No such device")
+        print_scheduler.status_poller.poll(print_scheduler.printers[0])
+
+        with mock.patch("brother_ql_web.web.generate_label") as generate_mock:
+            response = self.request("/api/print/text", data=self.DATA)
+            self.assertEqual(
+                {
+                    "success": False,
+                    "error": "Printer default is not ready: offline (No such device)",
+                },
+                json.loads(response.body),
+            )
+            response = self.request("/api/v2/labels/print", json_data=self.DATA)
+            self.assertEqual(503, response.status_code)
+            self.assertEqual(
+                "printer_unavailable", json.loads(response.body)["error"]["code"]
+            )
+        generate_mock.assert_not_called()
+
+    def test_unknown_printer(self) -> None:
+        with mock.patch("brother_ql_web.web.generate_label") as generate_mock:
+            response = self.request(
+                "/api/v2/labels/print?printer=unknown", json_data=self.DATA
+            )
+            self.assertEqual(422, response.status_code)
+            self.assertEqual(
+                {
+                    "code": "unknown_printer",
+                    "message": "Unknown printer: unknown",
+                    "field": "printer",
+                },
+                json.loads(response.body)["error"],
+            )
+            print_scheduler = self.app.config["brother_ql_web.print_scheduler"]
+            print_scheduler.printers[0].label_sizes = ("29",)
+            response = self.request("/api/v2/labels/print", json_data=self.DATA)
+            self.assertEqual(422, response.status_code)
+            self.assertEqual(
+                {
+                    "code": "unsupported_label_size",
+                    "message": "No printer has 62 labels loaded",
+                    "field": "label_size",
+                },
+                json.loads(response.body)["error"],
+            )
+        generate_mock.assert_not_called()
+
+
+class JsonBodyTestCase(WebTestCase):
+    def test_preview(self) -> None:
+        form = self.request(
+            "/api/preview/text",
+            data={"text": "Hello\nWorld", "font_family": "Roboto (Regular)"},
+        )
+        response = self.request(
+            "/api/preview/text",
+            json_data={
+                "text": "Hello\nWorld",
+                "font_family": "Roboto (Regular)",
+                "font_size": 100,
+            },
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(form.headers["etag"], response.headers["etag"])
+
+    def test_invalid(self) -> None:
+        response = self.request("/api/print/text", json_data=["Hello"])
+        self.assertEqual(
+            {"success": False, "error": "Label parameters have to be a JSON object"},
+            json.loads(response.body),
+        )
+
+
+class ApiV2TestCase(WebTestCase):
+    DATA = {"text": "Hello", "font_family": "Roboto (Regular)", "font_size": 50}
+
+    def test_preview(self) -> None:
+        response = self.request("/api/v2/labels/preview", json_data=self.DATA)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("image/png", response.headers["content-type"])
+        self.assertTrue(response.body.startswith(b"\x89PNG"))
+
+    def test_print(self) -> None:
+        print_scheduler = self.app.config["brother_ql_web.print_scheduler"]
+        print_scheduler.start()
+        self.addCleanup(print_scheduler.stop)
+
+        with mock.patch(
+            "brother_ql_web.web.generate_label",
+            return_value=mock.Mock(data=create_raster_page(b"data")),
+        ):
+            response = self.request(
+                "/api/v2/labels/print",
+                json_data={**self.DATA, "label_count": 2, "high_quality": False},
+            )
+            print_scheduler.stop()
+        self.assertEqual(202, response.status_code)
+        result = json.loads(response.body)
+        self.assertEqual(2, result["label_count"])
+
+        response = self.request(f"/api/v2/jobs/{result['job_id']}", method="GET")
+        self.assertEqual("done", json.loads(response.body)["state"])
+
+    def test_errors(self) -> None:
+        for body, status, error in [
+            (
+                ["Hello"],
+                400,
+                {
+                    "code": "invalid_request",
+                    "message": "The request body has to be a JSON object",
+                },
+            ),
+            (
+                {**self.DATA, "colour": "red"},
+                400,
+                {
+                    "code": "unknown_field",
+                    "message": "Unknown field: colour",
+                    "field": "colour",
+                },
+            ),
+            (
+                {**self.DATA, "font_size": "50"},
+                400,
+                {
+                    "code": "invalid_type",
+                    "message": "The font_size has to be an integer",
+                    "field": "font_size",
+                },
+            ),
+            (
+                {**self.DATA, "label_count": True},
+                400,
+                {
+                    "code": "invalid_type",
+                    "message": "The label_count has to be an integer",
+                    "field": "label_count",
+                },
+            ),
+            (
+                {**self.DATA, "label_size": "foo"},
+                422,
+                {"code": "invalid_value", "message": "Unknown label_size"},
+            ),
+            (
+                # Rejected before queueing the label for printing.
+                {**self.DATA, "barcode": "Grüße"},
+                422,
+                {
+                    "code": "invalid_value",
+                    "message": "Unsupported character for Code 128: 'ü'",
+                },
+            ),
+        ]:
+            for path in ["/api/v2/labels/preview", "/api/v2/labels/print"]:
+                with self.subTest(body=body, path=path):
+                    response = self.request(path, json_data=body)
+                    self.assertEqual(status, response.status_code)
+                    self.assertEqual(
+                        "application/json", response.headers["content-type"]
+                    )
+                    self.assertEqual({"error": error}, json.loads(response.body))
+
+    def test_unknown_job(self) -> None:
+        response = self.request("/api/v2/jobs/unknown", method="GET")
+        self.assertEqual(404, response.status_code)
+        self.assertEqual("not_found", json.loads(response.body)["error"]["code"])
+
+    def test_cancel(self) -> None:
+        response = self.request("/api/v2/labels/print", json_data=self.DATA)
+        job_id = json.loads(response.body)["job_id"]
+        response = self.request(f"/api/v2/jobs/{job_id}", method="DELETE")
+        self.assertEqual(202, response.status_code)
+        self.assertTrue(json.loads(response.body)["job_id"])
+
+        print_scheduler = self.app.config["brother_ql_web.print_scheduler"]
+        print_scheduler.start()
+        print_scheduler.stop()
+        response = self.request(f"/api/v2/jobs/{job_id}", method="DELETE")
+        self.assertEqual(409, response.status_code)
+        self.assertEqual("conflict", json.loads(response.body)["error"]["code"])
+
+
+class ImageLabelTestCase(WebTestCase):
+    def get_image(self) -> bytes:
+        buffer = BytesIO()
+        Image.new("RGB", (100, 50), "black").save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def test_preview(self) -> None:
+        response = self.request(
+            "/api/preview/image",
+            data={"label_size": "62"},
+            files={"image": ("logo.png", self.get_image())},
+        )
+        self.assertEqual(200, response.status_code)
+        preview = Image.open(BytesIO(response.body))
+        self.assertEqual((696, 348), preview.size)
+
+    def test_preview_invalid(self) -> None:
+        response = self.request(
+            "/api/preview/image", files={"image": ("logo.png", b"Hello")}
+        )
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(b"Unsupported image format", response.body)
+
+        response = self.request("/api/preview/image", files={})
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(b"Please provide the image", response.body)
+
+    def test_print(self) -> None:
+        print_scheduler = self.app.config["brother_ql_web.print_scheduler"]
+        print_scheduler.start()
+        self.addCleanup(print_scheduler.stop)
+
+        response = self.request(
+            "/api/print/image",
+            data={"label_size": "29x90", "high_quality": ""},
+            files={"image": ("logo.png", self.get_image())},
+        )
+        result = json.loads(response.body)
+        self.assertTrue(result["success"])
+        print_scheduler.stop()
+
+        status = json.loads(
+            self.request(f"/api/print/jobs/{result['job_id']}", method="GET").body
+        )
+        self.assertEqual("done", status["state"])
+        # The raster data of the label is sent in chunks.
+        written = [
+            call.args[0]
+            for call in self.backend_class.return_value.write.call_args_list
+        ]
+        self.assertEqual(status["bytes_written"], sum(map(len, written)))
+        self.assertTrue(b"".join(written).endswith(b"\x1a"))
+        self.assertLessEqual(max(map(len, written)), 16384)
+
+    def test_print_invalid(self) -> None:
+        response = self.request(
+            "/api/print/image", files={"image": ("logo.gif", b"GIF89a")}
+        )
+        self.assertEqual(
+            {"success": False, "error": "Unsupported image format"},
+            json.loads(response.body),
+        )
+
+
+class PrintBatchTestCase(WebTestCase):
+    def test_print(self) -> None:
+        print_scheduler = self.app.config["brother_ql_web.print_scheduler"]
+        print_scheduler.start()
+        self.addCleanup(print_scheduler.stop)
+
+        font = "Roboto (Regular)"
+        labels = [
+            {"text": "First", "font_family": font, "label_count": 2},
+            {"text": "Invalid", "font_family": font, "font_size": "large"},
+            {"text": "Unknown font", "font_family": "Unknown (Regular)"},
+            {"text": "Wide barcode", "font_family": font, "barcode": "Too wide" * 10},
+            {"text": "Second", "font_family": font},
+        ]
+        render_pool = self.app.config["brother_ql_web.render_pool"]
+        with mock.patch.object(
+            render_pool,
+            "render",
+            return_value=iter(
+                [
+                    create_raster_page(b"first"),
+                    ValueError("The barcode does not fit on the label"),
+                    create_raster_page(b"second"),
+                ]
+            ),
+        ) as render_mock:
+            response = self.request("/api/print/batch", json_data=labels)
+            result = json.loads(response.body)
+            print_scheduler.stop()
+
+        rendered = list(render_mock.call_args.args[0])
+        self.assertEqual(
+            ["First", "Wide barcode", "Second"], [item.text for item in rendered]
+        )
+        self.assertFalse(result["success"])
+        self.assertEqual(
+            [True, False, False, False, True],
+            [item["success"] for item in result["results"]],
+        )
+        self.assertEqual(
+            [
+                "Invalid value for font_size: 'large'",
+                "Couln't find the font & style",
+                "The barcode does not fit on the label",
+            ],
+            [item["error"] for item in result["results"][1:4]],
+        )
+
+        status = json.loads(
+            self.request(f"/api/print/jobs/{result['job_id']}", method="GET").body
+        )
+        self.assertEqual("done", status["state"])
+        self.assertEqual(3, status["labels_printed"])
+        backend = self.backend_class.return_value
+        self.assertEqual(
+            [
+                mock.call(create_raster_page(b"first", last=False)),
+                mock.call(create_raster_page(b"first", first=False, last=False)),
+                mock.call(create_raster_page(b"second", first=False)),
+            ],
+            backend.write.call_args_list,
+        )
+
+    def test_large_body(self) -> None:
+        # Larger than `bottle.BaseRequest.MEMFILE_MAX`.
+        labels = [{"text": "x" * 300, "font_family": "Unknown (Regular)"}] * 400
+        response = self.request("/api/print/batch", json_data=labels)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(400, len(json.loads(response.body)["results"]))
+
+        self.configuration.server.batch_max_size = 1024
+        response = self.request("/api/print/batch", json_data=labels)
+        self.assertEqual(413, response.status_code)
+
+    def test_invalid_body(self) -> None:
+        for body in [{"text": "Hello"}, []]:
+            with self.subTest(body=body):
+                response = self.request("/api/print/batch", json_data=body)
+                self.assertEqual(
+                    {
+                        "success": False,
+                        "error": "Please provide a JSON array of labels",
+                    },
+                    json.loads(response.body),
+                )
+
+
+class PrintMergeTestCase(WebTestCase):
+    DATA = {"text": "Item: {name}", "font_family": "Roboto (Regular)"}
+
+    def test_print(self) -> None:
+        print_scheduler = self.app.config["brother_ql_web.print_scheduler"]
+        print_scheduler.start()
+        self.addCleanup(print_scheduler.stop)
+
+        with mock.patch(
+            "brother_ql_web.merge.generate_label",
+            side_effect=lambda parameters, configuration: mock.Mock(
+                data=create_raster_page(parameters.text.encode())
+            ),
+        ):
+            response = self.request(
+                "/api/print/merge",
+                data={**self.DATA, "label_count": 2},
+                files={"data": ("items.jsonl", b'{"name": "Tea"}\n{"name": "Coffee"}')},
+            )
+            result = json.loads(response.body)
+            print_scheduler.stop()
+
+        self.assertTrue(result["success"])
+        self.assertEqual(4, result["label_count"])
+        status = json.loads(
+            self.request(f"/api/print/jobs/{result['job_id']}", method="GET").body
+        )
+        self.assertEqual("done", status["state"])
+        backend = self.backend_class.return_value
+        self.assertEqual(
+            [
+                mock.call(create_raster_page(b"Item: Tea", last=False)),
+                mock.call(create_raster_page(b"Item: Tea", first=False, last=False)),
+                mock.call(create_raster_page(b"Item: Coffee", first=False, last=False)),
+                mock.call(create_raster_page(b"Item: Coffee", first=False)),
+            ],
+            backend.write.call_args_list,
+        )
+
+    def test_cancel_queued(self) -> None:
+        files = []
+        named_temporary_file = tempfile.NamedTemporaryFile
+
+        def create_file(**kwargs: Any) -> Any:
+            fd = named_temporary_file(**kwargs)
+            files.append(fd.name)
+            return fd
+
+        with mock.patch("tempfile.NamedTemporaryFile", side_effect=create_file):
+            response = self.request(
+                "/api/print/merge",
+                data=self.DATA,
+                files={"data": ("items.jsonl", b'{"name": "Tea"}')},
+            )
+        job_id = json.loads(response.body)["job_id"]
+        self.assertTrue(os.path.exists(files[0]))
+        self.request(f"/api/print/jobs/{job_id}", method="DELETE")
+        print_scheduler = self.app.config["brother_ql_web.print_scheduler"]
+        print_scheduler.start()
+        print_scheduler.stop()
+
+        status = json.loads(
+            self.request(f"/api/print/jobs/{job_id}", method="GET").body
+        )
+        self.assertEqual("cancelled", status["state"])
+        # The file is deleted without rendering the labels.
+        self.assertFalse(os.path.exists(files[0]))
+
+    def test_invalid_template(self) -> None:
+        response = self.request(
+            "/api/print/merge",
+            data=self.DATA,
+            files={"data": ("items.csv", b"title\nTea\n")},
+        )
+        self.assertEqual(
+            {"success": False, "error": "Row 1: Unknown column: name"},
+            json.loads(response.body),
+        )
+
+    def test_missing_file(self) -> None:
+        response = self.request("/api/print/merge", data=self.DATA, files={})
+        self.assertEqual(
+            {"success": False, "error": "Please provide the data file"},
+            json.loads(response.body),
+        )
+
+
+class TemplatesTestCase(WebTestCase):
+    TEMPLATE = {
+        "name": "Asset tag",
+        "parameters": {"font_family": "Roboto (Regular)", "font_size": 40},
+    }
+
+    def create_template(self) -> str:
+        response = self.request("/api/templates", json_data=self.TEMPLATE)
+        result = json.loads(response.body)
+        self.assertTrue(result["success"])
+        return str(result["template"]["id"])
+
+    def test_crud(self) -> None:
+        template_id = self.create_template()
+        response = self.request("/api/templates", method="GET")
+        self.assertEqual(
+            {"templates": [{"id": template_id, **self.TEMPLATE}]},
+            json.loads(response.body),
+        )
+
+        updated = {"name": "Shelf", "parameters": {"font_family": "Roboto (Regular)"}}
+        response = self.request(
+            f"/api/templates/{template_id}", method="PUT", json_data=updated
+        )
+        self.assertTrue(json.loads(response.body)["success"])
+        response = self.request(f"/api/templates/{template_id}", method="GET")
+        self.assertEqual({"id": template_id, **updated}, json.loads(response.body))
+
+        response = self.request(f"/api/templates/{template_id}", method="DELETE")
+        self.assertEqual({"success": True}, json.loads(response.body))
+        response = self.request(f"/api/templates/{template_id}", method="GET")
+        self.assertEqual(404, response.status_code)
+
+    def test_invalid(self) -> None:
+        response = self.request(
+            "/api/templates",
+            json_data={"name": "Missing", "parameters": {"font_family": "Foo (Bar)"}},
+        )
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(
+            {"success": False, "error": "Couln't find the font & style"},
+            json.loads(response.body),
+        )
+        response = self.request("/api/templates/unknown", method="PUT", json_data={})
+        self.assertEqual(404, response.status_code)
+
+    def test_preview(self) -> None:
+        template_id = self.create_template()
+        response = self.request(
+            f"/api/preview/template/{template_id}", data={"text": "A-42"}
+        )
+        self.assertEqual(200, response.status_code)
+        expected = self.request(
+            "/api/preview/text",
+            data={"text": "A-42", "font_family": "Roboto (Regular)", "font_size": 40},
+        )
+        self.assertEqual(expected.headers["etag"], response.headers["etag"])
+
+    def test_print(self) -> None:
+        template_id = self.create_template()
+        print_scheduler = self.app.config["brother_ql_web.print_scheduler"]
+        print_scheduler.start()
+        self.addCleanup(print_scheduler.stop)
+
+        with mock.patch(
+            "brother_ql_web.web.generate_label",
+            side_effect=lambda parameters, configuration: mock.Mock(
+                data=create_raster_page(parameters.text.encode())
+            ),
+        ):
+            response = self.request(
+                f"/api/print/template/{template_id}",
+                data={"text": "A-42", "label_count": 2},
+            )
+            result = json.loads(response.body)
+            self.assertTrue(result["success"])
+            print_scheduler.stop()
+
+        backend = self.backend_class.return_value
+        self.assertEqual(
+            [
+                mock.call(create_raster_page(b"A-42", last=False)),
+                mock.call(create_raster_page(b"A-42", first=False)),
+            ],
+            backend.write.call_args_list,
+        )
+
+        response = self.request("/api/print/template/unknown", data={"text": "A"})
+        self.assertEqual(
+            {"success": False, "error": "Unknown template"}, json.loads(response.body)
+        )
 
 
 class MainTestCase(TestCase):
-    pass
+    def test_forked_workers(self) -> None:
+        for workers in [1, 2]:
+            with self.subTest(workers=workers):
+                configuration = self.example_configuration
+                configuration.server.backend = "gunicorn"
+                configuration.server.workers = workers
+                app = bottle.default_app()
+                with mock.patch.object(app, "run") as run_mock, mock.patch(
+                    "brother_ql_web.web.PrintScheduler.start"
+                ) as start_mock, mock.patch("brother_ql_web.web.PrintScheduler.stop"):
+                    web.main(
+                        configuration=configuration,
+                        fonts={"Roboto": {"Regular": ROBOTO_REGULAR}},
+                        label_sizes=[("62", "62mm endless")],
+                        backend_classes={"default": mock.MagicMock()},
+                    )
+                    # No threads are running in the process forking the workers.
+                    start_mock.assert_not_called()
+                    options = run_mock.call_args.kwargs
+                    self.assertEqual(
+                        ("gunicorn", workers), (options["server"], options["workers"])
+                    )
+                    options["post_fork"](None, None)
+                    start_mock.assert_called_once_with()